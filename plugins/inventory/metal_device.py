@@ -4,18 +4,25 @@
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
 
+import fnmatch
+import hashlib
+import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 
 from ansible.errors import AnsibleError
-from ansible.plugins.inventory import BaseInventoryPlugin, Constructable, to_safe_group_name
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable, to_safe_group_name
 
 from ansible_collections.equinix.cloud.plugins.module_utils import (
     action,
 )
 from ansible_collections.equinix.cloud.plugins.module_utils.metal import (
+    http_cache,
     metal_client,
     metal_api,
+    ttl_cache,
 )
 
 DOCUMENTATION = '''
@@ -24,7 +31,7 @@ description: Reads device inventories from Equinix Metal. Uses YAML configuratio
   file that ends with equinix.(yml|yaml). ansible_host is set to first public
   IP address of the device.
 module: metal_device
-extends_documentation_fragment: [constructed]
+extends_documentation_fragment: [constructed, inventory_cache]
 notes: []
 options:
   plugin:
@@ -47,6 +54,132 @@ options:
     type: list
     elements: str
     required: false
+  organization_ids:
+    description:
+    - List of Equinix Metal organization IDs to query for devices. The
+      devices of an organization are listed at once instead of project by
+      project, which takes far fewer requests for many small projects. With
+      project_ids too, only the devices of those projects are kept.
+      incremental_refresh doesn't apply to organizations.
+    type: list
+    elements: str
+    required: false
+  metal_api_pool_maxsize:
+    description:
+    - Number of connections to the Equinix Metal API kept open for reuse.
+    type: int
+    required: false
+    env:
+        - name: METAL_API_POOL_MAXSIZE
+  metal_api_connect_timeout:
+    description:
+    - Timeout in seconds for connecting to the Equinix Metal API.
+    type: float
+    required: false
+    env:
+        - name: METAL_API_CONNECT_TIMEOUT
+  metal_api_read_timeout:
+    description:
+    - Timeout in seconds for reading a response of the Equinix Metal API.
+    type: float
+    required: false
+    env:
+        - name: METAL_API_READ_TIMEOUT
+  metal_api_max_retries:
+    description:
+    - Number of times a request rate limited or failed by the Equinix Metal
+      API is retried.
+    type: int
+    required: false
+    env:
+        - name: METAL_API_MAX_RETRIES
+  metal_api_rate_limit:
+    description:
+    - Maximum number of requests per second to the Equinix Metal API, shared
+      with the modules running on the same host with the same token. Not
+      limited by default.
+    type: float
+    required: false
+    env:
+        - name: METAL_API_RATE_LIMIT
+  metal_api_rate_limit_burst:
+    description:
+    - Number of requests which can be made at once before
+      metal_api_rate_limit applies.
+    type: int
+    required: false
+    env:
+        - name: METAL_API_RATE_LIMIT_BURST
+  max_concurrency:
+    description:
+    - Number of projects whose devices are read at the same time. The pages
+      of a project are read concurrently too, so keep metal_api_pool_maxsize
+      large enough for the connections in use.
+    type: int
+    required: false
+    default: 4
+  fail_on_read_errors:
+    description:
+    - Fail if the devices of any project or organization can't be read. By
+      default they are left out with a warning, and the plugin only fails
+      if none can be read. An inventory with devices left out isn't cached.
+    type: bool
+    required: false
+    default: false
+  incremental_refresh:
+    description:
+    - Keep the devices of every project on disk with a fingerprint of them,
+      a hash of the ids, states and update times of the devices. The
+      fingerprint is read with a list of all devices of the project which
+      holds only these attributes, so every read of the inventory still
+      requests all pages of devices of all projects, only with far smaller
+      devices. Just the projects whose fingerprint changed are then listed
+      with all device attributes, which saves downloading and mapping the
+      full devices of the unchanged projects. Changes which don't update a
+      device (e.g. some IP address assignments) are only seen after
+      incremental_refresh_max_age.
+    type: bool
+    required: false
+    default: false
+  incremental_refresh_max_age:
+    description:
+    - Seconds after which a project is read in full even if its fingerprint
+      didn't change.
+    type: int
+    required: false
+    default: 86400
+  filters:
+    description:
+    - Keep only the devices matching all of these filters, before any
+      host is added or templated. C(metal_state), C(metro) and C(plan) take
+      a value or a list of values (e.g. active, da, c3.small.x86), C(tags)
+      a list of tags a device must all have, and C(hostname) a pattern
+      with shell-style wildcards (e.g. web-*). Where the API can filter the
+      list requests (a tag, a single metro of projects, and the hostname
+      without its wildcards), it does, so devices filtered out aren't
+      even downloaded.
+    type: dict
+    required: false
+  hostvars:
+    description:
+    - Device attributes set as host variables, all but ssh_keys by default.
+      Only these attributes, the ones referenced in compose, keyed_groups
+      and groups, the filtered ones, and hostname, project_id and
+      ip_addresses (which the hosts, their project groups and ansible_host
+      come from) are read. Nested objects which only the other attributes
+      need, like network_ports and operating_system, are neither requested
+      from the API nor mapped, which makes large inventories faster to read.
+    type: list
+    elements: str
+    required: false
+  metal_api_cache_dir:
+    description:
+    - Directory in which the projects of incremental_refresh are kept,
+      ~/.cache/ansible-equinix by default.
+    type: path
+    required: false
+    env:
+        - name: METAL_API_CACHE_DIR
 requirements:
 - python >= 3
 - metal_python >= 0.0.1
@@ -56,6 +189,16 @@ short_description: Equinix Metal Device inventory source
 EXAMPLES = '''
 plugin: equinix.cloud.metal_device
 strict: false
+# read only what the play uses, plus the attributes of the groups below
+hostvars:
+  - hostname
+  - id
+  - metal_state
+# only the active web servers in Dallas
+filters:
+  metal_state: active
+  metro: da
+  hostname: web-*
 keyed_groups:
   - prefix: tag
     key: tags
@@ -65,6 +208,11 @@ keyed_groups:
     prefix: equinix_metal_metro
   - key: state
     prefix: equinix_metal_state
+# keep the devices for an hour, runs within the hour don't call the API
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_timeout: 3600
+cache_connection: ~/.cache/ansible-equinix/inventory
 '''
 
 RETURN = '''
@@ -74,13 +222,90 @@ EXCLUDE_ATTRIBUTES = [
     "ssh_keys",
 ]
 
+# read even if not in hostvars, see _populate()
+REQUIRED_ATTRIBUTES = [
+    "hostname",
+    "project_id",
+    "ip_addresses",
+]
+
+FILTERS = [
+    "metal_state",
+    "metro",
+    "plan",
+    "tags",
+    "hostname",
+]
+
+# filters the device list requests take, others are ignored by the SDK
+FILTER_ARGS = {
+    "tags": "tag",
+    "metro": "metro",
+    "hostname": "hostname",
+}
+
+DEVICE_RESOURCE_TYPES = [
+    "metal_project_device",
+    "metal_organization_device",
+]
+
+# options which change the cached devices, they are part of the cache key
+CACHE_KEY_OPTIONS = [
+    "project_ids",
+    "organization_ids",
+    "filters",
+    "hostvars",
+]
+
 
 def label(device: Dict[str, Any]) -> str:
     """Return the label of a device."""
     return device['hostname']
 
 
-class InventoryModule(BaseInventoryPlugin, Constructable):
+def _as_list(value) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def filter_kwargs(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the arguments of the device list requests which narrow the
+    list down to (a superset of) the devices matching filters. The API
+    filters take a single value and the hostname filter matches a part of
+    the hostname, so matches_filters() must still be applied.
+    """
+    kwargs = {}
+    tags = _as_list(filters.get('tags'))
+    if tags:
+        kwargs[FILTER_ARGS['tags']] = tags[0]
+    metros = _as_list(filters.get('metro'))
+    if len(metros) == 1:
+        kwargs[FILTER_ARGS['metro']] = metros[0]
+    hostname = filters.get('hostname')
+    if hostname:
+        # the longest part without wildcards is in every matching hostname
+        literal = max(re.split(r'[*?]|\[[^\]]*\]', hostname), key=len)
+        if literal:
+            kwargs[FILTER_ARGS['hostname']] = literal
+    return kwargs
+
+
+def matches_filters(device: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    for attr in ('metal_state', 'metro', 'plan'):
+        values = _as_list(filters.get(attr))
+        if values and device.get(attr) not in values:
+            return False
+    if not set(_as_list(filters.get('tags'))) <= set(device.get('tags') or []):
+        return False
+    hostname = filters.get('hostname')
+    if hostname and not fnmatch.fnmatchcase(device.get('hostname') or '', hostname):
+        return False
+    return True
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
 
     NAME = 'equinix.cloud.metal_device'
 
@@ -88,6 +313,12 @@ class InventoryModule(BaseInventoryPlugin, Constructable):
         super().__init__()
         self.client = None
         self.api_call_configs = None
+        self.project_cache = None
+        self.unchanged_projects = []
+        # projects or organizations whose devices couldn't be read
+        self.read_errors = []
+        self.device_resource_types = {}
+        self.filters = {}
 
     def _build_client(self) -> None:
         metal_api_token = self.get_option('metal_api_token')
@@ -104,9 +335,24 @@ class InventoryModule(BaseInventoryPlugin, Constructable):
                 % ', '.join(metal_client.TOKEN_ENVVARS)
             )
         try:
-            self.client = metal_client.get_equinix_metal_client(str(metal_api_token))
+            self.client = metal_client.get_equinix_metal_client(
+                str(metal_api_token),
+                pool_maxsize=self.get_option('metal_api_pool_maxsize'),
+                connect_timeout=self.get_option('metal_api_connect_timeout'),
+                read_timeout=self.get_option('metal_api_read_timeout'),
+                max_retries=self.get_option('metal_api_max_retries'),
+                rate_limit=self.get_option('metal_api_rate_limit'),
+                rate_limit_burst=self.get_option('metal_api_rate_limit_burst'),
+            )
         except metal_client.MissingMetalPythonError as e:
             raise AnsibleError("The Equinix Metal dynamic inventory plugin equires the 'equinix_metal' package")
+        except ValueError as e:
+            raise AnsibleError("Invalid Equinix Metal API client settings: %s" % e)
+        if self.get_option('incremental_refresh'):
+            self.project_cache = ttl_cache.TTLCache(
+                http_cache.namespace(str(metal_api_token), metal_client.API_URL),
+                self.get_option('metal_api_cache_dir'),
+            )
 
     def verify_file(self, path):
         '''
@@ -124,15 +370,66 @@ class InventoryModule(BaseInventoryPlugin, Constructable):
     def parse(self, inventory, loader, path, cache=True):
         super().parse(inventory, loader, path)
         self._read_config_data(path)
+
+        # the mapped devices are cached, so that runs within cache_timeout
+        # don't call the API at all. cache is False when the inventory is
+        # refreshed (e.g. meta: refresh_inventory or --flush-cache).
+        cache_key = self._get_cache_key(path)
+        use_cache = self.get_option('cache')
+        devices = None
+        if use_cache and cache:
+            try:
+                devices = self._cache[cache_key]
+            except KeyError:
+                pass
+        if devices is None:
+            devices = self._fetch_devices()
+            # devices left out by read errors would be missing until
+            # cache_timeout
+            if use_cache and not self.read_errors:
+                self._cache[cache_key] = devices
+            elif use_cache:
+                self.display.warning("Equinix Metal inventory not cached, devices of %d projects or "
+                                     "organizations were not read" % len(self.read_errors))
+        self._populate(devices)
+
+    def _get_cache_key(self, path):
+        options = dict((o, self.get_option(o)) for o in CACHE_KEY_OPTIONS)
+        digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+        return "%s_%s" % (self.get_cache_key(path), digest[:16])
+
+    def _fetch_devices(self):
         self._build_client()
+        self.unchanged_projects = []
+        self.read_errors = []
+        self.filters = self._get_filters()
+        self.device_resource_types = self._get_device_resource_types()
+        organization_ids = self._get_organization_ids()
+        if organization_ids:
+            devices = self._get_devices_from_organization_ids(organization_ids)
+            project_ids = self.get_option('project_ids')
+            if project_ids:
+                devices = [d for d in devices if d['project_id'] in project_ids]
+        else:
+            configured_project_ids = self._get_project_ids()
+            devices = self._get_devices_from_project_ids(configured_project_ids)
+        if self.filters:
+            devices = [d for d in devices if matches_filters(d, self.filters)]
+        if self.project_cache is not None and not organization_ids:
+            self.display.vv("Equinix Metal projects unchanged since last read: %d of %d"
+                            % (len(self.unchanged_projects), len(set(configured_project_ids))))
+        policy = metal_client.retry_policy(self.client)
+        if policy is not None:
+            self.display.vv("Equinix Metal API calls: %s" % policy.stats.as_dict())
+        return devices
 
+    def _populate(self, devices):
         strict = self.get_option("strict")
-        configured_project_ids = self._get_project_ids()
-        devices = self._get_devices_from_project_ids(configured_project_ids)
         projects = set([device['project_id'] for device in devices])
         for project in projects:
             self.inventory.add_group(to_safe_group_name(project))
 
+        hostvars = self.get_option('hostvars') or []
         for device in devices:
             group_name = to_safe_group_name(device['project_id'])
             self.inventory.add_host(label(device), group=group_name)
@@ -140,7 +437,7 @@ class InventoryModule(BaseInventoryPlugin, Constructable):
             self.inventory.set_variable(label(device), 'ansible_host', first_public_ip)
             self.inventory.add_host(label(device), group='all')
             for k, v in device.items():
-                if k not in EXCLUDE_ATTRIBUTES:
+                if k not in EXCLUDE_ATTRIBUTES or k in hostvars:
                     self.inventory.set_variable(label(device), k, v)
 
         for device in devices:
@@ -162,6 +459,44 @@ class InventoryModule(BaseInventoryPlugin, Constructable):
                 strict=strict
             )
 
+    def _get_device_resource_types(self):
+        """
+        Returns the resource types the devices are listed with, keeping
+        only the attributes needed for hostvars and the constructed groups
+        and variables, if hostvars is set.
+        """
+        hostvars = self.get_option('hostvars')
+        if hostvars is None:
+            return {name: name for name in DEVICE_RESOURCE_TYPES}
+        known = metal_api.get_resource_type("metal_project_device").attribute_map
+        unknown = [a for a in hostvars if a not in known]
+        if unknown:
+            raise AnsibleError("Unknown device attributes in hostvars: %s, known are %s"
+                               % (', '.join(unknown), ', '.join(known)))
+        attributes = set(hostvars) | set(REQUIRED_ATTRIBUTES) | set(self.filters)
+        attributes |= self._get_referenced_attributes(known)
+        return {name: metal_api.projected_resource_type(name, attributes) for name in DEVICE_RESOURCE_TYPES}
+
+    def _get_filters(self):
+        filters = {k: v for k, v in (self.get_option('filters') or {}).items() if v is not None}
+        unknown = [k for k in filters if k not in FILTERS]
+        if unknown:
+            raise AnsibleError("Unknown device filters: %s, known are %s" % (', '.join(unknown), ', '.join(FILTERS)))
+        if 'hostname' in filters and not isinstance(filters['hostname'], str):
+            raise AnsibleError("The hostname filter must be a string, is %s" % filters['hostname'])
+        return filters
+
+    def _get_referenced_attributes(self, known):
+        # the templates aren't parsed, any word naming an attribute counts
+        templates = list((self.get_option('compose') or {}).values())
+        templates += list((self.get_option('groups') or {}).values())
+        templates += [kg.get('key') for kg in self.get_option('keyed_groups') or []]
+        words = set()
+        for template in templates:
+            if isinstance(template, str):
+                words.update(re.findall(r'[A-Za-z_][A-Za-z0-9_]*', template))
+        return words & set(known)
+
     def _get_project_ids(self):
         project_ids_arg_value = self.get_option('project_ids')
         project_ids: List[str] = []
@@ -174,14 +509,83 @@ class InventoryModule(BaseInventoryPlugin, Constructable):
             return [p["id"] for p in self._get_all_projects()]
         return project_ids
 
+    def _get_organization_ids(self):
+        organization_ids = self.get_option('organization_ids') or []
+        for oid in organization_ids:
+            if not metal_client.is_valid_uuid(oid):
+                raise AnsibleError("Invalid organization id: %s" % oid)
+        return organization_ids
+
     def _get_all_projects(self):
         return metal_api.call("metal_project", action.LIST, self.client)
 
     def _get_project_devices(self, project_id):
-        return metal_api.call("metal_project_device", action.LIST, self.client, {"project_id": project_id})
+        if self.project_cache is None:
+            return self._list_project_devices(project_id)
+        # the fingerprint is read first, a device changed while the project
+        # is listed makes the next fingerprint differ
+        fingerprint = self._get_project_fingerprint(project_id)
+        # devices read for other hostvars or filters differ
+        rt = metal_api.get_resource_type(self.device_resource_types["metal_project_device"])
+        key = self.project_cache.key('metal_device_inventory',
+                                     {'project_id': project_id, 'attributes': sorted(rt.attribute_map),
+                                      'filters': self.filters})
+        cached = self.project_cache.get(key, self.get_option('incremental_refresh_max_age'))
+        if cached is not None and cached.get('fingerprint') == fingerprint:
+            self.unchanged_projects.append(project_id)
+            return cached['devices']
+        devices = self._list_project_devices(project_id)
+        self.project_cache.put(key, {'fingerprint': fingerprint, 'devices': devices})
+        return devices
+
+    def _list_project_devices(self, project_id):
+        # device lists can be large, skip the SDK models and map the JSON
+        return metal_api.call(self.device_resource_types["metal_project_device"], action.LIST, self.client,
+                              {"project_id": project_id}, raw=True, filters=filter_kwargs(self.filters))
+
+    def _get_project_fingerprint(self, project_id):
+        devices = metal_api.call("metal_project_device_fingerprint", action.LIST, self.client,
+                                 {"project_id": project_id}, raw=True)
+        summary = sorted((d['id'], d['metal_state'], d['updated_at']) for d in devices)
+        return hashlib.sha256(json.dumps(summary).encode('utf-8')).hexdigest()
+
+    def _get_organization_devices(self, organization_id):
+        return metal_api.call(self.device_resource_types["metal_organization_device"], action.LIST, self.client,
+                              {"organization_id": organization_id}, raw=True, filters=filter_kwargs(self.filters))
 
     def _get_devices_from_project_ids(self, project_ids):
-        devices = []
-        for p in project_ids:
-            devices.extend(self._get_project_devices(p))
+        return self._read_devices_concurrently(project_ids, self._get_project_devices, "project")
+
+    def _get_devices_from_organization_ids(self, organization_ids):
+        return self._read_devices_concurrently(organization_ids, self._get_organization_devices, "organization")
+
+    def _read_devices_concurrently(self, ids, read, kind):
+        """
+        Reads the devices of the projects or organizations concurrently, in
+        at most max_concurrency threads, and merges them in the order of
+        ids. Those which fail are reported, kept in read_errors and left
+        out, unless all of them fail or fail_on_read_errors is set.
+        """
+        max_concurrency = self.get_option('max_concurrency')
+        if max_concurrency < 1:
+            raise AnsibleError("max_concurrency must be at least 1, is %s" % max_concurrency)
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(ids))) as executor:
+            futures = [(i, executor.submit(read, i)) for i in ids]
+            devices = []
+            errors = []
+            for i, future in futures:
+                try:
+                    devices.extend(future.result())
+                except Exception as e:
+                    errors.append("%s: %s" % (i, e))
+        if len(errors) == len(ids):
+            raise AnsibleError("Devices of no Equinix Metal %s could be read: %s" % (kind, '; '.join(errors)))
+        if errors and self.get_option('fail_on_read_errors'):
+            raise AnsibleError("Devices of Equinix Metal %s not read: %s" % (kind, '; '.join(errors)))
+        for error in errors:
+            self.display.warning("Devices of Equinix Metal %s not read, %s" % (kind, error))
+        self.read_errors.extend("%s %s" % (kind, error) for error in errors)
         return devices
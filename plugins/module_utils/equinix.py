@@ -8,6 +8,8 @@ from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
 from typing import Any, Dict, List, Optional, Tuple, Union
+import os
+import sqlite3
 import time
 import yaml
 
@@ -19,8 +21,13 @@ from ansible_collections.equinix.cloud.plugins.module_utils import (
     action,
 )
 from ansible_collections.equinix.cloud.plugins.module_utils.metal import (
+    api_routes,
+    http_cache,
+    lookup_cache,
     metal_client,
     metal_api,
+    polling,
+    ttl_cache,
 )
 
 from ansible_specdoc.objects import SpecDocMeta
@@ -37,6 +44,62 @@ METAL_COMMON_ARGS = dict(
         default="",
         no_log=True,
     ),
+    metal_api_pool_maxsize=dict(
+        type='int',
+        fallback=(env_fallback, metal_client.POOL_MAXSIZE_ENVVARS),
+    ),
+    metal_api_connect_timeout=dict(
+        type='float',
+        fallback=(env_fallback, metal_client.CONNECT_TIMEOUT_ENVVARS),
+    ),
+    metal_api_read_timeout=dict(
+        type='float',
+        fallback=(env_fallback, metal_client.READ_TIMEOUT_ENVVARS),
+    ),
+    metal_api_max_retries=dict(
+        type='int',
+        fallback=(env_fallback, metal_client.MAX_RETRIES_ENVVARS),
+    ),
+    metal_api_retry_writes=dict(
+        type='bool',
+        default=False,
+    ),
+    metal_api_rate_limit=dict(
+        type='float',
+        fallback=(env_fallback, metal_client.RATE_LIMIT_ENVVARS),
+    ),
+    metal_api_rate_limit_burst=dict(
+        type='int',
+        fallback=(env_fallback, metal_client.RATE_LIMIT_BURST_ENVVARS),
+    ),
+    metal_api_cache_dir=dict(
+        type='path',
+        fallback=(env_fallback, metal_client.CACHE_DIR_ENVVARS),
+    ),
+    metal_api_lookup_cache_ttl=dict(
+        type='float',
+        fallback=(env_fallback, ['METAL_API_LOOKUP_CACHE_TTL']),
+    ),
+    metal_api_poll_interval=dict(
+        type='float',
+        default=polling.INITIAL_INTERVAL,
+        fallback=(env_fallback, ['METAL_API_POLL_INTERVAL']),
+    ),
+    metal_api_poll_multiplier=dict(
+        type='float',
+        default=polling.MULTIPLIER,
+        fallback=(env_fallback, ['METAL_API_POLL_MULTIPLIER']),
+    ),
+    metal_api_poll_max_interval=dict(
+        type='float',
+        default=polling.MAX_INTERVAL,
+        fallback=(env_fallback, ['METAL_API_POLL_MAX_INTERVAL']),
+    ),
+    metal_api_poll_jitter=dict(
+        type='float',
+        default=polling.JITTER,
+        fallback=(env_fallback, ['METAL_API_POLL_JITTER']),
+    ),
 )
 
 
@@ -48,6 +111,81 @@ METAL_API_TOKEN_ARG=dict(
 )
 
 
+# options of the info modules of catalogs, see EquinixModule.get_catalog_list
+CATALOG_CACHE_SPEC = dict(
+    cache_ttl=SpecField(
+        type=FieldType.integer,
+        description=[
+            'How long, in seconds, the catalog read from the API is kept in a '
+            'local cache and reused by later tasks and plays. 0 disables the cache.'
+        ],
+        default=ttl_cache.DEFAULT_TTL,
+    ),
+    cache_bypass=SpecField(
+        type=FieldType.bool,
+        description=[
+            'Read the catalog from the API even if it is cached. The cache '
+            'is updated with the catalog read.'
+        ],
+        default=False,
+    ),
+)
+
+
+# options of the info modules, see metal_api.prepare_call
+INCLUDE_EXCLUDE_SPEC = dict(
+    include=SpecField(
+        type=FieldType.list,
+        element_type=FieldType.string,
+        description=[
+            'List of nested objects to include in the API responses, in addition to '
+            'those included by default. Names can be dotted to include deeply nested objects.'
+        ],
+    ),
+    exclude=SpecField(
+        type=FieldType.list,
+        element_type=FieldType.string,
+        description=[
+            'List of nested objects to exclude from the API responses, in addition to '
+            "those excluded by default because the module doesn't return them. "
+            'The API returns only the href of excluded objects, so excluding an object '
+            'which the module returns makes the module fail.'
+        ],
+    ),
+)
+
+
+# options of the info modules which list paginated resources, see
+# metal_api.derive_page_size
+PAGE_SIZE_SPEC = dict(
+    page_size=SpecField(
+        type=FieldType.integer,
+        description=[
+            'Number of resources to fetch per API request. By default, it is chosen '
+            'for the resource type, so that larger resources are fetched in smaller pages. '
+            'The API maximum is 1000.'
+        ],
+    ),
+)
+
+
+# states of device batches which the API hasn't processed yet
+DEVICE_BATCH_PENDING_STATES = ('pending', 'queued', 'processing')
+
+# phrases of API errors which reject a device batch for the quota or
+# capacity of the project rather than for its content. Plain "limit"
+# would match rate limits and validation errors too.
+QUOTA_ERROR_PHRASES = (
+    'quota',
+    'capacity',
+    'device limit',
+    'server limit',
+    'instance limit',
+    'maximum number of devices',
+    'maximum number of servers',
+)
+
+
 EQUINIX_STATE_ARG = dict(
     type='str',
     default='present',
@@ -91,9 +229,42 @@ class EquinixModule(AnsibleModule):
                 self.params.get("metal_api_token"),
                 self.params.get("metal_api_url"),
                 self.params.get("metal_ua_prefix"),
+                self.params.get("metal_api_pool_maxsize"),
+                self.params.get("metal_api_connect_timeout"),
+                self.params.get("metal_api_read_timeout"),
+                self.params.get("metal_api_max_retries"),
+                self.params.get("metal_api_retry_writes"),
+                self.params.get("metal_api_rate_limit"),
+                self.params.get("metal_api_rate_limit_burst"),
+                self.params.get("metal_api_cache_dir"),
             )
         except metal_client.MissingMetalPythonError as e:
             self.fail_json(msg=missing_required_lib("equinix_metal"), exception=e.exception_traceback)
+        except ValueError as e:
+            self.fail_json(msg=str(e))
+        self._lookup_cache = None
+        # GETs done by the waiters
+        self._polls = 0
+
+    def exit_json(self, **kwargs):
+        self._add_metal_api_stats(kwargs)
+        AnsibleModule.exit_json(self, **kwargs)
+
+    def fail_json(self, msg, **kwargs):
+        self._add_metal_api_stats(kwargs)
+        AnsibleModule.fail_json(self, msg, **kwargs)
+
+    def _add_metal_api_stats(self, result):
+        # API calls and retries of the module run, to see how close to the
+        # rate limits a play runs, e.g. when sizing the number of forks
+        client = getattr(self, 'equinix_metal_client', None)
+        policy = metal_client.retry_policy(client)
+        if policy is not None and 'metal_api_stats' not in result:
+            result['metal_api_stats'] = policy.stats.as_dict()
+            cache = metal_client.http_cache(client)
+            if cache is not None:
+                result['metal_api_stats']['not_modified'] = cache.hits
+            result['metal_api_stats']['polls'] = getattr(self, '_polls', 0)
 
     def params_syntax_check(self):
         try:
@@ -103,6 +274,11 @@ class EquinixModule(AnsibleModule):
             hostname = self.params.get("hostname")
             if hostname:
                 metal_client.raise_if_invalid_hostname(hostname)
+            count = self.params.get("count")
+            if count is not None and count < 1:
+                raise Exception("count must be at least 1, got {0}".format(count))
+            if self.params.get("hostnames") == []:
+                raise Exception("hostnames must not be empty")
             uuid_args = {k: v for k, v in self.params.items() if (k == "id") | (k.endswith("_id"))}
             for k, v in uuid_args.items():
                 if v is not None:
@@ -114,17 +290,54 @@ class EquinixModule(AnsibleModule):
         except Exception as e:
             self.fail_json(msg=str(e))
 
-    def _metal_api_call(self, resource_type, action, call_params={}):
+    def _metal_api_call(self, resource_type, action, call_params={}, raw=False):
         result = metal_api.call(
             resource_type,
             action,
             self.equinix_metal_client,
             call_params,
+            raw,
         )
         return result
 
+    def _prepare_metal_api_call(self, resource_type, action, call_params={}, filters=None):
+        return metal_api.prepare_call(
+            resource_type,
+            action,
+            self.equinix_metal_client,
+            call_params,
+            filters,
+        )
+
+    def _cache_namespace(self):
+        return http_cache.namespace(str(self.params.get('metal_api_token')), self.params.get('metal_api_url'))
+
+    def _get_lookup_cache(self):
+        ttl = self.params.get('metal_api_lookup_cache_ttl')
+        if not ttl:
+            return None
+        if self._lookup_cache is None:
+            directory = os.path.expanduser(self.params.get('metal_api_cache_dir') or ttl_cache.DEFAULT_DIR)
+            self._lookup_cache = lookup_cache.LookupCache(
+                self._cache_namespace(), os.path.join(directory, lookup_cache.FILE_NAME), ttl)
+        return self._lookup_cache
+
+    def _update_lookup_cache(self, resource_type: str, update):
+        # update(cache, related resource types) applies a write to the
+        # cached lookup lists
+        cache = self._get_lookup_cache()
+        if cache is None:
+            return
+        try:
+            update(cache, metal_api.related_resource_types(resource_type))
+        except (sqlite3.Error, OSError) as e:
+            self.warn("Lookup cache not updated, it may be stale for {0}s: {1}".format(cache.ttl, e))
+
     def create(self, resource_type):
-        return self._metal_api_call(resource_type, action.CREATE, self.params.copy())
+        params = self.params.copy()
+        result = self._metal_api_call(resource_type, action.CREATE, params)
+        self._update_lookup_cache(resource_type, lambda cache, types: cache.created(types, params, result))
+        return result
 
     def get_by_id(self, resource_type, tolerate_not_found=False):
         if self.params.get('id') is None:
@@ -148,17 +361,17 @@ class EquinixModule(AnsibleModule):
         if self.params.get('tags') is None:
             raise Exception("get_with_tags called without tags, this is a module bug.")   
 
-        result = self._metal_api_call(resource_type, action.LIST, self.params.copy())
-        matches = []
-        for i in result:
-            resource_tags = i.get("tags")
+        def has_tags(resource):
+            resource_tags = resource.get("tags")
             # if break statement isn't hit, `else` block runs.
             for t in tags:
                 if t not in resource_tags:
                     break
             else:
-                matches.append(i)
+                return True
+            return False
 
+        matches = self._list_matching(resource_type, {'tags': tags}, has_tags)
         if len(matches) == 0:
             return None
         if len(matches) > 1:
@@ -172,27 +385,118 @@ class EquinixModule(AnsibleModule):
                 match_values.append(self.params.get(attr))
             else:
                 raise Exception(f'get_one_from_list called without {attr}, this is a module bug.')
-        result = self._metal_api_call(resource_type, action.LIST, self.params.copy())
-        matches = []
-        for i in result:
-            if all(i.get(attr) == value for attr, value in zip(match_attrs, match_values)):
-                matches.append(i)
+
+        def has_values(resource):
+            return all(resource.get(attr) == value for attr, value in zip(match_attrs, match_values))
+
+        matches = self._list_matching(resource_type, dict(zip(match_attrs, match_values)), has_values)
         if len(matches) == 0:
             return None
         if len(matches) > 1:
             raise Exception(f'found more than one {resource_type} with name {match_values}')
         return matches[0]
 
-    def get_list(self, resource_type: str):
-        return self._metal_api_call(resource_type, action.LIST, self.params.copy())
+    def _list_matching(self, resource_type: str, match_values: Dict[str, Any], is_match):
+        '''
+        Lists resources for which is_match(resource) is true.
+
+        Where the API can filter by the matched attributes (see lookup_filters
+        in metal_api.RESOURCE_TYPES), the LIST is filtered on the server side,
+        so that a lookup costs one small request instead of listing all
+        resources. The API filters are exact or looser than is_match, which
+        the filtered results are still checked with, so the unfiltered LIST
+        is only read if the API rejects the filters, or if the filtered LIST
+        finds nothing with filters which may be stricter (see
+        stricter_lookup_filters).
+        '''
+        cache = self._get_lookup_cache()
+        if cache is not None:
+            try:
+                return [i for i in self._cached_list(cache, resource_type) if is_match(i)]
+            except (sqlite3.Error, OSError) as e:
+                self.warn("Lookup cache not used: {0}".format(e))
+        rt = metal_api.get_resource_type(resource_type)
+        filters = rt.filter_kwargs(match_values)
+        unfiltered_call = self._prepare_metal_api_call(resource_type, action.LIST, self.params.copy())
+        filtered_call = self._prepare_metal_api_call(resource_type, action.LIST, self.params.copy(), filters)
+        # the module params may already include the filters, e.g. hostname
+        if filtered_call.sdk_kwargs != unfiltered_call.sdk_kwargs:
+            try:
+                matches = [i for i in metal_api.execute(filtered_call) if is_match(i)]
+                if matches or not rt.filters_may_miss(match_values):
+                    return matches
+            except metal_client.ApiException as e:
+                if e.status not in (400, 422):
+                    raise e
+        return [i for i in metal_api.execute(unfiltered_call) if is_match(i)]
+
+    def _cached_list(self, cache, resource_type: str):
+        '''
+        Returns the LIST for lookups from the lookup cache, listing and
+        caching it if needed. The lookup filters (e.g. hostname) are left
+        out of the LIST, so that one cached list serves all lookups in the
+        same scope (e.g. project).
+        '''
+        rt = metal_api.get_resource_type(resource_type)
+        params = self.params.copy()
+        api_call = self._prepare_metal_api_call(resource_type, action.LIST, params)
+        filter_args = set(rt.lookup_filters.values())
+        lookups = api_call.conf.binder.lookups
+        dropped = [p for sdk_arg, p in lookups if sdk_arg in filter_args and params.get(p) is not None]
+        if dropped:
+            params = {k: v for k, v in params.items() if k not in dropped}
+            api_call = self._prepare_metal_api_call(resource_type, action.LIST, params)
+        scope = {p: params[p] for sdk_arg, p in lookups
+                 if sdk_arg in api_call.path_kwargs and params.get(p) is not None
+                 and p not in metal_api.PROJECTION_PARAMS}
+        key = cache.key(resource_type, api_call.path_kwargs)
+        items = cache.get(key)
+        if items is None:
+            items = metal_api.execute(api_call)
+            cache.put(key, resource_type, scope, items)
+        return items
+
+    def get_list_matching(self, resource_type: str, attribute: str, values: List[Any]):
+        '''
+        Lists the resources whose attribute is one of values, e.g. devices
+        by hostname, with one LIST instead of a lookup per value.
+        '''
+        wanted = set(values)
+        return self._list_matching(resource_type, {}, lambda resource: resource.get(attribute) in wanted)
+
+    def get_list(self, resource_type: str, raw: bool = False):
+        return self._metal_api_call(resource_type, action.LIST, self.params.copy(), raw)
+
+    def get_catalog_list(self, resource_type: str):
+        '''
+        Lists resources which change rarely, like metros or plans, through
+        a cache kept on disk (in metal_api_cache_dir or
+        ttl_cache.DEFAULT_DIR) for cache_ttl seconds. With cache_bypass,
+        the list is read from the API and the cache is updated.
+        '''
+        ttl = self.params.get('cache_ttl')
+        if not ttl:
+            return self.get_list(resource_type)
+        api_call = self._prepare_metal_api_call(resource_type, action.LIST, self.params.copy())
+        cache = ttl_cache.TTLCache(self._cache_namespace(), self.params.get('metal_api_cache_dir'))
+        key = cache.key(resource_type, api_call.path_kwargs)
+        if not self.params.get('cache_bypass'):
+            cached = cache.get(key, ttl)
+            if cached is not None:
+                return cached
+        result = metal_api.execute(api_call)
+        cache.put(key, result)
+        return result
 
     def delete_by_id(self, resource_type: str):
         if self.params.get('id') is None:
             raise Exception('no id in module when deleting, this is a module bug')
+        resource_id = self.params['id']
         try:
             self._metal_api_call(resource_type, action.DELETE, self.params.copy())
         except metal_client.NotFoundException as e:
-            return None
+            pass
+        self._update_lookup_cache(resource_type, lambda cache, types: cache.deleted(types, resource_id))
         return None
 
     def update_by_id(self, update_dict: dict, resource_type: str):
@@ -200,7 +504,9 @@ class EquinixModule(AnsibleModule):
         if specified_id is None:
             raise Exception('no id in module when updating, this is a module bug')
         update_dict['id'] = specified_id
-        return self._metal_api_call(resource_type, action.UPDATE, update_dict)
+        result = self._metal_api_call(resource_type, action.UPDATE, update_dict)
+        self._update_lookup_cache(resource_type, lambda cache, types: cache.updated(types, result))
+        return result
 
     def _get_id_safe(self):
         specified_id = self.params.get('id')
@@ -208,33 +514,190 @@ class EquinixModule(AnsibleModule):
             raise Exception('no id in module when about to poll for a condition, this is a module bug')
         return specified_id
 
+    def _poll_policy(self):
+        return polling.PollPolicy(
+            self.params.get('metal_api_poll_interval') or polling.INITIAL_INTERVAL,
+            self.params.get('metal_api_poll_multiplier') or polling.MULTIPLIER,
+            self.params.get('metal_api_poll_max_interval') or polling.MAX_INTERVAL,
+            self.params.get('metal_api_poll_jitter') or 0.0,
+        )
+
+    def _poll(self, poll, timeout: int):
+        '''
+        Calls poll() until it returns (True, result), with intervals from
+        the poll policy (see polling.PollPolicy) and a last call at the
+        timeout. Returns the last (done, result). If the polled result
+        has provisioning_percentage, the next call is scheduled from the
+        progress.
+        '''
+        policy = self._poll_policy()
+        progress = polling.ProgressEstimate()
+        stop_time = time.time() + timeout
+        attempt = 0
+        while True:
+            self._polls += 1
+            done, result = poll()
+            now = time.time()
+            if done or now >= stop_time:
+                return done, result
+            seconds_left = progress.update((result or {}).get('provisioning_percentage'))
+            time.sleep(min(policy.interval(attempt, seconds_left), stop_time - now))
+            attempt += 1
 
     def wait_for_resource_condition(self, resource_type: str,
                                     attribute: str, target_value: str, timeout: int):
         specified_id = self._get_id_safe()
-        stop_time = time.time() + timeout
-        while time.time() < stop_time:
-            result = self._metal_api_call(resource_type, action.GET, self.params.copy())
-            if result[attribute] == target_value:
-                return result
-            time.sleep(5)
+        # the same GET is repeated, so the call is bound only once
+        api_call = self._prepare_metal_api_call(resource_type, action.GET, self.params.copy())
+
+        def poll():
+            result = metal_api.execute(api_call)
+            return result[attribute] == target_value, result
+
+        done, result = self._poll(poll, timeout)
+        if done:
+            return result
         raise Exception(f'wait for {resource_type} {specified_id} {attribute} {target_value} timed out')
     
     def wait_for_resource_removal(self, resource_type: str, timeout: int):
         specified_id = self._get_id_safe()
-        stop_time = time.time() + timeout
-        while time.time() < stop_time:
+        api_call = self._prepare_metal_api_call(resource_type, action.GET, self.params.copy())
+
+        def poll():
             try:
-                self._metal_api_call(resource_type, action.GET, self.params.copy())
+                return False, metal_api.execute(api_call)
             except metal_client.NotFoundException:
-                return
-            time.sleep(5)
+                return True, None
+
+        done, _ = self._poll(poll, timeout)
+        if done:
+            return
         raise Exception(f'wait for {resource_type} {specified_id} removal timed out')
 
+    def wait_for_resources_condition(self, resource_type: str, ids: List[str],
+                                     attribute: str, target_value: str, timeout: int):
+        '''
+        Waits for many resources at once, with one LIST of resource_type
+        (e.g. metal_project_device, scoped by the module params) per poll
+        instead of a GET per resource, so that the API load doesn't grow
+        with the number of resources.
+
+        Returns a dict for each id, in order, with the last listed
+        resource (None if it wasn't listed), whether its attribute reached
+        target_value and the seconds it took.
+        '''
+        api_call = self._prepare_metal_api_call(resource_type, action.LIST, self.params.copy())
+        start = time.time()
+        results = {i: {'id': i, 'resource': None, 'ready': False, 'seconds': None} for i in ids}
+        pending = set(ids)
+
+        def poll():
+            listed = metal_api.execute(api_call, raw=True)
+            now = time.time()
+            progress = []
+            for resource in listed:
+                result = results.get(resource.get('id'))
+                if result is None or result['ready']:
+                    continue
+                result['resource'] = resource
+                if resource.get(attribute) == target_value:
+                    result['ready'] = True
+                    result['seconds'] = round(now - start, 1)
+                    pending.discard(resource['id'])
+                elif resource.get('provisioning_percentage') is not None:
+                    progress.append(resource['provisioning_percentage'])
+            # the slowest resource decides when to poll next
+            return not pending, {'provisioning_percentage': min(progress) if progress else None}
+
+        self._poll(poll, timeout)
+        return [results[i] for i in ids]
+
+    def create_device_batches(self, hostnames: List[str], wave_size: int, timeout: int):
+        '''
+        Creates a device from the module params for each hostname with the
+        project batch endpoint, at most wave_size devices per request. When
+        the API rejects a wave for the quota or capacity of the project,
+        the waves are halved, down to single devices.
+
+        The API creates the devices of a batch asynchronously, so the
+        batches are polled until processed, and the created devices are
+        then read with one LIST of the project devices. Returns the
+        batches and the created devices. If a wave fails after others were
+        accepted, the module fails with the batches and devices created so
+        far.
+        '''
+        batches = []
+        pending = list(hostnames)
+        while pending:
+            wave = pending[:wave_size]
+            params = self.params.copy()
+            batch = api_routes.device_batch_model(dict(self.params, hostnames=wave, quantity=len(wave)))
+            params['batches'] = [batch]
+            try:
+                result = self._metal_api_call('metal_device_batches', action.CREATE, params)
+            except metal_client.ApiException as e:
+                if wave_size > 1 and _is_quota_error(e):
+                    wave_size = max(1, wave_size // 2)
+                    continue
+                msg = 'device batch for {0} failed, {1} of {2} devices were requested: {3}'.format(
+                    wave, len(hostnames) - len(pending), len(hostnames), e)
+                if not batches:
+                    raise Exception(msg)
+                self._fail_with_device_batches(msg, batches, timeout)
+            batches.extend(result['batches'])
+            pending = pending[len(wave):]
+
+        batches = self._wait_for_device_batches(batches, timeout)
+        return batches, self._list_batch_devices(batches)
+
+    def _fail_with_device_batches(self, msg, batches, timeout: int):
+        # the devices of the accepted batches exist, the play must be
+        # able to tell them from those which weren't requested
+        try:
+            batches = self._wait_for_device_batches(batches, timeout)
+            devices = self._list_batch_devices(batches)
+        except Exception as e:
+            msg = '{0}, the created devices could not be read: {1}'.format(msg, e)
+            devices = []
+        self.fail_json(msg=msg, devices=devices, batches=batches)
+
+    def _list_batch_devices(self, batches):
+        device_ids = set(i for b in batches for i in b['device_ids'])
+        # the lookup cache doesn't know the created devices yet
+        api_call = self._prepare_metal_api_call('metal_project_device', action.LIST, self.params.copy())
+        devices = [d for d in metal_api.execute(api_call) if d['id'] in device_ids]
+        params = self.params.copy()
+        self._update_lookup_cache('metal_device', lambda cache, types: [cache.created(types, params, d) for d in devices])
+        return devices
+
+    def _wait_for_device_batches(self, batches, timeout: int):
+        results = {b['id']: b for b in batches}
+        calls = {}
+
+        def poll():
+            pending = [i for i, b in results.items() if b['state'] in DEVICE_BATCH_PENDING_STATES]
+            for batch_id in pending:
+                if batch_id not in calls:
+                    calls[batch_id] = self._prepare_metal_api_call('metal_device_batch', action.GET, {'id': batch_id})
+                results[batch_id] = metal_api.execute(calls[batch_id])
+            return all(b['state'] not in DEVICE_BATCH_PENDING_STATES for b in results.values()), None
+
+        if any(b['state'] in DEVICE_BATCH_PENDING_STATES for b in batches):
+            done, _ = self._poll(poll, timeout)
+            if not done:
+                raise Exception('wait for device batches {0} timed out'.format(', '.join(results)))
+        return [results[b['id']] for b in batches]
+
     def get_hardware_reservation(self):
         params = {'id': self.params['hardware_reservation_id']}
         return self._metal_api_call('metal_hardware_reservation', action.GET, params)
 
+
+def _is_quota_error(e):
+    body = str(e.body or e.reason or '').lower()
+    return e.status in (403, 422) and any(p in body for p in QUOTA_ERROR_PHRASES)
+
+
 def update_dict(current, fetched, mutables: list):
     d = {}
     for a in mutables:
@@ -2,6 +2,8 @@
 
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
+import weakref
+
 try:
     import equinix.services.metalv1 as equinix_metal
 except ImportError:
@@ -19,362 +21,456 @@ from ansible_collections.equinix.cloud.plugins.module_utils.metal import (
 )
 
 
-def build_api_call(specs: spec_types.Specs, params: dict):
-    return spec_types.ApiCall(specs, params)
+def build_api_call(specs: spec_types.Specs, params: dict, defaults: dict = None,
+                   resource_type: spec_types.ResourceType = None, action=None,
+                   request_options: dict = None, retry_policy=None, http_cache=None):
+    return spec_types.ApiCall(specs, params, defaults, resource_type, action,
+                              request_options, retry_policy, http_cache)
 
 
-def get_routes(mpc):
+def device_batch_model(params: dict):
     """
-    This function returns a dictionary of API call configurations.
+    Returns the SDK model of one batch of a metal_device_batches request.
+
+    The SDK model requires facility, which the API doesn't (the batch is
+    placed by metro), so the params are validated with the metro in place
+    of the facility and the model is then built without it. The model
+    passes through InstancesBatchCreateInput.from_dict() unchanged.
     """
+    model_class = equinix_metal.InstancesBatchCreateInputBatchesInner
+    validated = model_class.from_dict(dict(params, facility=params.get('metro')))
+    values = {k: getattr(validated, k) for k in validated.model_fields_set if k != 'facility'}
+    return model_class.model_construct(facility=None, **values)
 
-    # we check for the presence of the equinix_metal module here, because
-    # the ApiCallConfigs use classes straight from the equinix_metal module
-    # and we prefer to fail early and hopefully into module.fail_json()
-    metal_client.raise_if_missing_equinix_metal()
 
-    return {
-        # GETTERS
-        ('metal_device', action.GET): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).find_device_by_id,
-            ),
-        ('metal_project', action.GET): spec_types.Specs(
-            equinix_metal.ProjectsApi(mpc).find_project_by_id,
-            ),
-        ('metal_ip_reservation', action.GET): spec_types.Specs(
-            equinix_metal.IPAddressesApi(mpc).find_ip_address_by_id,
-        ),
-        ('metal_ip_assignment', action.GET): spec_types.Specs(
-            equinix_metal.IPAddressesApi(mpc).find_ip_address_by_id,
-        ),
-        ('metal_ssh_key', action.GET): spec_types.Specs(
-            equinix_metal.SSHKeysApi(mpc).find_ssh_key_by_id,
-        ),
-        ('metal_hardware_reservation', action.GET): spec_types.Specs(
-            equinix_metal.HardwareReservationsApi(mpc).find_hardware_reservation_by_id,
-        ),
-        ("metal_organization", action.GET): spec_types.Specs(
-            equinix_metal.OrganizationsApi(mpc).find_organization_by_id,
-        ),
-        ("metal_vlan", action.GET): spec_types.Specs(
-            equinix_metal.VLANsApi(mpc).get_virtual_network,
-        ),
-        ("metal_connection", action.GET): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).get_interconnection,
-        ),
-        ('metal_vrf', action.GET): spec_types.Specs(
-            equinix_metal.VRFsApi(mpc).find_vrf_by_id,
-        ),
-        ("metal_gateway", action.GET): spec_types.Specs(
-            equinix_metal.MetalGatewaysApi(mpc).find_metal_gateway_by_id,
-            extra_kwargs={"include": ["ip_reservation"]},
-        ),
-        ("metal_bgp_session", action.GET): spec_types.Specs(
-            equinix_metal.BGPApi(mpc).find_bgp_session_by_id,
-        ),
-        ('metal_project_bgp_config', action.GET): spec_types.Specs(
-            equinix_metal.BGPApi(mpc).find_bgp_config_by_project,
-        ),
-        ("metal_plan", action.GET): spec_types.Specs(
-            equinix_metal.PlansApi(mpc).find_plans_by_project,
-        ),
-        ('metal_virtual_circuit', action.GET): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).get_virtual_circuit,
-        ),
-        ('metal_virtual_circuit_vrf', action.GET): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).get_virtual_circuit,
-        ),
-        ('metal_user', action.GET): spec_types.Specs(
-            equinix_metal.UsersApi(mpc).find_current_user,
-        ),
+def routes_for(resource_type: str):
+    """
+    Returns the Specs factories of a resource type, keyed by action.
+    """
+    return {a: factory for (rt, a), factory in ROUTES.items() if rt == resource_type}
 
-        # LISTERS
-        ('metal_project_device', action.LIST): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).find_project_devices_all_pages,
-            {'id': 'project_id'},
-        ),
-        ('metal_organization_device', action.LIST): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).find_organization_devices_all_pages,
-            {'id': 'organization_id'},
-        ),
-        ('metal_project', action.LIST): spec_types.Specs(
-            equinix_metal.ProjectsApi(mpc).find_projects_all_pages,
-        ),
-        ('metal_organization_project', action.LIST): spec_types.Specs(
-            equinix_metal.OrganizationsApi(mpc).find_organization_projects_all_pages,
-            {'id': 'organization_id'},
-        ),
-        ('metal_ip_reservation', action.LIST): spec_types.Specs(
-            equinix_metal.IPAddressesApi(mpc).find_ip_reservations,
-            {'id': 'project_id'},
-        ),
-        ('metal_available_ip', action.LIST): spec_types.Specs(
-            equinix_metal.IPAddressesApi(mpc).find_ip_availabilities,
-            {'id': 'reserved_ip_block_id'},
-        ),
-        ('metal_ip_assignment', action.LIST): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).find_ip_assignments,
-            {'id': 'device_id'}
-        ),
-        ('metal_ssh_key', action.LIST): spec_types.Specs(
-            equinix_metal.SSHKeysApi(mpc).find_ssh_keys,
-        ),
-        ('metal_project_ssh_key', action.LIST): spec_types.Specs(
-            equinix_metal.SSHKeysApi(mpc).find_project_ssh_keys,
-            {'id': 'project_id'}
-        ),
-        ('metal_organization', action.LIST): spec_types.Specs(
-            equinix_metal.OrganizationsApi(mpc).find_organizations_all_pages,
-            {'personal': 'personal', 'with_projects': 'with_projects'},
-        ),
-        ('metal_operating_system', action.LIST): spec_types.Specs(
-            equinix_metal.OperatingSystemsApi(mpc).find_operating_systems,
-        ),
-        ('metal_metro', action.LIST): spec_types.Specs(
-            equinix_metal.MetrosApi(mpc).find_metros,
-        ),
-        ('metal_project_hardware_reservation', action.LIST): spec_types.Specs(
-            equinix_metal.HardwareReservationsApi(mpc).find_project_hardware_reservations_all_pages,
-            {'id': 'project_id'},
-        ),
-        ('metal_vlan', action.LIST): spec_types.Specs(
-            equinix_metal.VLANsApi(mpc).find_virtual_networks,
-            {'id': 'project_id'},
-        ),
-        ('metal_connection_project', action.LIST): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).project_list_interconnections_all_pages,
-            {'id': 'project_id'},
-        ),
-        ('metal_connection_organization', action.LIST): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).organization_list_interconnections,
-            {'id': 'organization_id'},
-        ),
-        ('metal_vrf', action.LIST): spec_types.Specs(
-            equinix_metal.VRFsApi(mpc).find_vrfs,
-            {'id': 'project_id'},
-        ),
-        ('metal_gateway', action.LIST): spec_types.Specs(
-            equinix_metal.MetalGatewaysApi(mpc).find_metal_gateways_by_project,
-            {'project_id': 'project_id'},
-            extra_kwargs={"include": ["ip_reservation"]},
-        ),
-        ('metal_bgp_session', action.LIST): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).find_bgp_sessions,
-            {'id': 'device_id'},
-        ),
-        ('metal_bgp_session_by_project', action.LIST): spec_types.Specs(
-            equinix_metal.BGPApi(mpc).find_bgp_config_by_project,
-            {'id': 'project_id'},
-        ),
-        ('metal_plan', action.LIST): spec_types.Specs(
-            equinix_metal.PlansApi(mpc).find_plans,
-            {'category': 'category', 'type': 'type', 'slug': 'slug', 'include': 'include', 'exclude': 'exclude'},
-        ),
-        ('metal_virtual_circuit', action.LIST): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).list_interconnection_virtual_circuits,
-            {'connection_id': 'connection_id'},
-        ),
-        ('metal_virtual_circuit_vrf', action.LIST): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).list_interconnection_virtual_circuits,
-            {'connection_id': 'connection_id'},
-        ),
-        ('metal_port_virtual_circuit', action.LIST): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).list_interconnection_port_virtual_circuits,
-            {'connection_id': 'connection_id', 'port_id': 'port_id'},
-        ),
 
-        # DELETERS
-        ('metal_device', action.DELETE): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).delete_device,
-            ),
-        ('metal_project', action.DELETE): spec_types.Specs(
-            equinix_metal.ProjectsApi(mpc).delete_project,
-            ),
-        ('metal_ip_reservation', action.DELETE): spec_types.Specs(
-            equinix_metal.IPAddressesApi(mpc).delete_ip_address,
-        ),
-        ('metal_ip_assignment', action.DELETE): spec_types.Specs(
-            equinix_metal.IPAddressesApi(mpc).delete_ip_address,
-        ),
-        ('metal_ssh_key', action.DELETE): spec_types.Specs(
-            equinix_metal.SSHKeysApi(mpc).delete_ssh_key,
-        ),
-        ('metal_vlan', action.DELETE): spec_types.Specs(
-            equinix_metal.VLANsApi(mpc).delete_virtual_network,
-        ),
-        ('metal_connection', action.DELETE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).delete_interconnection,
-        ),
-        ('metal_vrf', action.DELETE): spec_types.Specs(
-            equinix_metal.VRFsApi(mpc).delete_vrf,
-        ),
-        ('metal_gateway', action.DELETE): spec_types.Specs(
-            equinix_metal.MetalGatewaysApi(mpc).delete_metal_gateway,
-            extra_kwargs={"include": ["ip_reservation"]},
-        ),
-        ('metal_bgp_session', action.DELETE): spec_types.Specs(
-            equinix_metal.BGPApi(mpc).delete_bgp_session,
-        ),
-        ('metal_virtual_circuit', action.DELETE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).delete_virtual_circuit,
-        ),
-        ('metal_virtual_circuit_vrf', action.DELETE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).delete_virtual_circuit,
-        ),
+# Route table, mapping (resource_type, action) to a factory of Specs. The
+# factories take an ApiInstances object and are only called when a route is
+# first used, see Routes below.
+ROUTES = {
+    # GETTERS
+    ('metal_device', action.GET): lambda api: spec_types.Specs(
+        api.DevicesApi.find_device_by_id,
+        ),
+    ('metal_project', action.GET): lambda api: spec_types.Specs(
+        api.ProjectsApi.find_project_by_id,
+        ),
+    ('metal_ip_reservation', action.GET): lambda api: spec_types.Specs(
+        api.IPAddressesApi.find_ip_address_by_id,
+    ),
+    ('metal_ip_assignment', action.GET): lambda api: spec_types.Specs(
+        api.IPAddressesApi.find_ip_address_by_id,
+    ),
+    ('metal_ssh_key', action.GET): lambda api: spec_types.Specs(
+        api.SSHKeysApi.find_ssh_key_by_id,
+    ),
+    ('metal_hardware_reservation', action.GET): lambda api: spec_types.Specs(
+        api.HardwareReservationsApi.find_hardware_reservation_by_id,
+    ),
+    ("metal_organization", action.GET): lambda api: spec_types.Specs(
+        api.OrganizationsApi.find_organization_by_id,
+    ),
+    ("metal_vlan", action.GET): lambda api: spec_types.Specs(
+        api.VLANsApi.get_virtual_network,
+    ),
+    ("metal_connection", action.GET): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.get_interconnection,
+    ),
+    ('metal_vrf', action.GET): lambda api: spec_types.Specs(
+        api.VRFsApi.find_vrf_by_id,
+    ),
+    ("metal_gateway", action.GET): lambda api: spec_types.Specs(
+        api.MetalGatewaysApi.find_metal_gateway_by_id,
+    ),
+    ("metal_bgp_session", action.GET): lambda api: spec_types.Specs(
+        api.BGPApi.find_bgp_session_by_id,
+    ),
+    ('metal_project_bgp_config', action.GET): lambda api: spec_types.Specs(
+        api.BGPApi.find_bgp_config_by_project,
+    ),
+    ("metal_plan", action.GET): lambda api: spec_types.Specs(
+        api.PlansApi.find_plans_by_project,
+    ),
+    ('metal_virtual_circuit', action.GET): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.get_virtual_circuit,
+    ),
+    ('metal_virtual_circuit_vrf', action.GET): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.get_virtual_circuit,
+    ),
+    ('metal_user', action.GET): lambda api: spec_types.Specs(
+        api.UsersApi.find_current_user,
+    ),
+    ('metal_device_batch', action.GET): lambda api: spec_types.Specs(
+        api.BatchesApi.find_batch_by_id,
+    ),
 
-        # CREATORS
-        ('metal_device', action.CREATE): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).create_device,
-            {'id': 'project_id'},
-            equinix_metal.CreateDeviceRequest,
-        ),
-        ('metal_project', action.CREATE): spec_types.Specs(
-            equinix_metal.ProjectsApi(mpc).create_project,
-            {},
-            equinix_metal.ProjectCreateFromRootInput,
-        ),
-        ('metal_organization_project', action.CREATE): spec_types.Specs(
-            equinix_metal.OrganizationsApi(mpc).create_organization_project,
-            {'id': 'organization_id'},
-            equinix_metal.ProjectCreateInput,
-            ),
-        ('metal_ip_reservation', action.CREATE): spec_types.Specs(
-            equinix_metal.IPAddressesApi(mpc).request_ip_reservation,
-            {'id': 'project_id'},
-            equinix_metal.models.RequestIPReservationRequest,
-        ),
-        ('metal_ip_assignment', action.CREATE): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).create_ip_assignment,
-            {'id': 'device_id'},
-            equinix_metal.models.IPAssignmentInput,
-        ),
-        ('metal_ssh_key', action.CREATE): spec_types.Specs(
-            equinix_metal.SSHKeysApi(mpc).create_ssh_key,
-            {},
-            equinix_metal.SSHKeyCreateInput,
-        ),
-        ('metal_project_ssh_key', action.CREATE): spec_types.Specs(
-            equinix_metal.SSHKeysApi(mpc).create_project_ssh_key,
-            {'id': 'project_id'},
-            equinix_metal.SSHKeyCreateInput,
-        ),
-        ('metal_vlan', action.CREATE): spec_types.Specs(
-            equinix_metal.VLANsApi(mpc).create_virtual_network,
-            {'id': 'project_id'},
-            equinix_metal.VirtualNetworkCreateInput,
-        ),
-        ('metal_connection_organization_dedicated', action.CREATE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).create_organization_interconnection,
-            {'id': 'organization_id'},
-            equinix_metal.DedicatedPortCreateInput,
-            equinix_metal.CreateOrganizationInterconnectionRequest,
-        ),
-        ('metal_connection_project_dedicated', action.CREATE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).create_project_interconnection,
-            {'id': 'project_id'},
-            equinix_metal.DedicatedPortCreateInput,
-            equinix_metal.CreateOrganizationInterconnectionRequest,
-        ),
-        ('metal_connection_project_vlanfabric', action.CREATE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).create_project_interconnection,
-            {'id': 'project_id'},
-            equinix_metal.VlanFabricVcCreateInput,
-            equinix_metal.CreateOrganizationInterconnectionRequest,
-        ),
-        ('metal_connection_project_vrf', action.CREATE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).create_project_interconnection,
-            {'id': 'project_id'},
-            equinix_metal.VrfFabricVcCreateInput,
-            equinix_metal.CreateOrganizationInterconnectionRequest,
-        ),
-        ('metal_vrf', action.CREATE): spec_types.Specs(
-            equinix_metal.VRFsApi(mpc).create_vrf,
-            {'id': 'project_id'},
-            equinix_metal.VrfCreateInput,
-        ),
-        ('metal_gateway', action.CREATE): spec_types.Specs(
-            equinix_metal.MetalGatewaysApi(mpc).create_metal_gateway,
-            {'project_id': 'project_id'},
-            equinix_metal.MetalGatewayCreateInput,
-            equinix_metal.CreateMetalGatewayRequest,
-            {"include": ["ip_reservation"]},
-        ),
+    # LISTERS
+    ('metal_project_device', action.LIST): lambda api: spec_types.Specs(
+        api.DevicesApi.find_project_devices_all_pages,
+        {'id': 'project_id'},
+    ),
+    ('metal_project_device_fingerprint', action.LIST): lambda api: spec_types.Specs(
+        api.DevicesApi.find_project_devices_all_pages,
+        {'id': 'project_id'},
+    ),
+    ('metal_organization_device', action.LIST): lambda api: spec_types.Specs(
+        api.DevicesApi.find_organization_devices_all_pages,
+        {'id': 'organization_id'},
+    ),
+    ('metal_project', action.LIST): lambda api: spec_types.Specs(
+        api.ProjectsApi.find_projects_all_pages,
+    ),
+    ('metal_organization_project', action.LIST): lambda api: spec_types.Specs(
+        api.OrganizationsApi.find_organization_projects_all_pages,
+        {'id': 'organization_id'},
+    ),
+    ('metal_ip_reservation', action.LIST): lambda api: spec_types.Specs(
+        api.IPAddressesApi.find_ip_reservations,
+        {'id': 'project_id'},
+    ),
+    ('metal_available_ip', action.LIST): lambda api: spec_types.Specs(
+        api.IPAddressesApi.find_ip_availabilities,
+        {'id': 'reserved_ip_block_id'},
+    ),
+    ('metal_ip_assignment', action.LIST): lambda api: spec_types.Specs(
+        api.DevicesApi.find_ip_assignments,
+        {'id': 'device_id'}
+    ),
+    ('metal_ssh_key', action.LIST): lambda api: spec_types.Specs(
+        api.SSHKeysApi.find_ssh_keys,
+    ),
+    ('metal_project_ssh_key', action.LIST): lambda api: spec_types.Specs(
+        api.SSHKeysApi.find_project_ssh_keys,
+        {'id': 'project_id'}
+    ),
+    ('metal_organization', action.LIST): lambda api: spec_types.Specs(
+        api.OrganizationsApi.find_organizations_all_pages,
+        {'personal': 'personal', 'with_projects': 'with_projects'},
+    ),
+    ('metal_operating_system', action.LIST): lambda api: spec_types.Specs(
+        api.OperatingSystemsApi.find_operating_systems,
+    ),
+    ('metal_metro', action.LIST): lambda api: spec_types.Specs(
+        api.MetrosApi.find_metros,
+    ),
+    ('metal_project_hardware_reservation', action.LIST): lambda api: spec_types.Specs(
+        api.HardwareReservationsApi.find_project_hardware_reservations_all_pages,
+        {'id': 'project_id'},
+    ),
+    ('metal_vlan', action.LIST): lambda api: spec_types.Specs(
+        api.VLANsApi.find_virtual_networks,
+        {'id': 'project_id'},
+    ),
+    ('metal_connection_project', action.LIST): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.project_list_interconnections_all_pages,
+        {'id': 'project_id'},
+    ),
+    ('metal_connection_organization', action.LIST): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.organization_list_interconnections,
+        {'id': 'organization_id'},
+    ),
+    ('metal_vrf', action.LIST): lambda api: spec_types.Specs(
+        api.VRFsApi.find_vrfs,
+        {'id': 'project_id'},
+    ),
+    ('metal_gateway', action.LIST): lambda api: spec_types.Specs(
+        api.MetalGatewaysApi.find_metal_gateways_by_project,
+        {'project_id': 'project_id'},
+    ),
+    ('metal_bgp_session', action.LIST): lambda api: spec_types.Specs(
+        api.DevicesApi.find_bgp_sessions,
+        {'id': 'device_id'},
+    ),
+    ('metal_bgp_session_by_project', action.LIST): lambda api: spec_types.Specs(
+        api.BGPApi.find_bgp_config_by_project,
+        {'id': 'project_id'},
+    ),
+    ('metal_plan', action.LIST): lambda api: spec_types.Specs(
+        api.PlansApi.find_plans,
+        {'category': 'category', 'type': 'type', 'slug': 'slug', 'include': 'include', 'exclude': 'exclude'},
+    ),
+    ('metal_virtual_circuit', action.LIST): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.list_interconnection_virtual_circuits,
+        {'connection_id': 'connection_id'},
+    ),
+    ('metal_virtual_circuit_vrf', action.LIST): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.list_interconnection_virtual_circuits,
+        {'connection_id': 'connection_id'},
+    ),
+    ('metal_port_virtual_circuit', action.LIST): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.list_interconnection_port_virtual_circuits,
+        {'connection_id': 'connection_id', 'port_id': 'port_id'},
+    ),
 
-        ('metal_bgp_session', action.CREATE): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).create_bgp_session,
-            {'id': 'device_id'},
-            equinix_metal.BGPSessionInput,
-        ),
-        ('metal_project_bgp_config', action.CREATE): spec_types.Specs(
-            equinix_metal.BGPApi(mpc).request_bgp_config,
-            {'id': 'project_id'},
-            equinix_metal.BgpConfigRequestInput,
-        ),
-        ('metal_virtual_circuit', action.CREATE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).create_interconnection_port_virtual_circuit,
-            {'connection_id': 'connection_id', 'port_id': 'port_id'},
-            equinix_metal.VlanVirtualCircuitCreateInput,
-            equinix_metal.VirtualCircuitCreateInput,
-        ),
-        ('metal_virtual_circuit_vrf', action.CREATE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).create_interconnection_port_virtual_circuit,
-            {'connection_id': 'connection_id', 'port_id': 'port_id'},
-            equinix_metal.VrfVirtualCircuitCreateInput,
-            equinix_metal.VirtualCircuitCreateInput,
-        ),
+    # DELETERS
+    ('metal_device', action.DELETE): lambda api: spec_types.Specs(
+        api.DevicesApi.delete_device,
+        ),
+    ('metal_project', action.DELETE): lambda api: spec_types.Specs(
+        api.ProjectsApi.delete_project,
+        ),
+    ('metal_ip_reservation', action.DELETE): lambda api: spec_types.Specs(
+        api.IPAddressesApi.delete_ip_address,
+    ),
+    ('metal_ip_assignment', action.DELETE): lambda api: spec_types.Specs(
+        api.IPAddressesApi.delete_ip_address,
+    ),
+    ('metal_ssh_key', action.DELETE): lambda api: spec_types.Specs(
+        api.SSHKeysApi.delete_ssh_key,
+    ),
+    ('metal_vlan', action.DELETE): lambda api: spec_types.Specs(
+        api.VLANsApi.delete_virtual_network,
+    ),
+    ('metal_connection', action.DELETE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.delete_interconnection,
+    ),
+    ('metal_vrf', action.DELETE): lambda api: spec_types.Specs(
+        api.VRFsApi.delete_vrf,
+    ),
+    ('metal_gateway', action.DELETE): lambda api: spec_types.Specs(
+        api.MetalGatewaysApi.delete_metal_gateway,
+    ),
+    ('metal_bgp_session', action.DELETE): lambda api: spec_types.Specs(
+        api.BGPApi.delete_bgp_session,
+    ),
+    ('metal_virtual_circuit', action.DELETE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.delete_virtual_circuit,
+    ),
+    ('metal_virtual_circuit_vrf', action.DELETE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.delete_virtual_circuit,
+    ),
 
+    # CREATORS
+    ('metal_device', action.CREATE): lambda api: spec_types.Specs(
+        api.DevicesApi.create_device,
+        {'id': 'project_id'},
+        equinix_metal.CreateDeviceRequest,
+    ),
+    ('metal_device_batches', action.CREATE): lambda api: spec_types.Specs(
+        api.BatchesApi.create_device_batch,
+        {'id': 'project_id'},
+        equinix_metal.InstancesBatchCreateInput,
+    ),
+    ('metal_project', action.CREATE): lambda api: spec_types.Specs(
+        api.ProjectsApi.create_project,
+        {},
+        equinix_metal.ProjectCreateFromRootInput,
+    ),
+    ('metal_organization_project', action.CREATE): lambda api: spec_types.Specs(
+        api.OrganizationsApi.create_organization_project,
+        {'id': 'organization_id'},
+        equinix_metal.ProjectCreateInput,
+        ),
+    ('metal_ip_reservation', action.CREATE): lambda api: spec_types.Specs(
+        api.IPAddressesApi.request_ip_reservation,
+        {'id': 'project_id'},
+        equinix_metal.models.RequestIPReservationRequest,
+    ),
+    ('metal_ip_assignment', action.CREATE): lambda api: spec_types.Specs(
+        api.DevicesApi.create_ip_assignment,
+        {'id': 'device_id'},
+        equinix_metal.models.IPAssignmentInput,
+    ),
+    ('metal_ssh_key', action.CREATE): lambda api: spec_types.Specs(
+        api.SSHKeysApi.create_ssh_key,
+        {},
+        equinix_metal.SSHKeyCreateInput,
+    ),
+    ('metal_project_ssh_key', action.CREATE): lambda api: spec_types.Specs(
+        api.SSHKeysApi.create_project_ssh_key,
+        {'id': 'project_id'},
+        equinix_metal.SSHKeyCreateInput,
+    ),
+    ('metal_vlan', action.CREATE): lambda api: spec_types.Specs(
+        api.VLANsApi.create_virtual_network,
+        {'id': 'project_id'},
+        equinix_metal.VirtualNetworkCreateInput,
+    ),
+    ('metal_connection_organization_dedicated', action.CREATE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.create_organization_interconnection,
+        {'id': 'organization_id'},
+        equinix_metal.DedicatedPortCreateInput,
+        equinix_metal.CreateOrganizationInterconnectionRequest,
+    ),
+    ('metal_connection_project_dedicated', action.CREATE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.create_project_interconnection,
+        {'id': 'project_id'},
+        equinix_metal.DedicatedPortCreateInput,
+        equinix_metal.CreateOrganizationInterconnectionRequest,
+    ),
+    ('metal_connection_project_vlanfabric', action.CREATE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.create_project_interconnection,
+        {'id': 'project_id'},
+        equinix_metal.VlanFabricVcCreateInput,
+        equinix_metal.CreateOrganizationInterconnectionRequest,
+    ),
+    ('metal_connection_project_vrf', action.CREATE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.create_project_interconnection,
+        {'id': 'project_id'},
+        equinix_metal.VrfFabricVcCreateInput,
+        equinix_metal.CreateOrganizationInterconnectionRequest,
+    ),
+    ('metal_vrf', action.CREATE): lambda api: spec_types.Specs(
+        api.VRFsApi.create_vrf,
+        {'id': 'project_id'},
+        equinix_metal.VrfCreateInput,
+    ),
+    ('metal_gateway', action.CREATE): lambda api: spec_types.Specs(
+        api.MetalGatewaysApi.create_metal_gateway,
+        {'project_id': 'project_id'},
+        equinix_metal.MetalGatewayCreateInput,
+        equinix_metal.CreateMetalGatewayRequest,
+    ),
 
-        # UPDATERS
-        ('metal_device', action.UPDATE): spec_types.Specs(
-            equinix_metal.DevicesApi(mpc).update_device,
-            {},
-            equinix_metal.DeviceUpdateInput,
-        ),
-        ('metal_project', action.UPDATE): spec_types.Specs(
-            equinix_metal.ProjectsApi(mpc).update_project,
-            {},
-            equinix_metal.ProjectUpdateInput,
-        ),
-        ('metal_ip_reservation', action.UPDATE): spec_types.Specs(
-            equinix_metal.IPAddressesApi(mpc).update_ip_address,
-            {},
-            equinix_metal.models.IPAssignmentUpdateInput,
-        ),
-        ('metal_ssh_key', action.UPDATE): spec_types.Specs(
-            equinix_metal.SSHKeysApi(mpc).update_ssh_key,
-            {},
-            equinix_metal.SSHKeyInput,
-        ),
-        ('metal_connection', action.UPDATE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).update_interconnection,
-            {},
-            equinix_metal.InterconnectionUpdateInput,
-        ),
-        ('metal_hardware_reservation', action.UPDATE): spec_types.Specs(
-            equinix_metal.HardwareReservationsApi(mpc).move_hardware_reservation,
-            {},
-            equinix_metal.MoveHardwareReservationRequest,
-        ),
-        ('metal_vrf', action.UPDATE): spec_types.Specs(
-            equinix_metal.VRFsApi(mpc).update_vrf,
-            {},
-            equinix_metal.VrfUpdateInput,
-        ),
-        ('metal_bgp_session', action.UPDATE): spec_types.Specs(
-            equinix_metal.BGPApi(mpc).update_bgp_session,
-            {},
-            equinix_metal.BGPSessionInput,
-        ),
-        ('metal_virtual_circuit', action.UPDATE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).update_virtual_circuit,
-            {},
-            equinix_metal.VlanVirtualCircuitUpdateInput,
-            equinix_metal.VirtualCircuitUpdateInput,
-        ),
-        ('metal_virtual_circuit_vrf', action.UPDATE): spec_types.Specs(
-            equinix_metal.InterconnectionsApi(mpc).update_virtual_circuit,
-            {},
-            equinix_metal.VrfVirtualCircuitUpdateInput,
-            equinix_metal.VirtualCircuitUpdateInput,
-        ),
-    }
+    ('metal_bgp_session', action.CREATE): lambda api: spec_types.Specs(
+        api.DevicesApi.create_bgp_session,
+        {'id': 'device_id'},
+        equinix_metal.BGPSessionInput,
+    ),
+    ('metal_project_bgp_config', action.CREATE): lambda api: spec_types.Specs(
+        api.BGPApi.request_bgp_config,
+        {'id': 'project_id'},
+        equinix_metal.BgpConfigRequestInput,
+    ),
+    ('metal_virtual_circuit', action.CREATE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.create_interconnection_port_virtual_circuit,
+        {'connection_id': 'connection_id', 'port_id': 'port_id'},
+        equinix_metal.VlanVirtualCircuitCreateInput,
+        equinix_metal.VirtualCircuitCreateInput,
+    ),
+    ('metal_virtual_circuit_vrf', action.CREATE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.create_interconnection_port_virtual_circuit,
+        {'connection_id': 'connection_id', 'port_id': 'port_id'},
+        equinix_metal.VrfVirtualCircuitCreateInput,
+        equinix_metal.VirtualCircuitCreateInput,
+    ),
+
+
+    # UPDATERS
+    ('metal_device', action.UPDATE): lambda api: spec_types.Specs(
+        api.DevicesApi.update_device,
+        {},
+        equinix_metal.DeviceUpdateInput,
+    ),
+    ('metal_project', action.UPDATE): lambda api: spec_types.Specs(
+        api.ProjectsApi.update_project,
+        {},
+        equinix_metal.ProjectUpdateInput,
+    ),
+    ('metal_ip_reservation', action.UPDATE): lambda api: spec_types.Specs(
+        api.IPAddressesApi.update_ip_address,
+        {},
+        equinix_metal.models.IPAssignmentUpdateInput,
+    ),
+    ('metal_ssh_key', action.UPDATE): lambda api: spec_types.Specs(
+        api.SSHKeysApi.update_ssh_key,
+        {},
+        equinix_metal.SSHKeyInput,
+    ),
+    ('metal_connection', action.UPDATE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.update_interconnection,
+        {},
+        equinix_metal.InterconnectionUpdateInput,
+    ),
+    ('metal_hardware_reservation', action.UPDATE): lambda api: spec_types.Specs(
+        api.HardwareReservationsApi.move_hardware_reservation,
+        {},
+        equinix_metal.MoveHardwareReservationRequest,
+    ),
+    ('metal_vrf', action.UPDATE): lambda api: spec_types.Specs(
+        api.VRFsApi.update_vrf,
+        {},
+        equinix_metal.VrfUpdateInput,
+    ),
+    ('metal_bgp_session', action.UPDATE): lambda api: spec_types.Specs(
+        api.BGPApi.update_bgp_session,
+        {},
+        equinix_metal.BGPSessionInput,
+    ),
+    ('metal_virtual_circuit', action.UPDATE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.update_virtual_circuit,
+        {},
+        equinix_metal.VlanVirtualCircuitUpdateInput,
+        equinix_metal.VirtualCircuitUpdateInput,
+    ),
+    ('metal_virtual_circuit_vrf', action.UPDATE): lambda api: spec_types.Specs(
+        api.InterconnectionsApi.update_virtual_circuit,
+        {},
+        equinix_metal.VrfVirtualCircuitUpdateInput,
+        equinix_metal.VirtualCircuitUpdateInput,
+    ),
+}
+
+
+class ApiInstances(object):
+    """
+    Lazily constructed equinix_metal API objects for one client, so that
+    e.g. all DevicesApi routes share one DevicesApi(mpc) instance.
+    """
+
+    def __init__(self, mpc):
+        self.mpc = mpc
+
+    def __getattr__(self, name):
+        api = getattr(equinix_metal, name)(self.mpc)
+        setattr(self, name, api)
+        return api
+
+
+class Routes(object):
+    """
+    Route registry of one client. Specs are built on first lookup and
+    reused for all subsequent calls.
+    """
+
+    def __init__(self, mpc):
+        self.api = ApiInstances(mpc)
+        self._specs = {}
+
+    def get(self, key, default=None):
+        specs = self._specs.get(key)
+        if specs is None:
+            factory = ROUTES.get(key)
+            if factory is None:
+                return default
+            specs = factory(self.api)
+            self._specs[key] = specs
+        return specs
+
+    def resolve(self, resource_type: spec_types.ResourceType, action):
+        key = (resource_type.name, action)
+        specs = self._specs.get(key)
+        if specs is None:
+            factory = resource_type.routes.get(action)
+            if factory is None:
+                return None
+            specs = factory(self.api)
+            self._specs[key] = specs
+        return specs
+
+
+_ROUTES_BY_CLIENT = weakref.WeakKeyDictionary()
+
+
+def get_routes(mpc):
+    """
+    This function returns the route registry for the given client. The
+    registry is created once per client.
+    """
+
+    # we check for the presence of the equinix_metal module here, because
+    # the ApiCallConfigs use classes straight from the equinix_metal module
+    # and we prefer to fail early and hopefully into module.fail_json()
+    metal_client.raise_if_missing_equinix_metal()
+
+    routes = _ROUTES_BY_CLIENT.get(mpc)
+    if routes is None:
+        routes = Routes(mpc)
+        _ROUTES_BY_CLIENT[mpc] = routes
+    return routes
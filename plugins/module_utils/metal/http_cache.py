@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# directory of the on-disk cache, off by default
+DIR_ENVVARS = ['METAL_API_CACHE_DIR']
+
+
+class ConditionalCache(object):
+    """
+    Cache of GET responses for conditional requests.
+
+    Responses with an ETag or Last-Modified header are kept with their
+    decoded JSON body. The next GET of the same request sends the
+    validators (see request_headers()), and if the API answers 304 Not
+    Modified, the kept body is used instead of downloading and decoding
+    it again, e.g. when a waiter polls a resource.
+
+    Entries are kept in memory for the life of the process and, if
+    directory is set, in files there too, so that later module runs can
+    revalidate them. Response bodies may hold secrets (e.g. root
+    passwords), so the files are only readable by their owner.
+    """
+
+    def __init__(self, namespace: str, directory: str = None):
+        # namespace separates API tokens and URLs, the same request may
+        # return different resources to different users
+        self.namespace = namespace
+        self.directory = directory
+        self.hits = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def key(self, func_name: str, kwargs: dict) -> str:
+        request = json.dumps([self.namespace, func_name, kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        entry = self._memory.get(key)
+        if entry is None and self.directory is not None:
+            entry = self._read(key)
+            if entry is not None:
+                self._memory[key] = entry
+        return entry
+
+    def put(self, key: str, headers, body):
+        """
+        Keeps the body of a response if the headers have validators, or
+        forgets the stale entry if they don't.
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if etag is None and last_modified is None:
+            if self._memory.pop(key, None) is not None and self.directory is not None:
+                self._remove(key)
+            return
+        entry = {'etag': etag, 'last_modified': last_modified, 'body': body}
+        self._memory[key] = entry
+        if self.directory is not None:
+            self._write(key, entry)
+
+    def add_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    @staticmethod
+    def request_headers(entry) -> dict:
+        headers = {}
+        if entry is not None:
+            if entry.get('etag') is not None:
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified') is not None:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def _read(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key, entry):
+        # written to a temporary file and renamed, so that concurrent
+        # module runs never read a partial entry
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            # the cache is an optimization, a read-only or full disk
+            # mustn't fail the API call
+            pass
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+def namespace(api_token: str, api_url: str) -> str:
+    return hashlib.sha256('{0} {1}'.format(api_token, api_url).encode('utf-8')).hexdigest()
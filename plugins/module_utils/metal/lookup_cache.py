@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+FILE_NAME = 'lookups.sqlite'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS lists (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    items TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+'''
+
+
+class LookupCache(object):
+    """
+    LIST results used to look up resources, shared by all module runs on
+    the host through an sqlite database.
+
+    Looking up resources one by one (e.g. metal_device in a loop over
+    hostnames) lists the same resources again and again. With the cache,
+    the list is fetched once per ttl seconds and the writes done in the
+    meantime are applied to the cached lists (see created(), updated()
+    and deleted()), so that a loop of N writes costs one LIST.
+
+    Every cached list remembers its scope, the module params which were
+    passed to the LIST call (e.g. project_id). A created resource is added
+    to the lists of which it matches the scope, lists of related resource
+    types with a scope the write params don't tell are dropped. Changes
+    made outside of the modules are only seen after ttl.
+    """
+
+    def __init__(self, namespace: str, path: str, ttl: float, clock=time.time):
+        # namespace separates API tokens and URLs, see http_cache.namespace()
+        self.namespace = namespace
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+            # forks wait for each other's writes instead of failing
+            self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._db.execute(_SCHEMA)
+        return self._db
+
+    def key(self, resource_type: str, kwargs: dict) -> str:
+        request = json.dumps([resource_type, kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """
+        Returns the cached list under key if it is younger than ttl, or
+        None.
+        """
+        row = self._connect().execute(
+            'SELECT stored_at, items FROM lists WHERE namespace = ? AND key = ?',
+            (self.namespace, key)).fetchone()
+        if row is None or not 0 <= self.clock() - row[0] < self.ttl:
+            return None
+        return json.loads(row[1])
+
+    def put(self, key: str, resource_type: str, scope: dict, items: list):
+        try:
+            items_json = json.dumps(items)
+        except (TypeError, ValueError):
+            # not cacheable
+            return
+        self._connect().execute(
+            'INSERT OR REPLACE INTO lists VALUES (?, ?, ?, ?, ?, ?)',
+            (self.namespace, key, resource_type, json.dumps(scope, sort_keys=True), self.clock(), items_json))
+
+    def created(self, resource_types, params: dict, resource: dict):
+        """
+        Adds a created resource to the cached lists of resource_types
+        whose scope matches the params of the create call.
+        """
+        def patch(scope, items):
+            if any(params.get(k) is None for k in scope):
+                return None
+            if any(params.get(k) != v for k, v in scope.items()):
+                return items
+            return [i for i in items if i.get('id') != resource.get('id')] + [resource]
+        self._patch(resource_types, patch)
+
+    def updated(self, resource_types, resource: dict):
+        def patch(scope, items):
+            return [resource if i.get('id') == resource.get('id') else i for i in items]
+        self._patch(resource_types, patch)
+
+    def deleted(self, resource_types, resource_id: str):
+        def patch(scope, items):
+            return [i for i in items if i.get('id') != resource_id]
+        self._patch(resource_types, patch)
+
+    def _patch(self, resource_types, patch):
+        # patch(scope, items) returns the new items, or None to drop the
+        # list. The transaction keeps concurrent writers from losing
+        # each other's patches.
+        db = self._connect()
+        marks = ', '.join('?' * len(resource_types))
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            rows = db.execute(
+                'SELECT key, scope, items FROM lists WHERE namespace = ? AND resource_type IN ({0})'.format(marks),
+                [self.namespace] + list(resource_types)).fetchall()
+            for key, scope, items in rows:
+                try:
+                    new_items = patch(json.loads(scope), json.loads(items))
+                    if new_items is not None:
+                        new_items = json.dumps(new_items)
+                except (TypeError, ValueError):
+                    new_items = None
+                if new_items is None:
+                    db.execute('DELETE FROM lists WHERE namespace = ? AND key = ?', (self.namespace, key))
+                else:
+                    db.execute('UPDATE lists SET items = ? WHERE namespace = ? AND key = ?',
+                               (new_items, self.namespace, key))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
@@ -6,22 +6,42 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
+import inspect
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
 from ansible_collections.equinix.cloud.plugins.module_utils import (
+    action,
     utils,
 )
 
 from ansible_collections.equinix.cloud.plugins.module_utils.metal import (
     metal_client,
     api_routes,
+    spec_types,
 )
 
+
 def ip_count_from_mask(mask: int):
     return 2 ** (32 - mask)
 
+
+def reads(*paths):
+    """
+    Declares which response attributes an attribute getter reads, for
+    needed_attributes(). Paths are dotted like in the attribute maps.
+    """
+    def decorate(getter):
+        getter.reads = paths
+        return getter
+    return decorate
+
+
 def optional(key: str):
-    return lambda resource: utils.dict_get(resource, key)
+    return reads(key)(lambda resource: utils.dict_get(resource, key))
 
 
+@reads('metro.code', 'facility.metro.code')
 def find_metro(resource):
     m = utils.dict_get(resource, 'metro.code')
     if m is not None:
@@ -31,24 +51,28 @@ def find_metro(resource):
 
 
 def optional_str(key: str):
-    return lambda resource: resource.get(key, '')
+    return reads(key)(lambda resource: resource.get(key, ''))
 
 
 def optional_bool(key: str):
-    return lambda resource: resource.get(key, False)
+    return reads(key)(lambda resource: resource.get(key, False))
 
 
 def optional_float(key: str, default=0.0):
-    return lambda resource: resource.get(key, default)
+    return reads(key)(lambda resource: resource.get(key, default))
+
 
 def cidr_to_quantity(key: str):
-    return lambda resource: ip_count_from_mask(resource.get(key))
+    return reads(key)(lambda resource: ip_count_from_mask(resource.get(key)))
 
 
+@reads('ip_addresses')
 def ip_address_getter(resource: dict):
     pick_keys = ['address', 'address_family', 'public']
     return [dict((k, ip[k]) for k in pick_keys) for ip in resource.get('ip_addresses', [])]
 
+
+@reads('network_ports')
 def network_ports_getter(resource: dict):
     ports = resource.get('network_ports')
     result = []
@@ -78,10 +102,16 @@ def network_ports_getter(resource: dict):
     return result
 
 
+@reads('projects.href')
 def extract_ids_from_projects_hrefs(resource: dict):
     return [href_to_id(p['href']) for p in resource.get('projects', [])]
 
 
+@reads('devices.href')
+def extract_ids_from_devices_hrefs(resource: dict):
+    return [href_to_id(d['href']) for d in resource.get('devices') or []]
+
+
 # Following are the mappings of the API response attributes to the
 # Ansible module attributes. The values are either a string with the
 # attribute name or a function which takes the resource dict and returns
@@ -101,9 +131,11 @@ METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP = {
     'locked': 'locked',
     'metal_state': optional_str('state'),
     'metro': 'metro.code',
+    'network_frozen': optional_bool('network_frozen'),
     'operating_system': 'operating_system.slug',
     'plan': 'plan.slug',
     'project_id': 'project.id',
+    'provisioning_percentage': optional_float('provisioning_percentage', None),
     'spot_instance': optional_bool('spot_instance'),
     'spot_price_max': optional_float('spot_price_max'),
     'ssh_keys': 'ssh_keys',
@@ -166,6 +198,34 @@ METAL_VRF_RESPONSE_ATTRIBUTE_MAP = {
     'ip_ranges': 'ip_ranges',
 }
 
+# what tells whether a device changed, without its nested objects, see
+# the incremental refresh of the metal_device inventory
+METAL_DEVICE_FINGERPRINT_ATTRIBUTE_MAP = {
+    'id': 'id',
+    'metal_state': 'state',
+    'updated_at': 'updated_at',
+}
+
+METAL_DEVICE_BATCH_RESPONSE_ATTRIBUTE_MAP = {
+    'id': 'id',
+    'state': 'state',
+    'quantity': optional('quantity'),
+    'device_ids': extract_ids_from_devices_hrefs,
+    'error_messages': optional('error_messages'),
+}
+
+
+@reads('batches')
+def device_batches_getter(resource: dict):
+    mapper = get_compiled_mapper(METAL_DEVICE_BATCH_RESPONSE_ATTRIBUTE_MAP)
+    return [mapper(b) for b in resource.get('batches') or []]
+
+
+# batch create responses list the batches, one per batch of the request
+METAL_DEVICE_BATCHES_RESPONSE_ATTRIBUTE_MAP = {
+    'batches': device_batches_getter,
+}
+
 METAL_USER_RESPONSE_ATTRIBUTE_MAP = {
     'avatar_thumb_url': 'avatar_thumb_url',
     'avatar_url': 'avatar_url',
@@ -187,27 +247,8 @@ METAL_USER_RESPONSE_ATTRIBUTE_MAP = {
     'updated_at': 'updated_at'
 }
 
-LIST_KEYS = [
-    'projects',
-    'devices',
-    'ip_addresses',
-    'ssh_keys',
-    'metros',
-    'operating_systems',
-    'hardware_reservations',
-    'organizations',
-    'virtual_networks',
-    'interconnections',
-    'vrfs',
-    'metal_gateways',
-    'bgp_sessions',     # metal_bgp_session
-    'sessions',         # metal_bgp_session_info
-    'plans',
-    'virtual_circuits',
-    'users',
-]
-
 
+@reads('address', 'cidr')
 def get_assignment_address(resource: dict):
     addr = resource.get('address')
     cidr = resource.get('cidr')
@@ -284,6 +325,8 @@ METAL_CONNECTION_RESPONSE_ATTRIBUTE_MAP = {
     'service_tokens': optional('service_tokens')
 }
 
+
+@reads('ip_reservation')
 def private_ipv4_subnet_size(resource: dict):
     """
     Computes the private_ipv4_subnet_size from the ip_reservation.cidr field in the API response.
@@ -365,94 +408,501 @@ METAL_VIRTUAL_CIRCUIT_RESPONSE_ATTRIBUTE_MAP = {
 }
 
 
+def _resource_type(name, attribute_map, list_key=None, include=None, exclude=None, lookup_filters=None,
+                   stricter_lookup_filters=None):
+    return spec_types.ResourceType(
+        name,
+        attribute_map,
+        list_key=list_key,
+        include=include,
+        exclude=exclude,
+        routes=api_routes.routes_for(name),
+        lookup_filters=lookup_filters,
+        stricter_lookup_filters=stricter_lookup_filters,
+    )
+
+
+def _registry(*resource_types):
+    return {rt.name: rt for rt in resource_types}
+
+
+# Registry of all resource types known to metal_api.call(). Every resource
+# type lists its response attribute map and, for resource types with a LIST
+# route, the key of the response attribute which holds the resources.
+# lookup_filters are the LIST arguments used by EquinixModule lookups. The
+# tag filter is an exact match, the hostname and name filters are partial
+# matches. The search and query filters of SSH keys are not documented to
+# match whole keys, so they are listed in stricter_lookup_filters and an
+# empty filtered LIST is checked against the full LIST, rather than
+# creating a duplicate key.
+
+DEVICE_LOOKUP_FILTERS = {'hostname': 'hostname', 'tags': 'tag'}
+
+RESOURCE_TYPES = _registry(
+    _resource_type('metal_device', METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_project_device', METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP, 'devices',
+                   lookup_filters=DEVICE_LOOKUP_FILTERS),
+    _resource_type('metal_organization_device', METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP, 'devices',
+                   lookup_filters=DEVICE_LOOKUP_FILTERS),
+    _resource_type('metal_project_device_fingerprint', METAL_DEVICE_FINGERPRINT_ATTRIBUTE_MAP, 'devices'),
+    _resource_type('metal_device_batch', METAL_DEVICE_BATCH_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_device_batches', METAL_DEVICE_BATCHES_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_project', METAL_PROJECT_RESPONSE_ATTRIBUTE_MAP, 'projects',
+                   lookup_filters={'name': 'name'}),
+    _resource_type('metal_organization_project', METAL_PROJECT_RESPONSE_ATTRIBUTE_MAP, 'projects',
+                   lookup_filters={'name': 'name'}),
+    _resource_type('metal_ip_reservation', METAL_IP_RESERVATION_RESPONSE_ATTRIBUTE_MAP, 'ip_addresses'),
+    # available IPs are plain strings, they are returned without mapping
+    _resource_type('metal_available_ip', None, 'available'),
+    _resource_type('metal_ip_assignment', METAL_IP_ASSIGNMENT_RESPONSE_ATTRIBUTE_MAP, 'ip_addresses'),
+    _resource_type('metal_ssh_key', METAL_SSH_KEY_RESPONSE_ATTRIBUTE_MAP, 'ssh_keys',
+                   lookup_filters={'key': 'search'},
+                   stricter_lookup_filters=['key']),
+    _resource_type('metal_project_ssh_key', METAL_SSH_KEY_RESPONSE_ATTRIBUTE_MAP, 'ssh_keys',
+                   lookup_filters={'key': 'query'},
+                   stricter_lookup_filters=['key']),
+    _resource_type('metal_operating_system', METAL_OPERATING_SYSTEM_RESPONSE_ATTRIBUTE_MAP, 'operating_systems'),
+    _resource_type('metal_metro', METAL_METRO_RESPONSE_ATTRIBUTE_MAP, 'metros'),
+    _resource_type('metal_hardware_reservation', METAL_HARDWARE_RESERVATION_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_project_hardware_reservation', METAL_HARDWARE_RESERVATION_RESPONSE_ATTRIBUTE_MAP, 'hardware_reservations'),
+    _resource_type('metal_connection', METAL_CONNECTION_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_connection_project', METAL_CONNECTION_RESPONSE_ATTRIBUTE_MAP, 'interconnections'),
+    _resource_type('metal_connection_organization', METAL_CONNECTION_RESPONSE_ATTRIBUTE_MAP, 'interconnections'),
+    _resource_type('metal_connection_project_dedicated', METAL_CONNECTION_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_connection_organization_dedicated', METAL_CONNECTION_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_connection_project_vlanfabric', METAL_CONNECTION_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_connection_project_vrf', METAL_CONNECTION_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_organization', METAL_ORGANIZATION_RESPONSE_ATTRIBUTE_MAP, 'organizations'),
+    _resource_type('metal_vlan', VLAN_RESPONSE_ATTRIBUTE_MAP, 'virtual_networks'),
+    _resource_type('metal_vrf', METAL_VRF_RESPONSE_ATTRIBUTE_MAP, 'vrfs'),
+    _resource_type('metal_gateway', METAL_GATEWAY_RESPONSE_ATTRIBUTE_MAP, 'metal_gateways', include=['ip_reservation']),
+    _resource_type('metal_gateway_vrf', METAL_GATEWAY_RESPONSE_ATTRIBUTE_MAP, 'metal_gateways', include=['ip_reservation']),
+    _resource_type('metal_bgp_session', METAL_BGP_SESSION_RESPONSE_ATTRIBUTE_MAP, 'bgp_sessions'),
+    _resource_type('metal_bgp_session_by_project', METAL_BGP_SESSION_RESPONSE_ATTRIBUTE_MAP, 'sessions'),
+    _resource_type('metal_project_bgp_config', METAL_PROJECT_BGP_CONFIG_RESPONSE_ATTRIBUTE_MAP),
+    _resource_type('metal_plan', METAL_PLAN_RESPONSE_ATTRIBUTE_MAP, 'plans'),
+    _resource_type('metal_virtual_circuit', METAL_VIRTUAL_CIRCUIT_RESPONSE_ATTRIBUTE_MAP, 'virtual_circuits'),
+    _resource_type('metal_virtual_circuit_vrf', METAL_VIRTUAL_CIRCUIT_RESPONSE_ATTRIBUTE_MAP, 'virtual_circuits'),
+    _resource_type('metal_port_virtual_circuit', METAL_VIRTUAL_CIRCUIT_RESPONSE_ATTRIBUTE_MAP, 'virtual_circuits'),
+    _resource_type('metal_user', METAL_USER_RESPONSE_ATTRIBUTE_MAP),
+)
+
+
+def get_resource_type(resource_type):
+    """
+    Returns the registered ResourceType for the given resource type name.
+    ResourceType objects, e.g. from projected_resource_type(), are returned
+    as they are.
+    """
+    if isinstance(resource_type, spec_types.ResourceType):
+        return resource_type
+    rt = RESOURCE_TYPES.get(resource_type)
+    if rt is None:
+        raise NotImplementedError("No mapper for resource type %s" % resource_type)
+    return rt
+
+
+def projected_resource_type(resource_type, attributes):
+    """
+    Returns a resource type like the registered one, whose attribute map
+    has only the given attributes. Its API calls exclude the nested
+    objects which only the other attributes read (see default_exclude()),
+    and its responses are mapped without the getters of the others.
+    """
+    rt = get_resource_type(resource_type)
+    unknown = set(attributes) - set(rt.attribute_map)
+    if unknown:
+        raise ValueError("unknown attributes of {0}: {1}".format(rt.name, ', '.join(sorted(unknown))))
+    attribute_map = {k: v for k, v in rt.attribute_map.items() if k in attributes}
+    # derived excludes and page sizes are kept by name
+    name = '{0}[{1}]'.format(rt.name, ','.join(attribute_map))
+    return spec_types.ResourceType(name, attribute_map, rt.list_key, rt.include, rt.exclude,
+                                   rt.routes, rt.lookup_filters, rt.stricter_lookup_filters)
+
+
+def related_resource_types(resource_type):
+    """
+    Returns the names of the resource types with the same response
+    attribute map as the given one, which are the same resources in
+    different scopes, e.g. metal_device and metal_project_device.
+    """
+    attribute_map = get_resource_type(resource_type).attribute_map
+    if attribute_map is None:
+        return [resource_type]
+    return [rt.name for rt in RESOURCE_TYPES.values() if rt.attribute_map is attribute_map]
+
+
 def get_attribute_mapper(resource_type):
     """
     Returns attribute mapper for the given resource type.
     """
-    device_resources = set(['metal_device', 'metal_project_device'])
-    project_resources = set(['metal_project', 'metal_organization_project'])
-    ip_reservation_resources = set(['metal_ip_reservation', 'metal_available_ip'])
-    ip_assignment_resources = set(['metal_ip_assignment'])
-    ssh_key_resources = set(['metal_ssh_key', 'metal_project_ssh_key'])
-    hardware_reservation_resources = set(['metal_project_hardware_reservation', 'metal_hardware_reservation'])
-    vlan_resources = set(["metal_vlan"])
-    connection_resources = set(['metal_connection', 'metal_connection_project', 'metal_connection_organization',
-                                'metal_connection_project_dedicated', 'metal_connection_organization_dedicated',
-                                'metal_connection_project_vlanfabric', 'metal_connection_project_vrf'])
-    vrf_resources = set(['metal_vrf'])
-    gateway_resources = set(["metal_gateway", "metal_gateway_vrf"])
-    bgp_resources = {'metal_bgp_session', 'metal_bgp_session_by_project'}
-    project_bgp_config_resources = {'metal_project_bgp_config'}
-    plan_resources = set(["metal_plan"])
-    virtual_circuit_resources = set(["metal_virtual_circuit", "metal_virtual_circuit_vrf"])
-    if resource_type in device_resources:
-        return METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in project_resources:
-        return METAL_PROJECT_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in ip_reservation_resources:
-        return METAL_IP_RESERVATION_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in ip_assignment_resources:
-        return METAL_IP_ASSIGNMENT_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in ssh_key_resources:
-        return METAL_SSH_KEY_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type == 'metal_operating_system':
-        return METAL_OPERATING_SYSTEM_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type == 'metal_metro':
-        return METAL_METRO_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in hardware_reservation_resources:
-        return METAL_HARDWARE_RESERVATION_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in connection_resources:
-        return METAL_CONNECTION_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type == 'metal_organization':
-        return METAL_ORGANIZATION_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in vlan_resources:
-        return VLAN_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in vrf_resources:
-        return METAL_VRF_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in gateway_resources:
-        return METAL_GATEWAY_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in bgp_resources:
-        return METAL_BGP_SESSION_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in project_bgp_config_resources:
-        return METAL_PROJECT_BGP_CONFIG_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in plan_resources:
-        return METAL_PLAN_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type in virtual_circuit_resources:
-        return METAL_VIRTUAL_CIRCUIT_RESPONSE_ATTRIBUTE_MAP
-    elif resource_type == 'metal_user':
-        return METAL_USER_RESPONSE_ATTRIBUTE_MAP
-    else:
-        raise NotImplementedError("No mapper for resource type %s" % resource_type)
+    return get_resource_type(resource_type).attribute_map
 
 
-def call(resource_type, action, equinix_metal_client, params={}):
+# attributes of nested objects which remain in excluded objects: the API
+# returns their href, and ids are populated from hrefs
+REFERENCE_ATTRIBUTES = frozenset(['id', 'href'])
+
+# request params which select the nested objects in responses
+PROJECTION_PARAMS = ('include', 'exclude')
+
+
+def needed_attributes(attribute_map):
     """
-    This function wraps the API call and returns the response.
+    Returns the top-level response attributes which the attribute map
+    reads, mapped to True if the whole attribute is needed, or to False if
+    only its id is. Returns None if the map has getters which don't declare
+    what they read (see reads()), or no map at all.
+    """
+    if attribute_map is None:
+        return None
+    needed = {}
+    for v in attribute_map.values():
+        if callable(v):
+            paths = getattr(v, 'reads', None)
+            if paths is None:
+                return None
+        else:
+            paths = (v,)
+        for path in paths:
+            attr, _, rest = path.partition('.')
+            needed[attr] = needed.get(attr, False) or rest not in REFERENCE_ATTRIBUTES
+    return needed
+
+
+def _model_class(annotation):
+    # the SDK model class in a field annotation like Optional[List[Device]]
+    if hasattr(annotation, 'model_fields'):
+        return annotation
+    for arg in typing.get_args(annotation):
+        model_class = _model_class(arg)
+        if model_class is not None:
+            return model_class
+    return None
+
+
+def derive_exclude(attribute_map, model_class):
+    """
+    Returns the nested objects of the SDK model class which the attribute
+    map doesn't read, or reads only the id of. Excluding them in requests
+    makes the API return just their hrefs.
+    """
+    needed = needed_attributes(attribute_map)
+    fields = getattr(model_class, 'model_fields', None)
+    # oneOf models wrap the actual resource, leave them alone
+    if needed is None or fields is None or 'actual_instance' in fields:
+        return []
+    exclude = []
+    for name, field in fields.items():
+        nested = _model_class(field.annotation)
+        # objects which are only an href already
+        if nested is None or set(nested.model_fields) == {'href'}:
+            continue
+        attr = field.alias or name
+        if not needed.get(attr):
+            exclude.append(attr)
+    return exclude
+
+
+def _response_model_class(resource_type, api_action, conf):
+    model_class = inspect.signature(conf.func).return_annotation
+    field = getattr(model_class, 'model_fields', {}).get(resource_type.list_key)
+    if api_action == action.LIST:
+        return _model_class(field.annotation) if field is not None else None
+    if field is not None:
+        # a list response mapped as one resource, don't guess
+        return None
+    return model_class
+
+
+# derived default excludes, keyed by (resource type name, action)
+_DEFAULT_EXCLUDES = {}
+
+
+def default_exclude(resource_type, api_action, conf):
+    """
+    Returns the nested objects excluded by default from responses to the
+    API call of the resource type and action, see derive_exclude().
+    """
+    key = (resource_type.name, api_action)
+    exclude = _DEFAULT_EXCLUDES.get(key)
+    if exclude is None:
+        exclude = derive_exclude(resource_type.attribute_map,
+                                 _response_model_class(resource_type, api_action, conf))
+        _DEFAULT_EXCLUDES[key] = exclude
+    return exclude
+
+
+# maximum per_page of the API
+MAX_PAGE_SIZE = 1000
+
+# Default page sizes aim at pages of about PAGE_BUDGET response attributes.
+# Nested objects returned in full are counted as NESTED_OBJECT_WEIGHT
+# attributes.
+PAGE_BUDGET = 20000
+NESTED_OBJECT_WEIGHT = 10
+MIN_PAGE_SIZE = 20
+
+
+def derive_page_size(model_class, exclude):
+    """
+    Returns per_page for listing resources of the SDK model class, from
+    the estimated size of a resource when the nested objects in exclude
+    are excluded. Returns None if the size can't be estimated.
+    """
+    fields = getattr(model_class, 'model_fields', None)
+    if fields is None or 'actual_instance' in fields:
+        return None
+    size = 0
+    for name, field in fields.items():
+        nested = _model_class(field.annotation)
+        if nested is None or set(nested.model_fields) == {'href'} or (field.alias or name) in exclude:
+            size += 1
+        else:
+            size += NESTED_OBJECT_WEIGHT
+    return max(MIN_PAGE_SIZE, min(MAX_PAGE_SIZE, PAGE_BUDGET // size))
+
+
+# derived default page sizes, keyed by resource type name
+_DEFAULT_PAGE_SIZES = {}
+
+
+def default_page_size(resource_type, conf):
+    """
+    Returns the default per_page for the LIST of the resource type, see
+    derive_page_size(). Only routes fetching all pages have one, other
+    LIST routes return a single page and get the API default.
+    """
+    if not conf.binder.all_pages:
+        return None
+    if resource_type.name not in _DEFAULT_PAGE_SIZES:
+        _DEFAULT_PAGE_SIZES[resource_type.name] = derive_page_size(
+            _response_model_class(resource_type, action.LIST, conf),
+            default_exclude(resource_type, action.LIST, conf),
+        )
+    return _DEFAULT_PAGE_SIZES[resource_type.name]
+
+
+def _page_size(params, resource_type, conf):
+    page_size = params.get('page_size')
+    if page_size is None:
+        return default_page_size(resource_type, conf)
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError("page_size must be between 1 and {0}, is {1}".format(MAX_PAGE_SIZE, page_size))
+    return page_size
+
+
+def prepare_call(resource_type, action, equinix_metal_client, params={}, filters=None):
+    """
+    Binds params to the API call of the resource type and action. The
+    returned ApiCall can be passed to execute() repeatedly.
+
+    filters are additional SDK arguments, e.g. from
+    ResourceType.filter_kwargs(). Those the SDK function doesn't take are
+    ignored.
     """
     metal_client.raise_if_missing_equinix_metal()
-    conf = api_routes.get_routes(equinix_metal_client).get((resource_type, action))
+    rt = get_resource_type(resource_type)
+    conf = api_routes.get_routes(equinix_metal_client).resolve(rt, action)
     if conf is None:
         raise NotImplementedError("No API call for resource type %s and action %s" % (resource_type, action))
+    # include and exclude from params are added to the defaults of the
+    # resource type instead of replacing them
+    defaults = rt.request_defaults(
+        params.get('include'),
+        default_exclude(rt, action, conf) + (params.get('exclude') or []),
+    )
+    if any(p in params for p in PROJECTION_PARAMS):
+        params = {k: v for k, v in params.items() if k not in PROJECTION_PARAMS}
+    if action == action.LIST:
+        page_size = _page_size(params, rt, conf)
+        if page_size is not None:
+            defaults['per_page'] = page_size
+    if filters:
+        defaults.update(filters)
+    return api_routes.build_api_call(conf, params, defaults, rt, action,
+                                     metal_client.request_options(equinix_metal_client),
+                                     metal_client.retry_policy(equinix_metal_client),
+                                     metal_client.http_cache(equinix_metal_client))
+
+
+def execute(api_call, raw=False):
+    """
+    Does a prepared API call and maps the response to Ansible dict(s).
 
-    call = api_routes.build_api_call(conf, params)
-    response = call.do()
+    With raw=True, GET and LIST responses are mapped straight from the
+    parsed JSON body instead of being deserialized to SDK models first,
+    see execute_raw().
+    """
+    rt = api_call.resource_type
+    action = api_call.action
+    if raw and action in (action.GET, action.LIST):
+        return execute_raw(api_call)
+    if action == action.LIST and api_call.conf.binder.all_pages:
+        response = fetch_all_pages_model(api_call)
+    elif action == action.GET and _conditional(api_call):
+        response = api_call.conf.binder.response_model_class.from_dict(conditional_get(api_call))
+    else:
+        response = api_call.do()
     # uncomment to check response in /tmp/q
     # import q; q(response)
     if action == action.DELETE:
         return None
-    attribute_mapper = get_attribute_mapper(resource_type)
     if action == action.LIST:
-        if resource_type == 'metal_available_ip':
-            return response.to_dict()['available']
-        return [response_to_ansible_dict(r, attribute_mapper)
-                for r in find_list_in_response(response)]
-    return response_to_ansible_dict(response, attribute_mapper)
+        if rt.attribute_map is None:
+            return response.to_dict()[rt.list_key]
+        return [response_to_ansible_dict(r, rt.attribute_map)
+                for r in find_list_in_response(response, rt.list_key)]
+    return response_to_ansible_dict(response, rt.attribute_map)
+
+
+def execute_raw(api_call):
+    """
+    Does a prepared GET or LIST API call with the *_without_preload_content
+    variant of the SDK method and maps the JSON body to Ansible dict(s).
+
+    Pages of *_all_pages routes are fetched with fetch_all_pages().
+    The result is the same as from execute(), except that nested objects
+    which are mapped as a whole keep the attributes unknown to the SDK
+    models, and timestamps stay strings.
+    """
+    rt = api_call.resource_type
+    if api_call.action == action.GET:
+        if _conditional(api_call):
+            body = conditional_get(api_call)
+        else:
+            body = metal_client.read_json_response(api_call.do_raw())
+        return raw_response_to_ansible_dict(body, rt.attribute_map)
+
+    items = []
+    for body in fetch_all_pages_raw(api_call):
+        items.extend(body.get(rt.list_key) or [])
+    if rt.attribute_map is None:
+        return items
+    return [raw_response_to_ansible_dict(r, rt.attribute_map) for r in items]
+
+
+def _conditional(api_call):
+    return api_call.http_cache is not None and api_call.conf.binder.response_model_class is not None
+
+
+def conditional_get(api_call):
+    """
+    Does a prepared GET API call as a conditional request and returns the
+    parsed JSON body. If the response in api_call.http_cache is still
+    valid (HTTP 304), its body is returned without downloading it again.
+    """
+    cache = api_call.http_cache
+    key = cache.key(api_call.conf.binder.raw_func_name, api_call.path_kwargs)
+    entry = cache.get(key)
+    headers = cache.request_headers(entry)
+    response = api_call.do_raw(_headers=headers) if headers else api_call.do_raw()
+    if response.status == 304 and entry is not None:
+        release_conn = getattr(response, 'release_conn', None)
+        if release_conn is not None:
+            release_conn()
+        cache.add_hit()
+        return entry['body']
+    body = metal_client.read_json_response(response)
+    cache.put(key, response.headers, body)
+    return body
+
+
+# number of pages fetched concurrently by fetch_all_pages()
+PAGE_WORKERS = 4
+
+
+def fetch_all_pages(fetch_page, page_meta, workers=PAGE_WORKERS):
+    """
+    Returns the responses of all pages of a paginated LIST, in page order.
+
+    fetch_page(page) fetches a page, page_meta(response) returns a tuple
+    (last_page, has_next) for a fetched page. Once the first page tells
+    the last page, the other pages are fetched by a pool of workers. If
+    the API rate limits the workers (HTTP 429), the pages which weren't
+    fetched yet are fetched one by one. Without last_page, pages are
+    followed one by one, like the SDK does.
+    """
+    first = fetch_page(1)
+    last_page, has_next = page_meta(first)
+    if last_page is None or workers <= 1:
+        responses = [first]
+        page = 1
+        while has_next:
+            page += 1
+            response = fetch_page(page)
+            responses.append(response)
+            _, has_next = page_meta(response)
+        return responses
+
+    pages = list(range(2, last_page + 1))
+    fetched = {}
+    if pages:
+        with ThreadPoolExecutor(max_workers=min(workers, len(pages))) as executor:
+            futures = [(page, executor.submit(fetch_page, page)) for page in pages]
+            rate_limited = False
+            for page, future in futures:
+                if rate_limited and future.cancel():
+                    continue
+                try:
+                    fetched[page] = future.result()
+                except metal_client.ApiException as e:
+                    if e.status != 429:
+                        raise e
+                    rate_limited = True
+    for page in pages:
+        if page not in fetched:
+            fetched[page] = fetch_page(page)
+    return [first] + [fetched[page] for page in pages]
+
+
+def _model_page_meta(response):
+    meta = getattr(response, 'meta', None)
+    if meta is None:
+        return None, False
+    return meta.last_page, meta.next is not None
+
+
+def _raw_page_meta(body):
+    meta = body.get('meta') or {}
+    return meta.get('last_page'), meta.get('next') is not None
+
+
+def fetch_all_pages_model(api_call):
+    """
+    Fetches all pages of an *_all_pages route and returns the first page
+    with the resources of all pages, like the *_all_pages SDK method.
+    """
+    list_key = api_call.resource_type.list_key
+    responses = fetch_all_pages(api_call.do_page, _model_page_meta)
+    all_pages = responses[0]
+    resources = getattr(all_pages, list_key)
+    for response in responses[1:]:
+        resources.extend(getattr(response, list_key) or [])
+    return all_pages
+
+
+def fetch_all_pages_raw(api_call):
+    """
+    Returns the parsed JSON bodies of a LIST call, one per page.
+    """
+    if not api_call.conf.binder.all_pages:
+        return [metal_client.read_json_response(api_call.do_raw())]
+    return fetch_all_pages(
+        lambda page: metal_client.read_json_response(api_call.do_raw(page=page)),
+        _raw_page_meta,
+    )
 
 
-def find_list_in_response(response):
-    for k in LIST_KEYS:
-        if hasattr(response, k):
-            return getattr(response, k)
+def call(resource_type, action, equinix_metal_client, params={}, raw=False, filters=None):
+    """
+    This function wraps the API call and returns the response.
+    """
+    return execute(prepare_call(resource_type, action, equinix_metal_client, params, filters), raw)
+
+
+def find_list_in_response(response, list_key):
+    return getattr(response, list_key)
 
 
 def href_to_id(href):
@@ -479,6 +929,43 @@ def populate_ids_from_hrefs(response):
     return return_dict
 
 
+# Free-form attributes of the SDK models (Dict[str, Any]), the SDK keeps
+# None values in them.
+FREE_FORM_ATTRIBUTES = frozenset(['customdata', 'pricing'])
+
+
+def _without_nones(value):
+    if type(value) is dict:
+        return {k: v if k in FREE_FORM_ATTRIBUTES else _without_nones(v)
+                for k, v in value.items() if v is not None}
+    if type(value) is list:
+        return [_without_nones(i) for i in value]
+    return value
+
+
+def raw_resource_dict(resource):
+    """
+    Turns a resource from a parsed JSON body into the dict which
+    populate_ids_from_hrefs() returns for the SDK model of the resource:
+    None values are dropped, like in the model's to_dict(), and ids are
+    added from hrefs, both in one pass over the resource.
+    """
+    return_dict = {}
+    for k, v in resource.items():
+        if v is None:
+            continue
+        if k not in FREE_FORM_ATTRIBUTES:
+            v = _without_nones(v)
+            if type(v) is dict:
+                add_id_from_href(v)
+            elif type(v) is list:
+                for i in v:
+                    if type(i) is dict:
+                        add_id_from_href(i)
+        return_dict[k] = v
+    return return_dict
+
+
 def get_dotted_value(_dict, key):
     keys = key.split(".")
     for k in keys:
@@ -491,26 +978,96 @@ def get_dotted_value(_dict, key):
     return _dict
 
 
-def response_to_ansible_dict(response, attribute_mapper):
-    return_dict = {}
-    if response is None:
-        return {}
-    response_dict = populate_ids_from_hrefs(response)
-    if attribute_mapper is None:
-        return response_dict()
+def _attribute_not_found(message_key, message_value, response_dict):
+    return Exception("attribute '{0}' (to map to '{1}') not found in response_dict: {2}".format(message_key, message_value, response_dict))
+
+
+def _dotted_getter(k, v):
+    path = tuple(v.split("."))
+    if len(path) == 2:
+        first, second = path
+
+        def get_two_levels(response_dict):
+            if first in response_dict:
+                d = response_dict[first]
+                if d is not None and second in d:
+                    d = d[second]
+                    if d is not None:
+                        return d
+            raise _attribute_not_found(v, k, response_dict)
+        return get_two_levels
+
+    def get_dotted(response_dict):
+        d = response_dict
+        for key in path:
+            if key not in d:
+                raise _attribute_not_found(v, k, response_dict)
+            d = d[key]
+            if d is None:
+                raise _attribute_not_found(v, k, response_dict)
+        return d
+    return get_dotted
+
+
+def _plain_getter(k, v):
+    def get(response_dict):
+        if v in response_dict:
+            return response_dict[v]
+        raise _attribute_not_found(k, v, response_dict)
+    return get
+
+
+def compile_attribute_mapper(attribute_mapper):
+    """
+    Compiles an attribute map to a function which maps a response dict to
+    an Ansible dict.
+
+    Dotted keys are split and callables told apart from attribute names
+    once, here, instead of for every mapped resource.
+    """
+    getters = []
     for k, v in attribute_mapper.items():
         # k is key in ansible module
-        # v is key in API response dict
-        # response_dict[v] is value in API response dict
+        # v is key in API response dict, or a function of the response dict
         if callable(v):
-            return_dict[k] = v(response_dict)
+            getters.append((k, v))
         elif "." in v:
-            dv = get_dotted_value(response_dict, v)
-            if dv is None:
-                raise Exception("attribute '{0}' (to map to '{1}') not found in response_dict: {2}".format(v, k, response_dict))
-            return_dict[k] = dv
-        elif v in response_dict:
-            return_dict[k] = response_dict[v]
+            getters.append((k, _dotted_getter(k, v)))
         else:
-            raise Exception("attribute '{0}' (to map to '{1}') not found in response_dict: {2}".format(k, v, response_dict))
-    return return_dict
+            getters.append((k, _plain_getter(k, v)))
+    getters = tuple(getters)
+
+    def map_response_dict(response_dict):
+        return {k: get(response_dict) for k, get in getters}
+    return map_response_dict
+
+
+# compiled attribute maps, keyed by id() of the attribute map. The maps are
+# stored next to the compiled functions to keep the ids valid.
+_COMPILED_MAPPERS = {}
+
+
+def get_compiled_mapper(attribute_mapper):
+    compiled = _COMPILED_MAPPERS.get(id(attribute_mapper))
+    if compiled is None:
+        compiled = (attribute_mapper, compile_attribute_mapper(attribute_mapper))
+        _COMPILED_MAPPERS[id(attribute_mapper)] = compiled
+    return compiled[1]
+
+
+def response_to_ansible_dict(response, attribute_mapper):
+    if response is None:
+        return {}
+    response_dict = populate_ids_from_hrefs(response)
+    if attribute_mapper is None:
+        return response_dict
+    return get_compiled_mapper(attribute_mapper)(response_dict)
+
+
+def raw_response_to_ansible_dict(resource, attribute_mapper):
+    if resource is None:
+        return {}
+    response_dict = raw_resource_dict(resource)
+    if attribute_mapper is None:
+        return response_dict
+    return get_compiled_mapper(attribute_mapper)(response_dict)
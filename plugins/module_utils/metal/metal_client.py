@@ -6,14 +6,27 @@ from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
 
+import json
+import os
+import socket
 import traceback
 import re
 
+from ansible_collections.equinix.cloud.plugins.module_utils.metal import (
+    http_cache as http_cache_module,
+    rate_limit as rate_limit_module,
+    retry,
+)
+
 HAS_EQUINIX_METAL = True
 HAS_EQUINIX_METAL_EXC = None
 try:
     import equinix.services.metalv1 as equinix_metal
-    from equinix.services.metalv1.exceptions import NotFoundException
+    from equinix.services.metalv1.exceptions import ApiException
+    # re-exported, callers catch metal_client.NotFoundException
+    from equinix.services.metalv1.exceptions import NotFoundException  # noqa: F401
+    from equinix.services.metalv1.rest import RESTResponse
+    from urllib3.connection import HTTPConnection
 except ImportError:
     HAS_EQUINIX_METAL = False
     HAS_EQUINIX_METAL_EXC = traceback.format_exc()
@@ -22,6 +35,19 @@ USER_AGENT = 'ansible-equinix'
 API_URL = 'https://api.equinix.com/metal/v1'
 TOKEN_ENVVARS = ['METAL_API_TOKEN', 'METAL_AUTH_TOKEN']
 URL_ENVVARS = ['METAL_API_URL']
+POOL_MAXSIZE_ENVVARS = ['METAL_API_POOL_MAXSIZE']
+CONNECT_TIMEOUT_ENVVARS = ['METAL_API_CONNECT_TIMEOUT']
+READ_TIMEOUT_ENVVARS = ['METAL_API_READ_TIMEOUT']
+MAX_RETRIES_ENVVARS = ['METAL_API_MAX_RETRIES']
+RATE_LIMIT_ENVVARS = ['METAL_API_RATE_LIMIT']
+RATE_LIMIT_BURST_ENVVARS = ['METAL_API_RATE_LIMIT_BURST']
+CACHE_DIR_ENVVARS = http_cache_module.DIR_ENVVARS
+
+# connections kept open to the API host, the SDK default is 5 per CPU
+POOL_MAXSIZE = 10
+# seconds, the SDK doesn't time out requests at all by default
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 60.0
 
 RESOURCE_NAME_RE = r'^({0}|{0}{1}*{0})$'.format(r'[a-zA-Z0-9]', r'[a-zA-Z0-9\-_ ]')
 HOSTNAME_RE = r'^({0}\.)*{0}$'.format(RESOURCE_NAME_RE)
@@ -42,18 +68,139 @@ def raise_if_missing_equinix_metal():
         raise MissingMetalPythonError(HAS_EQUINIX_METAL_EXC)
 
 
-def get_equinix_metal_client(api_token, api_url=API_URL, ua_prefix=""):
+# clients by (api_token, api_url, ua_prefix, pool_maxsize, connect_timeout,
+# read_timeout, max_retries, retry_writes, rate_limit, rate_limit_burst,
+# cache_dir), see get_equinix_metal_client
+_CLIENTS = {}
+
+
+def get_equinix_metal_client(api_token, api_url=API_URL, ua_prefix="",
+                             pool_maxsize=None, connect_timeout=None, read_timeout=None,
+                             max_retries=None, retry_writes=False,
+                             rate_limit=None, rate_limit_burst=None, cache_dir=None):
+    """
+    Returns an API client with a pool of keep-alive connections.
+
+    Clients are shared within a process: building a client with the same
+    token, URL and settings again returns the first one, so that its
+    connections (and bound API routes) are reused. pool_maxsize is the
+    number of connections kept open to the API host, connect_timeout and
+    read_timeout are socket timeouts in seconds for every request, see
+    request_options(). max_retries and retry_writes configure the
+    retry_policy() of the client. rate_limit (requests per second) and
+    rate_limit_burst enable a rate_limit.FileTokenBucket shared by all
+    processes on the host using the same token, unset by default.
+    GET responses are revalidated with conditional requests, see
+    http_cache(). With cache_dir, the responses are also kept on disk for
+    later runs. Settings left as None are read from the
+    environment (POOL_MAXSIZE_ENVVARS etc.) or default to POOL_MAXSIZE,
+    CONNECT_TIMEOUT, READ_TIMEOUT and retry.MAX_RETRIES.
+    """
     raise_if_missing_equinix_metal()
+    pool_maxsize = _setting(pool_maxsize, POOL_MAXSIZE_ENVVARS, int, POOL_MAXSIZE)
+    connect_timeout = _setting(connect_timeout, CONNECT_TIMEOUT_ENVVARS, float, CONNECT_TIMEOUT)
+    read_timeout = _setting(read_timeout, READ_TIMEOUT_ENVVARS, float, READ_TIMEOUT)
+    max_retries = _setting(max_retries, MAX_RETRIES_ENVVARS, int, retry.MAX_RETRIES)
+    rate_limit = _setting(rate_limit, RATE_LIMIT_ENVVARS, float, None)
+    rate_limit_burst = _setting(rate_limit_burst, RATE_LIMIT_BURST_ENVVARS, int, 1)
+    cache_dir = _setting(cache_dir, CACHE_DIR_ENVVARS, str, None)
+    if pool_maxsize < 1:
+        raise ValueError("pool_maxsize must be at least 1, is {0}".format(pool_maxsize))
+    if connect_timeout <= 0 or read_timeout <= 0:
+        raise ValueError("API timeouts must be positive, are {0} and {1}".format(connect_timeout, read_timeout))
+    if max_retries < 0:
+        raise ValueError("max_retries must not be negative, is {0}".format(max_retries))
+
+    key = (api_token, api_url, ua_prefix, pool_maxsize, connect_timeout, read_timeout,
+           max_retries, bool(retry_writes), rate_limit, rate_limit_burst, cache_dir)
+    mpc = _CLIENTS.get(key)
+    if mpc is not None:
+        return mpc
+
+    limiter = None
+    if rate_limit:
+        limiter = rate_limit_module.FileTokenBucket(
+            rate_limit_module.bucket_path(api_token), rate_limit, rate_limit_burst)
+
     ua = ua_prefix + " " + USER_AGENT
     conf = equinix_metal.Configuration(
         host=api_url,
     )
     conf.api_key['x_auth_token'] = api_token
+    conf.connection_pool_maxsize = pool_maxsize
+    # TCP keep-alive, so that idle pooled connections dropped by
+    # middleboxes are noticed instead of hanging the next request
+    conf.socket_options = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
     mpc = equinix_metal.ApiClient(conf)
     mpc.user_agent = ua + " " + mpc.user_agent
+    mpc.request_timeout = (connect_timeout, read_timeout)
+    mpc.retry_policy = retry.RetryPolicy(max_retries, bool(retry_writes), limiter=limiter)
+    mpc.http_cache = http_cache_module.ConditionalCache(
+        http_cache_module.namespace(api_token, api_url), cache_dir)
+    _CLIENTS[key] = mpc
     return mpc
 
 
+def request_options(mpc):
+    """
+    Returns the keyword arguments to pass to every SDK method called with
+    the client. The SDK has no client-wide timeout, it must be passed per
+    request.
+    """
+    timeout = getattr(mpc, 'request_timeout', None)
+    if timeout is None:
+        return {}
+    return {'_request_timeout': timeout}
+
+
+def retry_policy(mpc):
+    """
+    Returns the retry.RetryPolicy of API calls done with the client, or
+    None to not retry.
+    """
+    return getattr(mpc, 'retry_policy', None)
+
+
+def http_cache(mpc):
+    """
+    Returns the http_cache.ConditionalCache of GET calls done with the
+    client, or None to not do conditional requests.
+    """
+    return getattr(mpc, 'http_cache', None)
+
+
+def _setting(value, envvars, value_type, default):
+    if value is None:
+        for envvarname in envvars:
+            env_value = os.environ.get(envvarname)
+            if env_value:
+                try:
+                    return value_type(env_value)
+                except ValueError:
+                    raise ValueError("Invalid value of {0}: {1}".format(envvarname, env_value))
+        return default
+    return value_type(value)
+
+
+def read_json_response(http_response):
+    """
+    Parses the body of a response returned by one of the
+    *_without_preload_content SDK methods. Error responses raise the same
+    exceptions as the deserializing SDK methods, e.g. NotFoundException.
+    """
+    response = RESTResponse(http_response)
+    response.read()
+    if not 200 <= response.status <= 299:
+        raise ApiException.from_response(
+            http_resp=response,
+            body=response.data.decode('utf-8'),
+            data=None,
+        )
+    return json.loads(response.data)
+
+
 def is_valid_uuid(uuid):
     return re.match(UUID_RE, uuid) is not None
 
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import random
+import time
+
+# seconds, see PollPolicy
+INITIAL_INTERVAL = 1.0
+MULTIPLIER = 1.5
+MAX_INTERVAL = 30.0
+JITTER = 0.1
+
+
+class PollPolicy(object):
+    """
+    Intervals between polls of a resource which is becoming ready.
+
+    Without a hint, the intervals grow from initial_interval by multiplier
+    up to max_interval, so that resources which are ready in seconds are
+    seen early and ones which take many minutes aren't polled too often.
+    With an estimate of the seconds left (see ProgressEstimate), the next
+    poll is at half of it, within the same bounds. Intervals are jittered
+    by up to the jitter fraction, so that waiting forks spread out.
+    """
+
+    def __init__(self,
+                 initial_interval: float = INITIAL_INTERVAL,
+                 multiplier: float = MULTIPLIER,
+                 max_interval: float = MAX_INTERVAL,
+                 jitter: float = JITTER,
+                 ):
+        if initial_interval <= 0 or max_interval < initial_interval:
+            raise ValueError("poll intervals must be positive and initial_interval at most max_interval, "
+                             "are {0} and {1}".format(initial_interval, max_interval))
+        if multiplier < 1:
+            raise ValueError("poll multiplier must be at least 1, is {0}".format(multiplier))
+        if not 0 <= jitter < 1:
+            raise ValueError("poll jitter must be between 0 and 1, is {0}".format(jitter))
+        self.initial_interval = initial_interval
+        self.multiplier = multiplier
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def interval(self, attempt: int, seconds_left=None) -> float:
+        """
+        Returns the seconds to wait after poll number attempt (from 0).
+        """
+        if seconds_left is not None:
+            interval = seconds_left / 2
+        else:
+            interval = self.initial_interval * self.multiplier ** min(attempt, 100)
+        interval = min(self.max_interval, max(self.initial_interval, interval))
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class ProgressEstimate(object):
+    """
+    Estimates the seconds left until a resource is ready from the progress
+    percentages it reports, e.g. provisioning_percentage of devices.
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or time.time
+        self.first = None
+
+    def update(self, percentage):
+        """
+        Records a polled percentage, and returns the estimated seconds
+        left, or None if there is no estimate (yet).
+        """
+        if percentage is None:
+            return None
+        now = self.clock()
+        if self.first is None or percentage < self.first[1]:
+            self.first = (now, percentage)
+            return None
+        started, first_percentage = self.first
+        if percentage <= first_percentage or now <= started:
+            return None
+        rate = (percentage - first_percentage) / (now - started)
+        return max(0.0, (100 - percentage) / rate)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import fcntl
+import hashlib
+import os
+import tempfile
+import time
+
+# directory of the bucket files, the temporary directory by default
+DIR_ENVVARS = ['METAL_API_RATE_LIMIT_DIR']
+
+
+class FileTokenBucket(object):
+    """
+    Token bucket shared by all processes using the same file.
+
+    Every Ansible fork runs its own module process, so limiting requests
+    in one process doesn't keep a play under the API rate limits. The
+    bucket state is kept in a file locked with flock(), so that all forks
+    on a host (and the inventory plugin) draw from the same bucket.
+
+    The bucket holds up to burst tokens and gains rate tokens per second.
+    acquire() takes a token, and if there is none it reserves the next
+    one and sleeps until it is due. Reserving keeps the lock short and
+    serves waiting processes in the order they came.
+    """
+
+    def __init__(self, path: str, rate: float, burst: int = 1,
+                 sleep=time.sleep, clock=time.time):
+        if rate <= 0:
+            raise ValueError("rate must be positive, is {0}".format(rate))
+        if burst < 1:
+            raise ValueError("burst must be at least 1, is {0}".format(burst))
+        self.path = path
+        self.rate = float(rate)
+        self.burst = burst
+        self.sleep = sleep
+        self.clock = clock
+
+    def acquire(self) -> float:
+        """
+        Takes a token, waiting for it if necessary. Returns the seconds
+        waited.
+        """
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                now = self.clock()
+                tokens, updated = self._read(f, now)
+                tokens = min(self.burst, tokens + (now - updated) * self.rate) - 1
+                f.seek(0)
+                f.truncate()
+                f.write("{0!r} {1!r}\n".format(tokens, now))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        if tokens >= 0:
+            return 0.0
+        wait = -tokens / self.rate
+        self.sleep(wait)
+        return wait
+
+    def _read(self, f, now):
+        try:
+            tokens, updated = f.read().split()
+            return float(tokens), min(float(updated), now)
+        except ValueError:
+            # new or damaged file, start with a full bucket
+            return float(self.burst), now
+
+
+def bucket_path(api_token: str, directory: str = None) -> str:
+    """
+    Returns the bucket file for an API token. Rate limits apply per
+    token, the file name is a hash of it so that it doesn't leak.
+    """
+    if directory is None:
+        directory = next((os.environ[e] for e in DIR_ENVVARS if os.environ.get(e)), tempfile.gettempdir())
+    digest = hashlib.sha256(api_token.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(directory, 'equinix-metal-api-{0}.bucket'.format(digest))
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import email.utils
+import random
+import threading
+import time
+
+try:
+    from equinix.services.metalv1.exceptions import ApiException
+except ImportError:
+    # reported by metal_client.raise_if_missing_equinix_metal()
+    ApiException = Exception
+
+# statuses worth retrying: rate limited, or the API (or a proxy in front
+# of it) is temporarily unavailable
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+MAX_RETRIES = 5
+# seconds, see RetryPolicy.delay()
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+
+class RetryStats(object):
+    """
+    Counters of the API calls done with a RetryPolicy. Pages of a LIST
+    may be fetched from several threads, so the counters are locked.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.retry_wait = 0.0
+        self.throttle_wait = 0.0
+
+    def add_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def add_throttle(self, wait: float):
+        with self._lock:
+            self.throttle_wait += wait
+
+    def add_retry(self, delay: float):
+        with self._lock:
+            self.retries += 1
+            self.retry_wait += delay
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'retries': self.retries,
+                'retry_wait_seconds': round(self.retry_wait, 3),
+                'throttle_wait_seconds': round(self.throttle_wait, 3),
+            }
+
+
+class RetryPolicy(object):
+    """
+    Retries API calls failing with one of RETRY_STATUSES.
+
+    Only idempotent calls (GET and LIST) are retried, unless retry_writes
+    is set. A call is retried at most max_retries times, after waiting as
+    long as the Retry-After header of the response says, or with
+    exponential backoff if there is none. Connection errors are retried by
+    urllib3 already.
+
+    If there is a limiter (see rate_limit.FileTokenBucket), it is acquired
+    before every request, retries included.
+    """
+
+    def __init__(self,
+                 max_retries: int = MAX_RETRIES,
+                 retry_writes: bool = False,
+                 base_delay: float = BASE_DELAY,
+                 max_delay: float = MAX_DELAY,
+                 sleep=time.sleep,
+                 limiter=None,
+                 ):
+        self.max_retries = max_retries
+        self.retry_writes = retry_writes
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.limiter = limiter
+        self.stats = RetryStats()
+
+    def call(self, sdk_function, kwargs: dict, idempotent: bool = True, raw: bool = False):
+        """
+        Calls sdk_function(**kwargs), retrying it if allowed. With raw, the
+        SDK function returns the HTTP response of any status instead of
+        raising ApiException, the last response is returned.
+        """
+        retries = self.max_retries if (idempotent or self.retry_writes) else 0
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.stats.add_throttle(self.limiter.acquire())
+            self.stats.add_call()
+            if raw:
+                response = sdk_function(**kwargs)
+                if attempt >= retries or response.status not in RETRY_STATUSES:
+                    return response
+                headers = response.headers
+                # return the connection to the pool
+                release_conn = getattr(response, 'drain_conn', None)
+                if release_conn is not None:
+                    release_conn()
+            else:
+                try:
+                    return sdk_function(**kwargs)
+                except ApiException as e:
+                    if attempt >= retries or e.status not in RETRY_STATUSES:
+                        raise e
+                    headers = e.headers
+            delay = self.delay(attempt, retry_after(headers))
+            self.stats.add_retry(delay)
+            self.sleep(delay)
+            attempt += 1
+
+    def delay(self, attempt: int, retry_after_seconds=None):
+        """
+        Returns seconds to wait before retry number attempt + 1. The
+        waits are jittered so that forks rate limited at the same time
+        don't all retry at the same time again.
+        """
+        if retry_after_seconds is not None:
+            return retry_after_seconds + random.uniform(0, self.base_delay)
+        backoff = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+def retry_after(headers):
+    """
+    Returns the seconds to wait from the Retry-After header, which is
+    either a number of seconds or an HTTP date, or None.
+    """
+    if not headers:
+        return None
+    value = headers.get('Retry-After')
+    if value is None:
+        value = headers.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
@@ -3,13 +3,17 @@
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
 import inspect
-from typing import Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 from re import sub
 
 from ansible_collections.equinix.cloud.plugins.module_utils import (
     utils,
 )
 
+# suffixes of the SDK method names, see Binder.raw_func_name
+ALL_PAGES_SUFFIX = '_all_pages'
+RAW_SUFFIX = '_without_preload_content'
+
 
 class Specs(object):
     """
@@ -31,6 +35,7 @@ class Specs(object):
         self.request_model_class = request_model_class
         self.request_superclass = request_superclass
         self.extra_kwargs = extra_kwargs
+        self._binder = None
         if self.request_model_class is not None:
             if not inspect.isclass(request_model_class):
                 raise ValueError('request_model_class must be a class, is {-1}'.format(type(request_model_class)))
@@ -40,6 +45,165 @@ class Specs(object):
             if not inspect.isclass(request_superclass):
                 raise ValueError('request_superclass must be a class, is {-1}'.format(type(request_superclass)))
 
+    @property
+    def binder(self):
+        if self._binder is None:
+            self._binder = Binder(self)
+        return self._binder
+
+
+class Binder(object):
+    """
+    Argument binder of a Specs, compiled on first use.
+
+    The signature of the SDK function, the mapping of its arguments to
+    module params and the set of params which don't go to the request body
+    are computed once, so that binding a params dict is a single pass.
+    """
+
+    def __init__(self, conf: Specs):
+        signature = inspect.signature(conf.func)
+        param_names = tuple(signature.parameters.keys())
+        arg_mapping = conf.named_args_mapping or {}
+        self.param_names = frozenset(param_names)
+        # pairs of (SDK argument name, module param name)
+        self.lookups = tuple((p, arg_mapping.get(p, p)) for p in param_names)
+        self.extra_kwargs = conf.extra_kwargs
+        self.not_in_body = self.param_names | frozenset(utils.SKIPPED_PARAMS)
+
+        self.request_model_class = conf.request_model_class
+        self.request_superclass = conf.request_superclass
+        self.model_arg_name = None
+        if conf.request_model_class is not None:
+            self.model_arg_name = snake_case(conf.request_model_class.__name__)
+            if conf.request_superclass is not None:
+                self.model_arg_name = snake_case(conf.request_superclass.__name__)
+
+        # The SDK method which returns the HTTP response without
+        # deserializing it. The *_all_pages methods have no such variant,
+        # the pages must be fetched one by one with the base method
+        # (page_func_name).
+        func_name = conf.func.__name__
+        self.all_pages = func_name.endswith(ALL_PAGES_SUFFIX)
+        if self.all_pages:
+            func_name = func_name[:-len(ALL_PAGES_SUFFIX)]
+        self.page_func_name = func_name
+        self.raw_func_name = func_name + RAW_SUFFIX
+        # the SDK model class of the response, to deserialize the JSON
+        # body of a raw response like the SDK method does, or None
+        self.response_model_class = None
+        if hasattr(signature.return_annotation, 'from_dict'):
+            self.response_model_class = signature.return_annotation
+
+    def bind(self, params: dict, defaults: Optional[dict] = None):
+        """
+        Returns SDK kwargs without the request body, and the request body
+        params (or None if the call has no body).
+        """
+        sdk_kwargs = {}
+        if defaults:
+            sdk_kwargs.update((k, v) for k, v in defaults.items() if k in self.param_names)
+        if self.extra_kwargs is not None:
+            sdk_kwargs.update(self.extra_kwargs)
+        for param_name, lookup_name in self.lookups:
+            value = params.get(lookup_name)
+            if value is not None:
+                sdk_kwargs[param_name] = value
+
+        body_params = None
+        if self.request_model_class is not None:
+            not_in_body = self.not_in_body
+            body_params = {k: v for k, v in params.items() if k not in not_in_body}
+        return sdk_kwargs, body_params
+
+    def request_model(self, body_params: dict):
+        request_model_instance = self.request_model_class.from_dict(body_params)
+        if self.request_superclass is not None:
+            request_model_instance = self.request_superclass(actual_instance=request_model_instance)
+        return request_model_instance
+
+
+class ResourceType(object):
+    """
+    Everything metal_api needs to know about one resource type.
+
+    routes maps actions to Specs factories (see api_routes.ROUTES),
+    attribute_map is the response attribute map, list_key names the
+    attribute of LIST responses holding the resources, and include/exclude
+    are passed to every API call of the resource type that accepts them.
+
+    lookup_filters maps resource attributes to arguments of the LIST call
+    which filter by them on the server side, see filter_kwargs(). The API
+    filters are exact or loose (e.g. partial hostname) matches, so the
+    filtered LIST holds every resource a lookup compares equal. Attributes
+    in stricter_lookup_filters are filtered more strictly by the API than
+    lookups compare them, a lookup which finds nothing with them lists all
+    resources again.
+    """
+
+    def __init__(self,
+                 name: str,
+                 attribute_map: Optional[Dict[str, Any]],
+                 list_key: Optional[str] = None,
+                 include: Optional[List[str]] = None,
+                 exclude: Optional[List[str]] = None,
+                 routes: Optional[Dict[Any, Callable]] = None,
+                 lookup_filters: Optional[Dict[str, str]] = None,
+                 stricter_lookup_filters: Optional[List[str]] = None,
+                 ):
+        self.name = name
+        self.attribute_map = attribute_map
+        self.list_key = list_key
+        self.include = include
+        self.exclude = exclude
+        self.routes = routes or {}
+        self.lookup_filters = lookup_filters or {}
+        self.stricter_lookup_filters = stricter_lookup_filters or []
+
+    def request_defaults(self,
+                         include: Optional[List[str]] = None,
+                         exclude: Optional[List[str]] = None,
+                         ) -> Dict[str, List[str]]:
+        """
+        Returns include/exclude for API calls of the resource type, with
+        include and exclude added to those of the resource type. Included
+        objects are never excluded.
+        """
+        include = _union(self.include, include)
+        exclude = [e for e in _union(self.exclude, exclude) if e not in include]
+        defaults = {}
+        if include:
+            defaults['include'] = include
+        if exclude:
+            defaults['exclude'] = exclude
+        return defaults
+
+    def filter_kwargs(self, match_values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns the LIST arguments narrowing the list down to resources
+        with the given attribute values. The API filters take a single
+        value, so only the first item of a list (e.g. of tags) is used.
+        The filters may match more resources (e.g. hostname is a partial
+        match), the caller must still compare the attributes.
+        """
+        kwargs = {}
+        for attr, sdk_arg in self.lookup_filters.items():
+            value = match_values.get(attr)
+            if isinstance(value, list):
+                value = value[0] if value else None
+            if value is not None:
+                kwargs[sdk_arg] = value
+        return kwargs
+
+    def filters_may_miss(self, match_values: Dict[str, Any]) -> bool:
+        """
+        Returns whether the LIST filtered for match_values may leave out
+        resources with those attribute values.
+        """
+        return any(match_values.get(attr) is not None for attr in self.stricter_lookup_filters
+                   if attr in self.lookup_filters)
+
+
 class ApiCall(object):
     """
     A class representing an API call. It holds the configuration of the
@@ -47,6 +211,7 @@ class ApiCall(object):
     into URL params and body params.
 
     API call body (if necessary) is created from the module parameters.
+    An ApiCall can be done repeatedly, e.g. when polling a resource.
     """
     @staticmethod
     def _get_relevant_params(params):
@@ -55,46 +220,70 @@ class ApiCall(object):
     def __init__(self,
                  conf: Specs,
                  params: Optional[dict] = {},
+                 defaults: Optional[dict] = None,
+                 resource_type: Optional[ResourceType] = None,
+                 action: Optional[Any] = None,
+                 request_options: Optional[dict] = None,
+                 retry_policy: Optional[Any] = None,
+                 http_cache: Optional[Any] = None,
                  ):
         self.conf = conf
+        self.resource_type = resource_type
+        self.action = action
+        # SDK arguments of the request itself, e.g. _request_timeout
+        self.request_options = request_options or {}
+        # see retry.RetryPolicy, None doesn't retry
+        self.retry_policy = retry_policy
+        self.idempotent = action is not None and action in (action.GET, action.LIST)
+        # see http_cache.ConditionalCache, used for GET calls
+        self.http_cache = http_cache
 
-        param_names = set(inspect.signature(conf.func).parameters.keys())
-        self.sdk_kwargs = {}
-        if conf.extra_kwargs is not None:
-            self.sdk_kwargs.update(conf.extra_kwargs)
-        arg_mapping = self.conf.named_args_mapping or {}
-        for param_name in param_names:
-            lookup_name = param_name
-            if param_name in arg_mapping:
-                lookup_name = arg_mapping[param_name]
-            value_from_ansible_module = params.get(lookup_name, None)
-            if value_from_ansible_module is not None:
-                self.sdk_kwargs[param_name] = value_from_ansible_module
+        binder = conf.binder
+        self.sdk_kwargs, body_params = binder.bind(params, defaults)
         self.path_kwargs = self.sdk_kwargs.copy()
-
-        if self.conf.request_model_class is not None:
-            body_params = {k: v for k, v in params.items() if
-                           (k not in utils.SKIPPED_PARAMS)
-                           and (k not in param_names)
-                           }
-            request_model_instance = self.conf.request_model_class.from_dict(body_params)
-            model_arg_name = snake_case(self.conf.request_model_class.__name__)
-            if self.conf.request_superclass is not None:
-                superclass_instance = self.conf.request_superclass(actual_instance=request_model_instance)
-                request_model_instance = superclass_instance
-                model_arg_name = snake_case(self.conf.request_superclass.__name__)
-            self.sdk_kwargs[model_arg_name] = request_model_instance
+        if body_params is not None:
+            self.sdk_kwargs[binder.model_arg_name] = binder.request_model(body_params)
 
     def do(self):
         sdk_function = self.conf.func
 
-        result = sdk_function(**self.sdk_kwargs)
+        result = self._call(sdk_function, dict(self.sdk_kwargs, **self.request_options))
         return result
 
+    def do_page(self, page: int):
+        """
+        Fetches one page of an *_all_pages route with the base SDK method.
+        """
+        sdk_function = getattr(self.conf.func.__self__, self.conf.binder.page_func_name)
+        return self._call(sdk_function, dict(self.sdk_kwargs, **self.request_options, page=page))
+
+    def do_raw(self, **kwargs):
+        """
+        Does the API call without deserializing the response body and
+        returns the HTTP response. kwargs are added to the SDK arguments,
+        e.g. the page number when fetching pages of an *_all_pages route.
+        """
+        sdk_function = getattr(self.conf.func.__self__, self.conf.binder.raw_func_name)
+        return self._call(sdk_function, dict(self.sdk_kwargs, **self.request_options, **kwargs), raw=True)
+
+    def _call(self, sdk_function, kwargs: dict, raw: bool = False):
+        if self.retry_policy is None:
+            return sdk_function(**kwargs)
+        return self.retry_policy.call(sdk_function, kwargs, self.idempotent, raw)
+
     def describe(self):
         return "{0} to {1}".format(self.conf.func.__name__, self.path_kwargs)
 
 
+def _union(*lists):
+    result = []
+    for items in lists:
+        for i in items or []:
+            if i not in result:
+                result.append(i)
+    return result
+
+
 def snake_case(s):
     return '_'.join(
         sub('([A-Z][a-z]+)', r' \1',
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# seconds, see EquinixModule.get_catalog_list()
+DEFAULT_TTL = 3600
+DEFAULT_DIR = os.path.join('~', '.cache', 'ansible-equinix')
+
+
+class TTLCache(object):
+    """
+    Results of API calls kept in files for a number of seconds.
+
+    Meant for catalogs which change rarely, like metros, operating systems
+    and plans, so that info modules called by many tasks and plays read
+    them locally instead of downloading them every time. Unlike
+    http_cache.ConditionalCache, a fresh entry is used without asking the
+    API at all.
+    """
+
+    def __init__(self, namespace: str, directory: str = None, clock=time.time):
+        # namespace separates API tokens and URLs, see http_cache.namespace()
+        self.namespace = namespace
+        self.directory = os.path.expanduser(directory or DEFAULT_DIR)
+        self.clock = clock
+
+    def key(self, resource_type: str, kwargs: dict) -> str:
+        request = json.dumps([self.namespace, resource_type, kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, ttl: float):
+        """
+        Returns the value kept under key if it is younger than ttl
+        seconds, or None.
+        """
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not 0 <= self.clock() - entry.get('stored_at', 0) < ttl:
+            return None
+        return entry.get('value')
+
+    def put(self, key: str, value):
+        entry = {'stored_at': self.clock(), 'value': value}
+        # written to a temporary file and renamed, so that concurrent
+        # module runs never read a partial entry
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._path(key))
+            except (OSError, TypeError, ValueError):
+                os.remove(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError):
+            # the cache is an optimization, a read-only or full disk (or a
+            # value which isn't JSON) mustn't fail the module
+            pass
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
@@ -13,7 +13,7 @@ SKIPPED_PARAMS = [
 OPTIONAL_REQUEST_PARAMS = [
     "include",
     "exclude",
-    "page"
+    "page",
     "per_page",
 ]
 
@@ -12,6 +12,22 @@ description: Gather information about Interconnections
 module: metal_connection_info
 notes: []
 options:
+  exclude:
+    description:
+    - List of nested objects to exclude from the API responses, in addition to those
+      excluded by default because the module doesn't return them. The API returns
+      only the href of excluded objects, so excluding an object which the module returns
+      makes the module fail.
+    elements: str
+    required: false
+    type: list
+  include:
+    description:
+    - List of nested objects to include in the API responses, in addition to those
+      included by default. Names can be dotted to include deeply nested objects.
+    elements: str
+    required: false
+    type: list
   name:
     description:
     - Filter connections on substring in name attribute.
@@ -22,6 +38,13 @@ options:
     - ID of the organization where the connection is scoped to.
     required: false
     type: str
+  page_size:
+    description:
+    - Number of resources to fetch per API request. By default, it is chosen for the
+      resource type, so that larger resources are fetched in smaller pages. The API
+      maximum is 1000.
+    required: false
+    type: int
   project_id:
     description:
     - ID of the project where the connection is scoped to.
@@ -60,6 +83,8 @@ import traceback
 
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
     EquinixModule,
+    INCLUDE_EXCLUDE_SPEC,
+    PAGE_SIZE_SPEC,
     getSpecDocMeta,
 )
 
@@ -76,6 +101,8 @@ module_spec = dict(
         type=FieldType.string,
         description=["ID of the organization where the connection is scoped to."],
     ),
+    **INCLUDE_EXCLUDE_SPEC,
+    **PAGE_SIZE_SPEC,
 )
 
 specdoc_examples = [
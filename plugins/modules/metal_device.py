@@ -17,6 +17,14 @@ options:
       setting of false will ensure that iPXE is only used on first boot.
     required: false
     type: bool
+  batch_size:
+    default: 10
+    description:
+    - With `hostnames` or `count`, the most devices requested with one batch request.
+      If the API rejects a batch for the quota or capacity of the project, smaller
+      batches are tried.
+    required: false
+    type: int
   billing_cycle:
     choices:
     - hourly
@@ -27,6 +35,12 @@ options:
     - Billing cycle of the device.
     required: false
     type: str
+  count:
+    description:
+    - Number of devices to create, or delete, in bulk, named by `hostname_template`.
+      See `hostnames`.
+    required: false
+    type: int
   customdata:
     description:
     - Customdata is an arbitrary JSON value that can be accessed via the metadata
@@ -67,6 +81,23 @@ options:
       multiple devices within a project.
     required: false
     type: str
+  hostname_template:
+    description:
+    - Hostnames of the devices created with `count`, `{index}` is replaced by the
+      number of the device from 1, e.g. `web-{index:02d}` for `web-01`, `web-02`,
+      ...
+    required: false
+    type: str
+  hostnames:
+    description:
+    - Hostnames of devices to create, or delete, in bulk. The existing devices are
+      found with one list of the project devices, and the missing ones are created
+      with project batch requests (see `batch_size`) instead of one request per device.
+      Existing devices are updated with the changed mutable attributes, like a single
+      device. All devices are returned in `devices`, in the order of the hostnames.
+    elements: str
+    required: false
+    type: list
   id:
     description:
     - UUID of the device.
@@ -273,6 +304,16 @@ options:
       for more details.
     required: false
     type: str
+  wait:
+    default: true
+    description:
+    - Whether to wait for a created device to reach `active` status. With `false`,
+      the module returns the creation response at once, and updates which need an
+      active device (`network_frozen`) are listed in `deferred_updates` of the result.
+      They are applied by a later run with the same options, once the device is active.
+      Wait for the devices with `metal_device_wait`.
+    required: false
+    type: bool
 requirements: null
 short_description: Create, update, or delete Equinix Metal devices
 """
@@ -289,8 +330,108 @@ EXAMPLES = r"""
     equinix.cloud.metal_device:
       id: eef49903-7a09-4ca1-af67-4087c29ab5b6
       state: absent
+- name: Create devices in bulk
+  hosts: localhost
+  tasks:
+  - equinix.cloud.metal_device:
+      project_id: 8e4b0b2a-4a6f-4d3b-9c6c-7a0b3c4d5e6f
+      count: 20
+      hostname_template: worker-{index:02d}
+      metro: sv
+      plan: c3.small.x86
+      operating_system: ubuntu_22_04
+    register: workers
+- name: Create devices without waiting, then wait for all of them at once
+  hosts: localhost
+  tasks:
+  - equinix.cloud.metal_device:
+      hostname: '{{ item }}'
+      project_id: 8e4b0b2a-4a6f-4d3b-9c6c-7a0b3c4d5e6f
+      metro: sv
+      plan: c3.small.x86
+      operating_system: ubuntu_22_04
+      wait: false
+    loop:
+    - node-1
+    - node-2
+    - node-3
+    register: created
+  - equinix.cloud.metal_device_wait:
+      project_id: 8e4b0b2a-4a6f-4d3b-9c6c-7a0b3c4d5e6f
+      ids: '{{ created.results | map(attribute=''id'') | list }}'
 """
 RETURN = r"""
+batches:
+  description: With `hostnames` or `count`, the batches which created the missing
+    devices. Also returned when the module fails after some batches were accepted.
+  returned: always
+  sample:
+  - device_ids:
+    - 71a90c54-e0eb-414f-9ea2-9c39ecb32319
+    - 8624f0f7-67fd-44a0-8bdc-1ac9f6d93ad9
+    error_messages: []
+    id: a7c56e27-8b6c-4a4c-9d3f-5d2a6e1e8a3b
+    quantity: 2
+    state: completed
+  type: list
+devices:
+  description: With `hostnames` or `count`, the devices, in the order of the hostnames.
+    Also returned, with the devices created so far, when the module fails after some
+    batches were accepted.
+  returned: always
+  sample:
+  - always_pxe: false
+    billing_cycle: hourly
+    changed: true
+    customdata: {}
+    facility: sv15
+    hardware_reservation_id: ''
+    hostname: ansible-integration-test-device-yi4fbuo4-dev1
+    id: 71a90c54-e0eb-414f-9ea2-9c39ecb32319
+    ip_addresses:
+    - address: 139.178.94.207
+      address_family: 4
+      public: true
+    - address: 2604:1380:45e3:2c00::1
+      address_family: 6
+      public: true
+    - address: 10.67.168.2
+      address_family: 4
+      public: false
+    ipxe_script_url: ''
+    locked: false
+    metal_state: active
+    metro: sv
+    network_frozen: false
+    operating_system: ubuntu_20_04
+    plan: c3.small.x86
+    project_id: 6ac17ea6-a304-4b01-a1f3-f13a7371cfab
+    spot_instance: false
+    spot_price_max: 0.0
+    ssh_keys:
+    - href: /metal/v1/ssh-keys/1ffe4e4b-eaf9-45d9-a268-0d81af71ae55
+      id: 1ffe4e4b-eaf9-45d9-a268-0d81af71ae55
+    - href: /metal/v1/ssh-keys/d122d4e4-4832-41c8-abbb-40182930becf
+      id: d122d4e4-4832-41c8-abbb-40182930becf
+    - href: /metal/v1/ssh-keys/b0f196c0-9cf2-4cb7-96c5-403b81ff6813
+      id: b0f196c0-9cf2-4cb7-96c5-403b81ff6813
+    - href: /metal/v1/ssh-keys/4b011c75-e642-4f6d-85f4-590a5956ad28
+      id: 4b011c75-e642-4f6d-85f4-590a5956ad28
+    - href: /metal/v1/ssh-keys/217ff08c-057a-4933-8efe-2e9f723fbb5f
+      id: 217ff08c-057a-4933-8efe-2e9f723fbb5f
+    - href: /metal/v1/ssh-keys/10968e80-b234-469b-acb8-c5002b4111a4
+      id: 10968e80-b234-469b-acb8-c5002b4111a4
+    - href: /metal/v1/ssh-keys/6ff0810b-135c-48cf-ac68-b365bdfd338c
+      id: 6ff0810b-135c-48cf-ac68-b365bdfd338c
+    - href: /metal/v1/ssh-keys/6a71d7e1-db14-4dfd-9014-46032b507538
+      id: 6a71d7e1-db14-4dfd-9014-46032b507538
+    - href: /metal/v1/ssh-keys/413e2347-f89c-40af-ba9e-0864f2fde990
+      id: 413e2347-f89c-40af-ba9e-0864f2fde990
+    - href: /metal/v1/ssh-keys/9308b337-702a-4774-8351-37dfb8c90a57
+      id: 9308b337-702a-4774-8351-37dfb8c90a57
+    tags: []
+    userdata: ''
+  type: list
 metal_device:
   description: The module object
   returned: always
@@ -317,6 +458,7 @@ metal_device:
     locked: false
     metal_state: active
     metro: sv
+    network_frozen: false
     operating_system: ubuntu_20_04
     plan: c3.small.x86
     project_id: 6ac17ea6-a304-4b01-a1f3-f13a7371cfab
@@ -375,12 +517,26 @@ module_spec = dict(
                      "ensure that iPXE is only used on first boot."),
         editable=True,
     ),
+    batch_size=SpecField(
+        type=FieldType.integer,
+        description=(
+            'With `hostnames` or `count`, the most devices requested with one batch request. If the API rejects a '
+            'batch for the quota or capacity of the project, smaller batches are tried.'
+        ),
+        default=10,
+    ),
     billing_cycle=SpecField(
         type=FieldType.string,
         description="Billing cycle of the device.",
         choices=["hourly", "daily", "monthly", "yearly"],
         editable=True,
     ),
+    count=SpecField(
+        type=FieldType.integer,
+        description=(
+            'Number of devices to create, or delete, in bulk, named by `hostname_template`. See `hostnames`.'
+        ),
+    ),
     customdata=SpecField(
         type=FieldType.dict,
         description=("Customdata is an arbitrary JSON value that can be accessed "
@@ -422,6 +578,23 @@ module_spec = dict(
         ),
         editable=True,
     ),
+    hostname_template=SpecField(
+        type=FieldType.string,
+        description=(
+            'Hostnames of the devices created with `count`, `{index}` is replaced by the number of the device '
+            'from 1, e.g. `web-{index:02d}` for `web-01`, `web-02`, ...'
+        ),
+    ),
+    hostnames=SpecField(
+        type=FieldType.list,
+        description=(
+            'Hostnames of devices to create, or delete, in bulk. The existing devices are found with one list of '
+            'the project devices, and the missing ones are created with project batch requests (see `batch_size`) '
+            'instead of one request per device. Existing devices are updated with the changed mutable attributes, '
+            'like a single device. All devices are returned in `devices`, in the order of the hostnames.'
+        ),
+        element_type=FieldType.string,
+    ),
     ip_addresses=SpecField(
         type=FieldType.list,
         description=(
@@ -603,6 +776,16 @@ module_spec = dict(
             "will be included. This behaviour can be changed with 'no_ssh_keys' option to omit any SSH key being added."
         ),
     ),
+    wait=SpecField(
+        type=FieldType.bool,
+        description=(
+            'Whether to wait for a created device to reach `active` status. With `false`, the module returns the '
+            'creation response at once, and updates which need an active device (`network_frozen`) are listed in '
+            '`deferred_updates` of the result. They are applied by a later run with the same options, once the '
+            'device is active. Wait for the devices with `metal_device_wait`.'
+        ),
+        default=True,
+    ),
 )
 
 specdoc_examples = [
@@ -620,6 +803,34 @@ specdoc_examples = [
     equinix.cloud.metal_device:
       id: eef49903-7a09-4ca1-af67-4087c29ab5b6
       state: absent
+''', '''
+- name: Create devices in bulk
+  hosts: localhost
+  tasks:
+    - equinix.cloud.metal_device:
+        project_id: 8e4b0b2a-4a6f-4d3b-9c6c-7a0b3c4d5e6f
+        count: 20
+        hostname_template: "worker-{index:02d}"
+        metro: sv
+        plan: c3.small.x86
+        operating_system: ubuntu_22_04
+      register: workers
+''', '''
+- name: Create devices without waiting, then wait for all of them at once
+  hosts: localhost
+  tasks:
+    - equinix.cloud.metal_device:
+        hostname: "{{ item }}"
+        project_id: 8e4b0b2a-4a6f-4d3b-9c6c-7a0b3c4d5e6f
+        metro: sv
+        plan: c3.small.x86
+        operating_system: ubuntu_22_04
+        wait: false
+      loop: [node-1, node-2, node-3]
+      register: created
+    - equinix.cloud.metal_device_wait:
+        project_id: 8e4b0b2a-4a6f-4d3b-9c6c-7a0b3c4d5e6f
+        ids: "{{ created.results | map(attribute='id') | list }}"
 ''',
 ]
 
@@ -654,6 +865,7 @@ return_values = [
     "locked": False,
     "metal_state": "active",
     "metro": "sv",
+    "network_frozen": False,
     "operating_system": "ubuntu_20_04",
     "plan": "c3.small.x86",
     "project_id": "6ac17ea6-a304-4b01-a1f3-f13a7371cfab",
@@ -706,6 +918,19 @@ return_values = [
 }
 ]
 
+batch_return_values = [
+    {
+        "id": "a7c56e27-8b6c-4a4c-9d3f-5d2a6e1e8a3b",
+        "state": "completed",
+        "quantity": 2,
+        "device_ids": [
+            "71a90c54-e0eb-414f-9ea2-9c39ecb32319",
+            "8624f0f7-67fd-44a0-8bdc-1ac9f6d93ad9"
+        ],
+        "error_messages": []
+    }
+]
+
 SPECDOC_META = getSpecDocMeta(
     short_description='Create, update, or delete Equinix Metal devices',
     description='Create, update, or delete Equinix Metal devices',
@@ -717,10 +942,24 @@ SPECDOC_META = getSpecDocMeta(
             type=FieldType.dict,
             sample=return_values,
         ),
+        "devices": SpecReturnValue(
+            description=('With `hostnames` or `count`, the devices, in the order of the hostnames. '
+                         'Also returned, with the devices created so far, when the module fails '
+                         'after some batches were accepted.'),
+            type=FieldType.list,
+            sample=return_values,
+        ),
+        "batches": SpecReturnValue(
+            description=('With `hostnames` or `count`, the batches which created the missing devices. '
+                         'Also returned when the module fails after some batches were accepted.'),
+            type=FieldType.list,
+            sample=batch_return_values,
+        ),
     },
 )
 
 from ansible.module_utils._text import to_native
+import time
 import traceback
 
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
@@ -730,15 +969,108 @@ from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
 
 MUTABLE_ATTRIBUTES = [a for a, v in module_spec.items() if v.editable]
 
+
+def bulk_hostnames(params):
+    hostnames = params.get("hostnames")
+    if hostnames is None:
+        template = params["hostname_template"]
+        hostnames = [template.format(index=i) for i in range(1, params["count"] + 1)]
+    if len(set(hostnames)) != len(hostnames):
+        raise Exception("hostnames must be unique, got {0}".format(hostnames))
+    return hostnames
+
+
+def bulk(module):
+    hostnames = bulk_hostnames(module.params)
+    existing = {}
+    for device in module.get_list_matching("metal_project_device", "hostname", hostnames):
+        if device["hostname"] in existing:
+            raise Exception("found more than one metal_device with hostname {0}".format(device["hostname"]))
+        existing[device["hostname"]] = device
+
+    if module.params.get("state") == "absent":
+        for device in existing.values():
+            module.params["id"] = device["id"]
+            module.delete_by_id("metal_device")
+        return {"changed": bool(existing), "devices": [existing[h] for h in hostnames if h in existing]}
+
+    # existing devices are updated like in the single device path
+    changed = False
+    for hostname, device in existing.items():
+        diff = get_diff(module.params, device, MUTABLE_ATTRIBUTES)
+        if diff:
+            module.params["id"] = device["id"]
+            existing[hostname] = module.update_by_id(diff, "metal_device")
+            changed = True
+
+    missing = [h for h in hostnames if h not in existing]
+    if not missing:
+        return {"changed": changed, "devices": [existing[h] for h in hostnames]}
+    for required in ("plan", "operating_system", "metro"):
+        if module.params.get(required) is None:
+            raise Exception("{0} is required when creating devices in bulk".format(required))
+
+    seconds = module.params.get("provisioning_wait_seconds")
+    stop_time = time.time() + seconds
+    batches, created = module.create_device_batches(missing, module.params["batch_size"], timeout=seconds)
+    if module.params.get("wait") and created:
+        results = module.wait_for_resources_condition(
+            "metal_project_device",
+            [d["id"] for d in created],
+            "metal_state",
+            "active",
+            timeout=max(0, stop_time - time.time()))
+        not_ready = [r["id"] for r in results if not r["ready"]]
+        if not_ready:
+            raise Exception("wait for metal_device {0} metal_state active timed out".format(", ".join(not_ready)))
+        created = [r["resource"] for r in results]
+        # network_frozen is not a create attribute, so we need to update explicitly
+        if module.params.get("network_frozen"):
+            for i, device in enumerate(created):
+                module.params["id"] = device["id"]
+                created[i] = module.update_by_id({"network_frozen": True}, "metal_device")
+    elif module.params.get("network_frozen"):
+        # applied by the next run with the devices present, as a diff of
+        # the mutable attributes
+        for device in created:
+            device["deferred_updates"] = {"network_frozen": True}
+    existing.update((d["hostname"], d) for d in created)
+
+    not_created = [h for h in missing if h not in existing]
+    if not_created:
+        errors = [m for b in batches for m in b.get("error_messages") or []]
+        module.fail_json(
+            msg="devices {0} were not created: {1}".format(", ".join(not_created), "; ".join(errors)),
+            devices=[existing[h] for h in hostnames if h in existing],
+            batches=batches,
+        )
+    return {"changed": True, "devices": [existing[h] for h in hostnames], "batches": batches}
+
+
 def main():
     module = EquinixModule(
         argument_spec=SPECDOC_META.ansible_spec,
-        required_one_of=[("hostname", "id")],
-        required_by=dict(hostname=("project_id")),
+        required_one_of=[("hostname", "id", "hostnames", "count")],
+        # a device can be renamed by id, the bulk options replace both
+        mutually_exclusive=[
+            ("hostnames", "count"),
+            ("hostnames", "id"),
+            ("hostnames", "hostname"),
+            ("count", "id"),
+            ("count", "hostname"),
+        ],
+        required_together=[("count", "hostname_template")],
+        required_by=dict(
+            hostname=("project_id"),
+            hostnames=("project_id"),
+            count=("project_id"),
+        ),
     )
 
     try:
         module.params_syntax_check()
+        if module.params.get("hostnames") is not None or module.params.get("count") is not None:
+            module.exit_json(**bulk(module))
 
         state = module.params.get("state")
         changed = False
@@ -770,16 +1102,22 @@ def main():
                     raise Exception("UUID not found in device creation response")
                 changed = True
                 module.params["id"] = fetched["id"]
-                seconds = module.params.get("provisioning_wait_seconds")
-                fetched = module.wait_for_resource_condition(
-                    "metal_device",
-                    "metal_state",
-                    "active",
-                    timeout=seconds)
-
-                # network_frozen is not a create attribute, so we need to update explicitly
-                if module.params.get("network_frozen"):
-                    fetched = module.update_by_id({"network_frozen": True}, "metal_device")
+                if module.params.get("wait"):
+                    seconds = module.params.get("provisioning_wait_seconds")
+                    fetched = module.wait_for_resource_condition(
+                        "metal_device",
+                        "metal_state",
+                        "active",
+                        timeout=seconds)
+
+                    # network_frozen is not a create attribute, so we need to update explicitly
+                    if module.params.get("network_frozen"):
+                        fetched = module.update_by_id({"network_frozen": True}, "metal_device")
+                elif module.params.get("network_frozen"):
+                    # applied by the next run with the device present, as
+                    # a diff of the mutable attributes (network_frozen is
+                    # in the device response map)
+                    fetched["deferred_updates"] = {"network_frozen": True}
             else:
                 fetched = {}
     except Exception as e:
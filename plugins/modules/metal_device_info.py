@@ -12,16 +12,39 @@ description: Select list of Equinix Metal devices
 module: metal_device_info
 notes: []
 options:
+  exclude:
+    description:
+    - List of nested objects to exclude from the API responses, in addition to those
+      excluded by default because the module doesn't return them. The API returns
+      only the href of excluded objects, so excluding an object which the module returns
+      makes the module fail.
+    elements: str
+    required: false
+    type: list
   hostname:
     description:
     - Hostname to look up a device.
     required: false
     type: str
+  include:
+    description:
+    - List of nested objects to include in the API responses, in addition to those
+      included by default. Names can be dotted to include deeply nested objects.
+    elements: str
+    required: false
+    type: list
   organization_id:
     description:
     - UUID of the organization containing devices.
     required: false
     type: str
+  page_size:
+    description:
+    - Number of resources to fetch per API request. By default, it is chosen for the
+      resource type, so that larger resources are fetched in smaller pages. The API
+      maximum is 1000.
+    required: false
+    type: int
   project_id:
     description:
     - UUID of the project containing devices.
@@ -78,6 +101,7 @@ resources:
     locked: false
     metal_state: active
     metro: sv
+    network_frozen: false
     operating_system: ubuntu_20_04
     plan: c3.small.x86
     project_id: 6ac17ea6-a304-4b01-a1f3-f13a7371cfab
@@ -127,6 +151,7 @@ resources:
     locked: false
     metal_state: active
     metro: sv
+    network_frozen: false
     operating_system: ubuntu_20_04
     plan: c3.small.x86
     project_id: 6ac17ea6-a304-4b01-a1f3-f13a7371cfab
@@ -164,6 +189,8 @@ import traceback
 
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
     EquinixModule,
+    INCLUDE_EXCLUDE_SPEC,
+    PAGE_SIZE_SPEC,
     getSpecDocMeta,
 )
 
@@ -180,6 +207,8 @@ module_spec = dict(
         type=FieldType.string,
         description=['UUID of the organization containing devices.'],
     ),
+    **INCLUDE_EXCLUDE_SPEC,
+    **PAGE_SIZE_SPEC,
 )
 
 specdoc_examples = [
@@ -240,6 +269,7 @@ return_values = [
         "locked": False,
         "metal_state": "active",
         "metro": "sv",
+        "network_frozen": False,
         "operating_system": "ubuntu_20_04",
         "plan": "c3.small.x86",
         "project_id": "6ac17ea6-a304-4b01-a1f3-f13a7371cfab",
@@ -319,6 +349,7 @@ return_values = [
         "locked": False,
         "metal_state": "active",
         "metro": "sv",
+        "network_frozen": False,
         "operating_system": "ubuntu_20_04",
         "plan": "c3.small.x86",
         "project_id": "6ac17ea6-a304-4b01-a1f3-f13a7371cfab",
@@ -398,7 +429,7 @@ def main():
         resource_type = "metal_project_device"
         if module.params.get('organization_id'):
             resource_type = "metal_organization_device"
-        return_value = {'resources': module.get_list(resource_type)}
+        return_value = {'resources': module.get_list(resource_type, raw=True)}
 
     except Exception as e:
         tr = traceback.format_exc()
@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# DOCUMENTATION, EXAMPLES, and RETURN are generated by
+# ansible_specdoc. Do not edit them directly.
+
+DOCUMENTATION = r"""
+author: Equinix DevRel Team (@equinix) <support@equinix.com>
+description: Wait for Equinix Metal devices in a project to reach a state, e.g. to
+  become active after they were created. The devices are polled with one list of the
+  project devices at a time, instead of getting each device, so the API requests don't
+  grow with the number of devices. Fails if any device doesn't reach the state before
+  the timeout.
+module: metal_device_wait
+notes: []
+options:
+  ids:
+    description:
+    - UUIDs of the devices to wait for.
+    elements: str
+    required: true
+    type: list
+  metal_state:
+    default: active
+    description:
+    - State of the devices to wait for.
+    required: false
+    type: str
+  project_id:
+    description:
+    - UUID of the project containing the devices.
+    required: true
+    type: str
+  timeout:
+    default: 1800
+    description:
+    - How long to wait for the devices, in seconds.
+    required: false
+    type: int
+requirements: null
+short_description: Wait for many Equinix Metal devices to reach a state
+"""
+EXAMPLES = r"""
+- name: Wait for devices to become active
+  hosts: localhost
+  tasks:
+  - equinix.cloud.metal_device_wait:
+      project_id: 2a5122b9-c323-4d5c-b53c-9ad3f54273e7
+      ids:
+      - 8624f0f7-67fd-44a0-8bdc-1ac9f6d93ad9
+      - 5ab9e2e2-0f5d-4a9b-9d2c-2b1e3fb5a0c3
+      timeout: 1800
+    register: waited
+"""
+RETURN = r"""
+devices:
+  description: The devices waited for, in the order of ids, with whether they reached
+    the state and how many seconds it took. Devices which were never listed have only
+    the id.
+  returned: always
+  sample:
+  - hostname: device-1
+    id: 8624f0f7-67fd-44a0-8bdc-1ac9f6d93ad9
+    metal_state: active
+    ready: true
+    seconds: 412.3
+  type: list
+"""
+
+# End
+
+from ansible.module_utils._text import to_native
+from ansible_specdoc.objects import SpecField, FieldType, SpecReturnValue
+import traceback
+
+from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
+    EquinixModule,
+    getSpecDocMeta,
+)
+from ansible_collections.equinix.cloud.plugins.module_utils.metal import (
+    metal_client,
+)
+
+module_spec = dict(
+    ids=SpecField(
+        type=FieldType.list,
+        element_type=FieldType.string,
+        description=['UUIDs of the devices to wait for.'],
+        required=True,
+    ),
+    project_id=SpecField(
+        type=FieldType.string,
+        description=['UUID of the project containing the devices.'],
+        required=True,
+    ),
+    metal_state=SpecField(
+        type=FieldType.string,
+        description=['State of the devices to wait for.'],
+        default='active',
+    ),
+    timeout=SpecField(
+        type=FieldType.integer,
+        description=['How long to wait for the devices, in seconds.'],
+        default=1800,
+    ),
+)
+
+specdoc_examples = [
+    '''
+- name: Wait for devices to become active
+  hosts: localhost
+  tasks:
+    - equinix.cloud.metal_device_wait:
+        project_id: 2a5122b9-c323-4d5c-b53c-9ad3f54273e7
+        ids:
+          - 8624f0f7-67fd-44a0-8bdc-1ac9f6d93ad9
+          - 5ab9e2e2-0f5d-4a9b-9d2c-2b1e3fb5a0c3
+        timeout: 1800
+      register: waited
+''',
+]
+
+return_values = [
+    {
+        "id": "8624f0f7-67fd-44a0-8bdc-1ac9f6d93ad9",
+        "hostname": "device-1",
+        "metal_state": "active",
+        "ready": True,
+        "seconds": 412.3
+    }
+]
+
+SPECDOC_META = getSpecDocMeta(
+    short_description="Wait for many Equinix Metal devices to reach a state",
+    description=(
+        'Wait for Equinix Metal devices in a project to reach a state, e.g. '
+        'to become active after they were created. The devices are polled '
+        'with one list of the project devices at a time, instead of getting '
+        'each device, so the API requests don\'t grow with the number of devices. '
+        'Fails if any device doesn\'t reach the state before the timeout.'
+    ),
+    examples=specdoc_examples,
+    options=module_spec,
+    return_values={
+        "devices": SpecReturnValue(
+            description=('The devices waited for, in the order of ids, with whether '
+                         'they reached the state and how many seconds it took. Devices '
+                         'which were never listed have only the id.'),
+            type=FieldType.list,
+            sample=return_values,
+        ),
+    },
+)
+
+
+def _device_result(result):
+    device = dict(result['resource'] or {'id': result['id']})
+    device.update(ready=result['ready'], seconds=result['seconds'])
+    return device
+
+
+def main():
+    module = EquinixModule(
+        argument_spec=SPECDOC_META.ansible_spec,
+        is_info=True,
+    )
+    try:
+        module.params_syntax_check()
+        for device_id in module.params['ids']:
+            metal_client.raise_if_invalid_uuid(device_id)
+        results = module.wait_for_resources_condition(
+            "metal_project_device",
+            module.params['ids'],
+            "metal_state",
+            module.params['metal_state'],
+            timeout=module.params['timeout'],
+        )
+        devices = [_device_result(r) for r in results]
+    except Exception as e:
+        tr = traceback.format_exc()
+        module.fail_json(msg=to_native(e), exception=tr)
+
+    not_ready = [d['id'] for d in devices if not d['ready']]
+    if not_ready:
+        module.fail_json(
+            msg="devices {0} are not {1} after {2}s".format(
+                ', '.join(not_ready), module.params['metal_state'], module.params['timeout']),
+            devices=devices,
+        )
+    module.exit_json(changed=False, devices=devices)
+
+
+if __name__ == '__main__':
+    main()
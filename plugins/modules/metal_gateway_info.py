@@ -12,6 +12,22 @@ description: Gather information about Metal Gateways
 module: metal_gateway_info
 notes: []
 options:
+  exclude:
+    description:
+    - List of nested objects to exclude from the API responses, in addition to those
+      excluded by default because the module doesn't return them. The API returns
+      only the href of excluded objects, so excluding an object which the module returns
+      makes the module fail.
+    elements: str
+    required: false
+    type: list
+  include:
+    description:
+    - List of nested objects to include in the API responses, in addition to those
+      included by default. Names can be dotted to include deeply nested objects.
+    elements: str
+    required: false
+    type: list
   project_id:
     description:
     - UUID of parent project the gateway is scoped to.
@@ -55,6 +71,7 @@ import traceback
 
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
     EquinixModule,
+    INCLUDE_EXCLUDE_SPEC,
     getSpecDocMeta,
 )
 
@@ -63,6 +80,7 @@ module_spec = dict(
         type=FieldType.string,
         description=['UUID of parent project the gateway is scoped to.'],
     ),
+    **INCLUDE_EXCLUDE_SPEC,
 )
 
 specdoc_examples = ['''
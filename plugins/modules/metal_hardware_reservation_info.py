@@ -12,6 +12,29 @@ description: Gather information about Equinix Metal hardware_reservations
 module: metal_hardware_reservation_info
 notes: []
 options:
+  exclude:
+    description:
+    - List of nested objects to exclude from the API responses, in addition to those
+      excluded by default because the module doesn't return them. The API returns
+      only the href of excluded objects, so excluding an object which the module returns
+      makes the module fail.
+    elements: str
+    required: false
+    type: list
+  include:
+    description:
+    - List of nested objects to include in the API responses, in addition to those
+      included by default. Names can be dotted to include deeply nested objects.
+    elements: str
+    required: false
+    type: list
+  page_size:
+    description:
+    - Number of resources to fetch per API request. By default, it is chosen for the
+      resource type, so that larger resources are fetched in smaller pages. The API
+      maximum is 1000.
+    required: false
+    type: int
   project_id:
     description:
     - UUID of parent project containing the hardware_reservations.
@@ -50,6 +73,8 @@ import traceback
 
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
     EquinixModule,
+    INCLUDE_EXCLUDE_SPEC,
+    PAGE_SIZE_SPEC,
     getSpecDocMeta,
 )
 
@@ -59,6 +84,8 @@ module_spec = dict(
         description=['UUID of parent project containing the hardware_reservations.'],
         required=True,
     ),
+    **INCLUDE_EXCLUDE_SPEC,
+    **PAGE_SIZE_SPEC,
 )
 
 specdoc_examples = ['''
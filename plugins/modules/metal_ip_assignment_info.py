@@ -14,6 +14,22 @@ options:
     - UUID of the device to list ip_assignments for.
     required: true
     type: str
+  exclude:
+    description:
+    - List of nested objects to exclude from the API responses, in addition to those
+      excluded by default because the module doesn't return them. The API returns
+      only the href of excluded objects, so excluding an object which the module returns
+      makes the module fail.
+    elements: str
+    required: false
+    type: list
+  include:
+    description:
+    - List of nested objects to include in the API responses, in addition to those
+      included by default. Names can be dotted to include deeply nested objects.
+    elements: str
+    required: false
+    type: list
 requirements: null
 short_description: Gather IP address assignments for a device
 """
@@ -80,6 +96,7 @@ from ansible_specdoc.objects import (
 
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
     EquinixModule,
+    INCLUDE_EXCLUDE_SPEC,
     getSpecDocMeta,
 )
 
@@ -89,6 +106,7 @@ module_spec = dict(
         description="UUID of the device to list ip_assignments for.",
         required=True,
     ),
+    **INCLUDE_EXCLUDE_SPEC,
 )
 
 specdoc_examples = [
@@ -11,7 +11,21 @@ author: Equinix DevRel Team (@equinix) <support@equinix.com>
 description: Gather information about Equinix Metal metros
 module: metal_metro_info
 notes: []
-options: {}
+options:
+  cache_bypass:
+    default: false
+    description:
+    - Read the catalog from the API even if it is cached. The cache is updated with
+      the catalog read.
+    required: false
+    type: bool
+  cache_ttl:
+    default: 3600
+    description:
+    - How long, in seconds, the catalog read from the API is kept in a local cache
+      and reused by later tasks and plays. 0 disables the cache.
+    required: false
+    type: int
 requirements: null
 short_description: Gather information about Equinix Metal metros
 """
@@ -58,11 +72,14 @@ from ansible_specdoc.objects import SpecField, FieldType, SpecReturnValue
 import traceback
 
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
+    CATALOG_CACHE_SPEC,
     EquinixModule,
     getSpecDocMeta,
 )
 
-module_spec = dict()
+module_spec = dict(
+    **CATALOG_CACHE_SPEC,
+)
 
 specdoc_examples = ['''
 - name: Select all metros and filter american metros
@@ -129,7 +146,7 @@ def main():
     )
     try:
         module.params_syntax_check()
-        return_value = {'resources': module.get_list("metal_metro")}
+        return_value = {'resources': module.get_catalog_list("metal_metro")}
     except Exception as e:
         tr = traceback.format_exc()
         module.fail_json(msg=to_native(e), exception=tr)
@@ -12,6 +12,29 @@ description: Gather information about Equinix Metal organizations
 module: metal_organization_info
 notes: []
 options:
+  exclude:
+    description:
+    - List of nested objects to exclude from the API responses, in addition to those
+      excluded by default because the module doesn't return them. The API returns
+      only the href of excluded objects, so excluding an object which the module returns
+      makes the module fail.
+    elements: str
+    required: false
+    type: list
+  include:
+    description:
+    - List of nested objects to include in the API responses, in addition to those
+      included by default. Names can be dotted to include deeply nested objects.
+    elements: str
+    required: false
+    type: list
+  page_size:
+    description:
+    - Number of resources to fetch per API request. By default, it is chosen for the
+      resource type, so that larger resources are fetched in smaller pages. The API
+      maximum is 1000.
+    required: false
+    type: int
   personal:
     description:
     - If true, only personal organizations will be returned.
@@ -67,6 +90,8 @@ import traceback
 
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
     EquinixModule,
+    INCLUDE_EXCLUDE_SPEC,
+    PAGE_SIZE_SPEC,
     getSpecDocMeta,
 )
 
@@ -79,6 +104,8 @@ module_spec = dict(
         type=FieldType.bool,
         description=['If true, only organizations without projects will be returned.'],
     ),
+    **INCLUDE_EXCLUDE_SPEC,
+    **PAGE_SIZE_SPEC,
 )
 
 specdoc_examples = ['''
@@ -12,6 +12,20 @@ description: Gather information about Equinix Metal plans
 module: metal_plan_info
 notes: []
 options:
+  cache_bypass:
+    default: false
+    description:
+    - Read the catalog from the API even if it is cached. The cache is updated with
+      the catalog read.
+    required: false
+    type: bool
+  cache_ttl:
+    default: 3600
+    description:
+    - How long, in seconds, the catalog read from the API is kept in a local cache
+      and reused by later tasks and plays. 0 disables the cache.
+    required: false
+    type: int
   categories:
     description:
     - Filter plans by categories.
@@ -82,6 +96,7 @@ from ansible_specdoc.objects import SpecField, FieldType, SpecReturnValue
 import traceback
 
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
+    CATALOG_CACHE_SPEC,
     EquinixModule,
     getSpecDocMeta,
 )
@@ -99,6 +114,7 @@ module_spec = dict(
         type=FieldType.string,
         description=['Filter plans by slug.'],
     ),
+    **CATALOG_CACHE_SPEC,
 )
 
 specdoc_examples = ['''
@@ -171,7 +187,7 @@ def main():
     )
     try:
         module.params_syntax_check()
-        return_value = {'resources': module.get_list("metal_plan")}
+        return_value = {'resources': module.get_catalog_list("metal_plan")}
 
     except Exception as e:
         tr = traceback.format_exc()
@@ -12,6 +12,22 @@ description: Gather list of reserved IP blocks matching the specified criteria
 module: metal_reserved_ip_block_info
 notes: []
 options:
+  exclude:
+    description:
+    - List of nested objects to exclude from the API responses, in addition to those
+      excluded by default because the module doesn't return them. The API returns
+      only the href of excluded objects, so excluding an object which the module returns
+      makes the module fail.
+    elements: str
+    required: false
+    type: list
+  include:
+    description:
+    - List of nested objects to include in the API responses, in addition to those
+      included by default. Names can be dotted to include deeply nested objects.
+    elements: str
+    required: false
+    type: list
   metro:
     description:
     - The metro to list IP addresses for
@@ -79,6 +95,7 @@ import traceback
 from ansible_specdoc.objects import SpecField, FieldType, SpecDocMeta, SpecReturnValue
 from ansible_collections.equinix.cloud.plugins.module_utils.equinix import (
     EquinixModule,
+    INCLUDE_EXCLUDE_SPEC,
     getSpecDocMeta,
 )
 
@@ -115,6 +132,7 @@ module_spec = dict(
         type=FieldType.string,
         description=['The metro to list IP addresses for'],
     ),
+    **INCLUDE_EXCLUDE_SPEC,
 )
 
 return_values = [
@@ -163,7 +181,7 @@ def main():
             module.fail_json(msg="metro is not valid parameter for global_ipv4")
         module.params['types'] = [typ]
         return_value = {'resources': module.get_list(
-            "metal_ip_reservation")
+            "metal_ip_reservation", raw=True)
         }
     except Exception as e:
         tr = traceback.format_exc()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""
+Microbenchmark of the per-call route lookup in metal_api.call().
+
+Compares building the whole route table on every call (what get_routes()
+used to do) with the per-client registry returned by get_routes() now.
+
+Run from a checkout located in ansible_collections/equinix/cloud, with the
+directory containing ansible_collections on PYTHONPATH:
+
+    PYTHONPATH=../../.. python scripts/benchmark_api_routes.py
+"""
+
+import timeit
+
+from ansible_collections.equinix.cloud.plugins.module_utils import action
+from ansible_collections.equinix.cloud.plugins.module_utils.metal import (
+    api_routes,
+    metal_client,
+)
+
+KEY = ('metal_project_device', action.LIST)
+NUMBER = 2000
+
+
+def build_every_route(mpc):
+    routes = api_routes.Routes(mpc)
+    return {k: routes.get(k) for k in api_routes.ROUTES}
+
+
+def main():
+    mpc = metal_client.get_equinix_metal_client('benchmark-token')
+
+    before = timeit.timeit(lambda: build_every_route(mpc)[KEY], number=NUMBER)
+    after = timeit.timeit(lambda: api_routes.get_routes(mpc).get(KEY), number=NUMBER)
+
+    print("routes in table:        {0}".format(len(api_routes.ROUTES)))
+    print("full table per call:    {0:10.2f} us".format(before / NUMBER * 1e6))
+    print("per-client registry:    {0:10.2f} us".format(after / NUMBER * 1e6))
+    print("speedup:                {0:10.1f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
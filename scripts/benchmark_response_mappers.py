@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Throughput benchmark of the response attribute mappers in metal_api.
+
+Maps a synthetic LIST of devices (already converted to dicts, as done by
+populate_ids_from_hrefs) with the interpreted mapper, which walked the
+attribute map for every device, and with the compiled mapper.
+
+Run from a checkout located in ansible_collections/equinix/cloud, with the
+directory containing ansible_collections on PYTHONPATH:
+
+    PYTHONPATH=../../.. python scripts/benchmark_response_mappers.py [devices]
+"""
+
+import gc
+import sys
+import time
+
+from ansible_collections.equinix.cloud.plugins.module_utils.metal import metal_api
+
+
+def synthetic_device(i):
+    return {
+        'always_pxe': False,
+        'billing_cycle': 'hourly',
+        'customdata': {},
+        'facility': {'code': 'sv15', 'metro': {'code': 'sv'}},
+        'hostname': 'device-{0}'.format(i),
+        'id': '00000000-0000-0000-0000-{0:012d}'.format(i),
+        'ip_addresses': [
+            {'address': '10.0.{0}.{1}'.format(i // 256 % 256, i % 256), 'address_family': 4, 'public': False},
+            {'address': '2604:1380::{0:x}'.format(i), 'address_family': 6, 'public': True},
+        ],
+        'network_ports': [
+            {'id': 'port-{0}-{1}'.format(i, p), 'name': 'eth{0}'.format(p), 'network_type': 'layer3',
+             'bond': {'id': 'bond0'}, 'virtual_networks': [{'id': 'vlan-1'}]}
+            for p in range(2)
+        ],
+        'locked': False,
+        'state': 'active',
+        'metro': {'code': 'sv'},
+        'operating_system': {'slug': 'ubuntu_22_04'},
+        'plan': {'slug': 'c3.small.x86'},
+        'project': {'id': 'project-0', 'href': '/metal/v1/projects/project-0'},
+        'ssh_keys': [{'href': '/metal/v1/ssh-keys/key-0', 'id': 'key-0'}],
+        'tags': ['bench'],
+        'userdata': '',
+    }
+
+
+def interpreted(response_dict, attribute_mapper):
+    # the mapping loop of response_to_ansible_dict before the maps were compiled
+    return_dict = {}
+    for k, v in attribute_mapper.items():
+        if callable(v):
+            return_dict[k] = v(response_dict)
+        elif "." in v:
+            dv = metal_api.get_dotted_value(response_dict, v)
+            if dv is None:
+                raise Exception("attribute '{0}' (to map to '{1}') not found".format(v, k))
+            return_dict[k] = dv
+        elif v in response_dict:
+            return_dict[k] = response_dict[v]
+        else:
+            raise Exception("attribute '{0}' (to map to '{1}') not found".format(k, v))
+    return return_dict
+
+
+def measure(fn, devices, rounds=10):
+    # like timeit, keep the garbage collector out of the measurement
+    best = None
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn(devices)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        gc.enable()
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    devices = [synthetic_device(i) for i in range(count)]
+    attribute_map = metal_api.METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP
+    compiled = metal_api.compile_attribute_mapper(attribute_map)
+
+    assert [interpreted(d, attribute_map) for d in devices] == [compiled(d) for d in devices]
+
+    before = measure(lambda ds: [interpreted(d, attribute_map) for d in ds], devices)
+    after = measure(lambda ds: [compiled(d) for d in ds], devices)
+
+    print("devices:      {0}".format(count))
+    print("interpreted:  {0:10.0f} devices/s".format(count / before))
+    print("compiled:     {0:10.0f} devices/s".format(count / after))
+    print("speedup:      {0:10.2f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
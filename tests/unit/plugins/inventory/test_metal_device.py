@@ -0,0 +1,270 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import time
+
+import pytest
+import yaml
+
+from ansible.errors import AnsibleError
+from ansible.inventory.data import InventoryData
+from ansible.parsing.dataloader import DataLoader
+from ansible.plugins.loader import inventory_loader
+
+from ansible_collections.equinix.cloud.plugins.inventory import metal_device
+from ansible_collections.equinix.cloud.plugins.module_utils.metal import metal_api
+
+
+NAME = metal_device.InventoryModule.NAME
+PROJECT_IDS = [
+    '6ac17ea6-a304-4b01-a1f3-f13a7371cfab',
+    '2a5122b9-c323-4d5c-b53c-9ad3f54273e7',
+    '8e4b0b2a-4a6f-4d3b-9c6c-7a0b3c4d5e6f',
+]
+ORGANIZATION_ID = 'b5ba3e6e-2a25-4ec8-8b3f-4a3d1d5e0f7c'
+
+
+def device(hostname, project_id, **attributes):
+    d = {
+        'id': 'id-' + hostname,
+        'hostname': hostname,
+        'project_id': project_id,
+        'ip_addresses': [{'address': '10.0.0.1', 'public': False}, {'address': '147.75.0.1', 'public': True}],
+        'metal_state': 'active',
+        'metro': 'da',
+        'plan': 'c3.small.x86',
+        'tags': [],
+        'updated_at': '2026-01-01T00:00:00Z',
+    }
+    d.update(attributes)
+    return d
+
+
+class FakeApi(object):
+    """
+    Serves the device lists of projects and organizations in place of
+    metal_api.call(), and records the calls. organizations maps ids to
+    their project ids, projects in failing raise errors, and delays are
+    the seconds a project list takes.
+    """
+
+    def __init__(self, devices, organizations=None, failing=(), delays=None):
+        self.devices = devices
+        self.organizations = organizations or {}
+        self.failing = failing
+        self.delays = delays or {}
+        self.calls = []
+
+    def call(self, resource_type, action, client, params={}, raw=False, filters=None):
+        name = metal_api.get_resource_type(resource_type).name.split('[')[0]
+        self.calls.append((name, params, filters))
+        project_id = params.get('project_id')
+        time.sleep(self.delays.get(project_id, 0))
+        if project_id in self.failing:
+            raise Exception('forbidden')
+        if name == 'metal_organization_device':
+            return [d for d in self.devices if d['project_id'] in self.organizations[params['organization_id']]]
+        devices = [d for d in self.devices if d['project_id'] == project_id]
+        if name == 'metal_project_device_fingerprint':
+            return [{'id': d['id'], 'metal_state': d['metal_state'], 'updated_at': d['updated_at']} for d in devices]
+        return devices
+
+    def lists(self, name='metal_project_device'):
+        return [params for n, params, filters in self.calls if n == name]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    inventory_loader._load_config_defs(NAME, metal_device, metal_device.__file__)
+    fake = FakeApi([])
+    monkeypatch.setattr(metal_api, 'call', fake.call)
+    return fake
+
+
+def parse(tmp_path, config, cache=True):
+    path = tmp_path / 'test.equinix.yml'
+    path.write_text(yaml.safe_dump(dict({'plugin': NAME, 'metal_api_token': 'token'}, **config)))
+    plugin = metal_device.InventoryModule()
+    plugin._load_name = NAME
+    plugin._redirected_names = []
+    inventory = InventoryData()
+    plugin.parse(inventory, DataLoader(), str(path), cache=cache)
+    # done by the inventory manager after parse
+    plugin.update_cache_if_changed()
+    return plugin, inventory
+
+
+def test_projects_are_merged_in_order(api, tmp_path):
+    api.devices = [device('a-1', PROJECT_IDS[0]), device('b-1', PROJECT_IDS[1]), device('c-1', PROJECT_IDS[2]),
+                   device('a-2', PROJECT_IDS[0])]
+    # the first project is read last
+    api.delays = {PROJECT_IDS[0]: 0.2, PROJECT_IDS[1]: 0.1}
+    plugin, inventory = parse(tmp_path, {'project_ids': PROJECT_IDS, 'max_concurrency': 3})
+    assert list(inventory.hosts) == ['a-1', 'a-2', 'b-1', 'c-1']
+    assert inventory.get_host('b-1').vars['ansible_host'] == '147.75.0.1'
+    assert plugin.read_errors == []
+
+
+def test_failed_project_is_left_out(api, tmp_path):
+    api.devices = [device('a-1', PROJECT_IDS[0]), device('b-1', PROJECT_IDS[1])]
+    api.failing = [PROJECT_IDS[1]]
+    plugin, inventory = parse(tmp_path, {'project_ids': PROJECT_IDS[:2]})
+    assert list(inventory.hosts) == ['a-1']
+    assert plugin.read_errors == ['project %s: forbidden' % PROJECT_IDS[1]]
+
+
+def test_failed_project_fails_with_fail_on_read_errors(api, tmp_path):
+    api.devices = [device('a-1', PROJECT_IDS[0])]
+    api.failing = [PROJECT_IDS[1]]
+    with pytest.raises(AnsibleError, match='Devices of Equinix Metal project not read: %s: forbidden' % PROJECT_IDS[1]):
+        parse(tmp_path, {'project_ids': PROJECT_IDS[:2], 'fail_on_read_errors': True})
+
+
+def test_all_projects_failed(api, tmp_path):
+    api.failing = PROJECT_IDS[:2]
+    with pytest.raises(AnsibleError, match='Devices of no Equinix Metal project could be read'):
+        parse(tmp_path, {'project_ids': PROJECT_IDS[:2]})
+
+
+def cache_config(tmp_path, **config):
+    config.update(cache=True, cache_plugin='jsonfile', cache_connection=str(tmp_path / 'cache'))
+    return config
+
+
+def test_cached_inventory_skips_api(api, tmp_path):
+    api.devices = [device('a-1', PROJECT_IDS[0])]
+    config = cache_config(tmp_path, project_ids=PROJECT_IDS[:1])
+    parse(tmp_path, config)
+    api.devices = [device('a-1', PROJECT_IDS[0]), device('a-2', PROJECT_IDS[0])]
+
+    plugin, inventory = parse(tmp_path, config)
+    assert len(api.lists()) == 1
+    assert list(inventory.hosts) == ['a-1']
+
+    # cache is False on refresh_inventory and --flush-cache
+    plugin, inventory = parse(tmp_path, config, cache=False)
+    assert len(api.lists()) == 2
+    assert list(inventory.hosts) == ['a-1', 'a-2']
+    plugin, inventory = parse(tmp_path, config)
+    assert len(api.lists()) == 2
+    assert list(inventory.hosts) == ['a-1', 'a-2']
+
+
+@pytest.mark.parametrize('option,value', [
+    ('project_ids', PROJECT_IDS[:2]),
+    ('hostvars', ['hostname', 'metal_state']),
+    ('filters', {'metal_state': 'active'}),
+    ('organization_ids', [ORGANIZATION_ID]),
+])
+def test_changed_options_miss_cache(api, tmp_path, option, value):
+    api.devices = [device('a-1', PROJECT_IDS[0])]
+    api.organizations = {ORGANIZATION_ID: PROJECT_IDS[:1]}
+    config = cache_config(tmp_path, project_ids=PROJECT_IDS[:1])
+    parse(tmp_path, config)
+    parse(tmp_path, config)
+    assert len(api.calls) == 1
+
+    parse(tmp_path, dict(config, **{option: value}))
+    assert len(api.calls) > 1
+
+
+def test_partial_inventory_is_not_cached(api, tmp_path):
+    api.devices = [device('a-1', PROJECT_IDS[0]), device('b-1', PROJECT_IDS[1])]
+    api.failing = [PROJECT_IDS[1]]
+    config = cache_config(tmp_path, project_ids=PROJECT_IDS[:2])
+    plugin, inventory = parse(tmp_path, config)
+    assert list(inventory.hosts) == ['a-1']
+
+    api.failing = []
+    plugin, inventory = parse(tmp_path, config)
+    assert list(inventory.hosts) == ['a-1', 'b-1']
+    assert len(api.lists()) == 4
+
+
+def test_incremental_refresh_lists_changed_projects(api, tmp_path):
+    api.devices = [device('a-1', PROJECT_IDS[0]), device('b-1', PROJECT_IDS[1])]
+    config = {'project_ids': PROJECT_IDS[:2], 'incremental_refresh': True, 'metal_api_cache_dir': str(tmp_path / 'projects')}
+    parse(tmp_path, config)
+    assert [p['project_id'] for p in api.lists()] == PROJECT_IDS[:2]
+
+    api.devices[1] = device('b-1', PROJECT_IDS[1], metal_state='inactive', updated_at='2026-01-02T00:00:00Z')
+    plugin, inventory = parse(tmp_path, config)
+    assert len(api.lists('metal_project_device_fingerprint')) == 4
+    assert [p['project_id'] for p in api.lists()] == PROJECT_IDS[:2] + PROJECT_IDS[1:2]
+    assert plugin.unchanged_projects == PROJECT_IDS[:1]
+    assert inventory.get_host('b-1').vars['metal_state'] == 'inactive'
+
+
+def test_organization_devices_of_project_ids(api, tmp_path):
+    api.devices = [device('a-1', PROJECT_IDS[0]), device('b-1', PROJECT_IDS[1]), device('c-1', PROJECT_IDS[2]),
+                   device('a-2', PROJECT_IDS[0])]
+    api.organizations = {ORGANIZATION_ID: PROJECT_IDS[:2]}
+    plugin, inventory = parse(tmp_path, {'organization_ids': [ORGANIZATION_ID]})
+    assert list(inventory.hosts) == ['a-1', 'b-1', 'a-2']
+
+    plugin, inventory = parse(tmp_path, {'organization_ids': [ORGANIZATION_ID], 'project_ids': PROJECT_IDS[1:]})
+    assert list(inventory.hosts) == ['b-1']
+    assert [n for n, params, filters in api.calls] == ['metal_organization_device'] * 2
+
+
+def test_invalid_organization_id(api, tmp_path):
+    with pytest.raises(AnsibleError, match='Invalid organization id: org-1'):
+        parse(tmp_path, {'organization_ids': ['org-1']})
+
+
+@pytest.mark.parametrize('pattern, hostname', [
+    ('web-1', 'web-1'),
+    ('web-*', 'web-'),
+    ('*-db-??', '-db-'),
+    ('web-[0-9]*-prod', '-prod'),
+    ('*', None),
+    ('[ab]?', None),
+])
+def test_hostname_pattern_server_filter(pattern, hostname):
+    assert metal_device.filter_kwargs({'hostname': pattern}).get('hostname') == hostname
+
+
+def test_server_filters():
+    assert metal_device.filter_kwargs({'tags': ['web', 'prod'], 'metro': 'da', 'plan': 'c3.small.x86'}) == {
+        'tag': 'web', 'metro': 'da'}
+    assert metal_device.filter_kwargs({'tags': 'web', 'metro': ['da', 'ny'], 'metal_state': 'active'}) == {'tag': 'web'}
+    assert metal_device.filter_kwargs({}) == {}
+
+
+@pytest.mark.parametrize('filters, matches', [
+    ({}, True),
+    ({'metal_state': 'active'}, True),
+    ({'metal_state': ['inactive', 'active']}, True),
+    ({'metal_state': 'inactive'}, False),
+    ({'plan': 'c3.small.x86', 'metro': ['da', 'ny']}, True),
+    ({'plan': ['m3.large.x86']}, False),
+    ({'tags': ['web']}, True),
+    ({'tags': ['web', 'prod']}, True),
+    ({'tags': ['web', 'db']}, False),
+    ({'hostname': 'web-*'}, True),
+    ({'hostname': 'WEB-*'}, False),
+    ({'hostname': 'web-?3'}, False),
+])
+def test_matches_filters(filters, matches):
+    d = device('web-12', PROJECT_IDS[0], tags=['prod', 'web'])
+    assert metal_device.matches_filters(d, filters) == matches
+
+
+def test_filters_apply_before_hosts(api, tmp_path):
+    api.devices = [
+        device('web-1', PROJECT_IDS[0], tags=['web']),
+        device('web-2', PROJECT_IDS[0], tags=['web'], metal_state='inactive'),
+        device('web-3', PROJECT_IDS[0], tags=['web'], plan='m3.large.x86'),
+        device('db-1', PROJECT_IDS[0], tags=['web', 'db']),
+    ]
+    filters = {'metal_state': 'active', 'plan': 'c3.small.x86', 'tags': ['web'], 'hostname': 'web-*'}
+    plugin, inventory = parse(tmp_path, {'project_ids': PROJECT_IDS[:1], 'filters': filters})
+    assert list(inventory.hosts) == ['web-1']
+    assert [f for n, params, f in api.calls] == [{'tag': 'web', 'hostname': 'web-'}]
+
+
+def test_unknown_filter(api, tmp_path):
+    with pytest.raises(AnsibleError, match='Unknown device filters: state'):
+        parse(tmp_path, {'project_ids': PROJECT_IDS[:1], 'filters': {'state': 'active'}})
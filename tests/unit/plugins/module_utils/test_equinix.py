@@ -0,0 +1,143 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import pytest
+
+from ansible_collections.equinix.cloud.plugins.module_utils import equinix
+from ansible_collections.equinix.cloud.plugins.module_utils.metal import metal_api, metal_client
+
+
+PROJECT_ID = '6ac17ea6-a304-4b01-a1f3-f13a7371cfab'
+
+SSH_KEYS = [
+    {'id': 'key-1', 'label': 'alice', 'key': 'ssh-ed25519 AAAA alice'},
+    {'id': 'key-2', 'label': 'bob', 'key': 'ssh-ed25519 BBBB bob'},
+]
+
+DEVICES = [
+    {'id': 'device-1', 'hostname': 'web-1', 'tags': ['web']},
+    {'id': 'device-2', 'hostname': 'web-2', 'tags': ['web', 'prod']},
+]
+
+DEVICE_SPEC = dict(project_id=dict(type='str'), tags=dict(type='list', elements='str'))
+
+SSH_KEY_SPEC = dict(project_id=dict(type='str'), key=dict(type='str'))
+
+
+def fake_execute(monkeypatch, respond):
+    # respond(api_call) returns the result of an API call, the calls are
+    # recorded in the returned list
+    calls = []
+
+    def execute(api_call, raw=False):
+        calls.append(api_call)
+        return respond(api_call)
+    monkeypatch.setattr(metal_api, 'execute', execute)
+    return calls
+
+
+def list_ssh_keys(api_call):
+    query = api_call.sdk_kwargs.get('query')
+    return [k for k in SSH_KEYS if query is None or query in k['key']]
+
+
+def list_devices(api_call):
+    tag = api_call.sdk_kwargs.get('tag')
+    return [d for d in DEVICES if tag is None or tag in d['tags']]
+
+
+def ssh_key_args(key):
+    return {'metal_api_token': 'token', 'project_id': PROJECT_ID, 'key': key}
+
+
+@pytest.mark.parametrize('stdin', [ssh_key_args(SSH_KEYS[1]['key'])], indirect=['stdin'])
+def test_lookup_found_with_filtered_list(stdin, monkeypatch):
+    module = equinix.EquinixModule(argument_spec=SSH_KEY_SPEC, is_info=True)
+    calls = fake_execute(monkeypatch, list_ssh_keys)
+    assert module.get_one_from_list('metal_project_ssh_key', ['key']) == SSH_KEYS[1]
+    assert [c.sdk_kwargs.get('query') for c in calls] == [SSH_KEYS[1]['key']]
+
+
+@pytest.mark.parametrize('stdin', [{'metal_api_token': 'token', 'project_id': PROJECT_ID, 'tags': ['db']}], indirect=['stdin'])
+def test_lookup_not_found_with_filtered_list(stdin, monkeypatch):
+    # the tag filter is exact, finding nothing with it is final
+    module = equinix.EquinixModule(argument_spec=DEVICE_SPEC, is_info=True)
+    calls = fake_execute(monkeypatch, list_devices)
+    assert module.get_one_with_tags('metal_project_device', ['db']) is None
+    assert [c.sdk_kwargs.get('tag') for c in calls] == ['db']
+
+
+@pytest.mark.parametrize('stdin', [ssh_key_args('ssh-ed25519 CCCC carol')], indirect=['stdin'])
+def test_lookup_not_found_with_stricter_filter_lists_all(stdin, monkeypatch):
+    module = equinix.EquinixModule(argument_spec=SSH_KEY_SPEC, is_info=True)
+    calls = fake_execute(monkeypatch, list_ssh_keys)
+    assert module.get_one_from_list('metal_project_ssh_key', ['key']) is None
+    assert [c.sdk_kwargs.get('query') for c in calls] == ['ssh-ed25519 CCCC carol', None]
+
+
+@pytest.mark.parametrize('stdin', [ssh_key_args(SSH_KEYS[0]['key'])], indirect=['stdin'])
+def test_lookup_rejected_filters_list_all(stdin, monkeypatch):
+    module = equinix.EquinixModule(argument_spec=SSH_KEY_SPEC, is_info=True)
+
+    def respond(api_call):
+        if 'query' in api_call.sdk_kwargs:
+            raise metal_client.ApiException(status=422, reason='Unprocessable Entity')
+        return list_ssh_keys(api_call)
+    calls = fake_execute(monkeypatch, respond)
+    assert module.get_one_from_list('metal_project_ssh_key', ['key']) == SSH_KEYS[0]
+    assert len(calls) == 2
+
+
+class FakeTime(object):
+    # stands in for the time module in equinix, sleeping advances the clock
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def device_args():
+    return {'metal_api_token': 'token', 'project_id': PROJECT_ID, 'metal_api_poll_jitter': 0.0}
+
+
+@pytest.mark.parametrize('stdin', [device_args()], indirect=['stdin'])
+def test_wait_for_resources_condition(stdin, monkeypatch):
+    module = equinix.EquinixModule(argument_spec=dict(project_id=dict(type='str')), is_info=True)
+    monkeypatch.setattr(equinix, 'time', FakeTime())
+    # device-<n> turns active at the poll number n
+    polls = []
+
+    def list_devices(api_call):
+        polls.append(api_call)
+        return [{'id': 'device-{0}'.format(n), 'metal_state': 'active' if n <= len(polls) else 'provisioning'}
+                for n in (1, 2, 3)]
+    fake_execute(monkeypatch, list_devices)
+
+    results = module.wait_for_resources_condition(
+        'metal_project_device', ['device-3', 'device-1'], 'metal_state', 'active', timeout=600)
+    assert len(polls) == 3
+    assert all(p.sdk_kwargs['id'] == PROJECT_ID for p in polls)
+    assert [r['id'] for r in results] == ['device-3', 'device-1']
+    assert all(r['ready'] for r in results)
+    assert results[1]['seconds'] == 0.0
+    assert results[0]['seconds'] > results[1]['seconds']
+    assert results[0]['resource'] == {'id': 'device-3', 'metal_state': 'active'}
+
+
+@pytest.mark.parametrize('stdin', [device_args()], indirect=['stdin'])
+def test_wait_for_resources_condition_times_out(stdin, monkeypatch):
+    module = equinix.EquinixModule(argument_spec=dict(project_id=dict(type='str')), is_info=True)
+    monkeypatch.setattr(equinix, 'time', FakeTime())
+    fake_execute(monkeypatch, lambda api_call: [{'id': 'device-1', 'metal_state': 'provisioning'}])
+
+    results = module.wait_for_resources_condition(
+        'metal_project_device', ['device-1', 'device-2'], 'metal_state', 'active', timeout=60)
+    assert [r['ready'] for r in results] == [False, False]
+    assert results[0]['resource'] == {'id': 'device-1', 'metal_state': 'provisioning'}
+    assert results[1]['resource'] is None
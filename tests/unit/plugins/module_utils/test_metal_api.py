@@ -0,0 +1,669 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import functools
+import json
+import types
+
+import pytest
+
+from ansible_collections.equinix.cloud.plugins.module_utils import action
+from ansible_collections.equinix.cloud.plugins.module_utils.metal import (
+    api_routes, http_cache, lookup_cache, metal_api, metal_client, polling, rate_limit, retry, ttl_cache,
+)
+
+
+DEVICE = {
+    'always_pxe': False,
+    'billing_cycle': 'hourly',
+    'customdata': {},
+    'facility': {'code': 'sv15'},
+    'hostname': 'device-1',
+    'id': '71a90c54-e0eb-414f-9ea2-9c39ecb32319',
+    'ip_addresses': [{'address': '10.0.0.1', 'address_family': 4, 'public': False}],
+    'network_ports': [{'id': 'port-1', 'name': 'eth0', 'bond': {'id': 'bond-1'}}],
+    'locked': False,
+    'state': 'active',
+    'metro': {'code': 'sv'},
+    'operating_system': {'slug': 'ubuntu_22_04'},
+    'plan': {'slug': 'c3.small.x86'},
+    'project': {'id': '6ac17ea6-a304-4b01-a1f3-f13a7371cfab'},
+    'ssh_keys': [],
+    'tags': ['web'],
+    'userdata': '',
+}
+
+
+def test_compiled_mapper_maps_device():
+    mapper = metal_api.compile_attribute_mapper(metal_api.METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP)
+    result = mapper(DEVICE)
+    assert list(result) == list(metal_api.METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP)
+    assert result['facility'] == 'sv15'
+    assert result['plan'] == 'c3.small.x86'
+    assert result['metal_state'] == 'active'
+    assert result['hardware_reservation_id'] == ''
+    assert result['network_ports'] == [{'id': 'port-1', 'name': 'eth0', 'bond': 'bond-1'}]
+
+
+@pytest.mark.parametrize('path', ['a.b', 'a.b.c'])
+def test_compiled_mapper_missing_dotted_value(path):
+    mapper = metal_api.compile_attribute_mapper({'x': path})
+    for response_dict in [{}, {'a': None}, {'a': {}}, {'a': {'b': None}}]:
+        with pytest.raises(Exception, match="attribute '{0}' \\(to map to 'x'\\) not found".format(path)):
+            mapper(response_dict)
+
+
+def test_compiled_mapper_missing_plain_value():
+    mapper = metal_api.compile_attribute_mapper({'x': 'y'})
+    with pytest.raises(Exception, match="attribute 'x' \\(to map to 'y'\\) not found"):
+        mapper({})
+    assert mapper({'y': None}) == {'x': None}
+
+
+def test_compiled_mappers_are_cached():
+    attribute_map = metal_api.METAL_PROJECT_RESPONSE_ATTRIBUTE_MAP
+    assert metal_api.get_compiled_mapper(attribute_map) is metal_api.get_compiled_mapper(attribute_map)
+
+
+# The raw JSON path must produce the same Ansible dicts as the SDK model path.
+
+def raw_device(i, **overrides):
+    device = {
+        'always_pxe': False,
+        'billing_cycle': 'hourly',
+        'created_at': '2023-01-02T03:04:05Z',
+        'customdata': {'note': None, 'nested': {'key': None}},
+        'facility': {'code': 'sv15', 'href': '/metal/v1/facilities/fac-1', 'name': None},
+        'hardware_reservation': None,
+        'hostname': 'device-{0}'.format(i),
+        'href': '/metal/v1/devices/device-{0}'.format(i),
+        'id': 'device-{0}'.format(i),
+        'ip_addresses': [
+            {'address': '10.0.0.{0}'.format(i), 'address_family': 4, 'public': False,
+             'href': '/metal/v1/ips/ip-{0}'.format(i), 'assigned_to': {'href': '/metal/v1/devices/device-{0}'.format(i)}},
+        ],
+        'ipxe_script_url': None,
+        'locked': False,
+        'metro': {'code': 'sv', 'href': '/metal/v1/locations/metros/metro-sv'},
+        'network_ports': [
+            {'id': 'port-{0}'.format(i), 'name': 'bond0', 'type': 'NetworkBondPort', 'network_type': 'layer3',
+             'bond': None, 'native_virtual_network': None, 'virtual_networks': []},
+            {'id': 'port-{0}-eth0'.format(i), 'name': 'eth0', 'type': 'NetworkPort',
+             'bond': {'id': 'port-{0}'.format(i), 'name': 'bond0'}, 'virtual_networks': [{'href': '/metal/v1/virtual-networks/vlan-1'}]},
+        ],
+        'operating_system': {'slug': 'ubuntu_22_04', 'href': '/metal/v1/operating-systems/os-1', 'pricing': {}},
+        'plan': {'slug': 'c3.small.x86', 'href': '/metal/v1/plans/plan-1'},
+        'project': {'href': '/metal/v1/projects/project-1'},
+        'spot_instance': None,
+        'ssh_keys': [{'href': '/metal/v1/ssh-keys/key-1'}],
+        'state': 'active',
+        'tags': ['web'],
+        'userdata': '',
+    }
+    device.update(overrides)
+    return device
+
+
+def raw_ip_reservation(i):
+    return {
+        'address_family': 4,
+        'cidr': 29,
+        'customdata': {},
+        'details': None,
+        'href': '/metal/v1/ips/reservation-{0}'.format(i),
+        'id': 'reservation-{0}'.format(i),
+        'management': False,
+        'metro': {'code': 'da', 'href': '/metal/v1/locations/metros/metro-da'},
+        'netmask': '255.255.255.248',
+        'network': '147.75.{0}.0'.format(i),
+        'gateway': '147.75.{0}.1'.format(i),
+        'project': {'href': '/metal/v1/projects/project-1'},
+        'public': True,
+        'tags': [],
+        'type': 'public_ipv4',
+    }
+
+
+def model_path(resource_type, body):
+    import equinix.services.metalv1 as equinix_metal
+    models = {
+        'metal_device': equinix_metal.Device,
+        'metal_project_device': equinix_metal.DeviceList,
+        'metal_ip_reservation': equinix_metal.IPReservationList,
+    }
+    rt = metal_api.get_resource_type(resource_type)
+    response = models[resource_type].from_dict(body)
+    if rt.list_key is None:
+        return metal_api.response_to_ansible_dict(response, rt.attribute_map)
+    return [metal_api.response_to_ansible_dict(r, rt.attribute_map)
+            for r in metal_api.find_list_in_response(response, rt.list_key)]
+
+
+def raw_path(resource_type, body):
+    rt = metal_api.get_resource_type(resource_type)
+    if rt.list_key is None:
+        return metal_api.raw_response_to_ansible_dict(body, rt.attribute_map)
+    return [metal_api.raw_response_to_ansible_dict(r, rt.attribute_map) for r in body[rt.list_key]]
+
+
+@pytest.mark.parametrize('resource_type,body', [
+    ('metal_device', raw_device(1)),
+    ('metal_device', raw_device(2, spot_instance=True, spot_price_max=0.5, hardware_reservation={'href': '/metal/v1/hardware-reservations/hr-1'})),
+    ('metal_project_device', {'devices': [raw_device(i) for i in range(3)], 'meta': {'next': None}}),
+    ('metal_ip_reservation', {'ip_addresses': [raw_ip_reservation(i) for i in range(3)]}),
+])
+def test_raw_path_equals_model_path(resource_type, body):
+    assert raw_path(resource_type, body) == model_path(resource_type, body)
+
+
+def test_device_network_frozen_is_mapped():
+    # module runs diff network_frozen against the mapped device
+    assert raw_path('metal_device', raw_device(1, network_frozen=True))['network_frozen'] is True
+    assert model_path('metal_device', raw_device(1))['network_frozen'] is False
+
+
+def test_raw_resource_dict_drops_nones_and_adds_ids():
+    resource = metal_api.raw_resource_dict(raw_device(1))
+    assert 'ipxe_script_url' not in resource
+    assert resource['facility'] == {'code': 'sv15', 'href': '/metal/v1/facilities/fac-1', 'id': 'fac-1'}
+    assert resource['project'] == {'href': '/metal/v1/projects/project-1', 'id': 'project-1'}
+    assert resource['ssh_keys'] == [{'href': '/metal/v1/ssh-keys/key-1', 'id': 'key-1'}]
+    # free-form attributes are kept as they are, like in the SDK models
+    assert resource['customdata'] == {'note': None, 'nested': {'key': None}}
+
+
+class FakeHTTPResponse(object):
+    def __init__(self, status, body, headers=None):
+        self.status = status
+        self.reason = 'reason'
+        self.data = json.dumps(body).encode('utf-8')
+        self.headers = headers or {}
+
+
+def project_devices_call(monkeypatch, pages):
+    import equinix.services.metalv1 as equinix_metal
+    client = metal_client.get_equinix_metal_client('token')
+    api = api_routes.get_routes(client).api.DevicesApi
+    requested = []
+
+    @functools.wraps(equinix_metal.DevicesApi.find_project_devices_without_preload_content)
+    def find_project_devices_without_preload_content(self, **kwargs):
+        requested.append(kwargs)
+        return pages[kwargs['page'] - 1]
+
+    @functools.wraps(equinix_metal.DevicesApi.find_project_devices)
+    def find_project_devices(self, **kwargs):
+        return equinix_metal.DeviceList.from_dict(json.loads(pages[kwargs['page'] - 1].data))
+
+    # bound to the API object, like the SDK methods
+    monkeypatch.setattr(api, 'find_project_devices_without_preload_content',
+                        types.MethodType(find_project_devices_without_preload_content, api))
+    monkeypatch.setattr(api, 'find_project_devices',
+                        types.MethodType(find_project_devices, api))
+    api_call = metal_api.prepare_call('metal_project_device', action.LIST, client, {'project_id': 'project-1'})
+    return api_call, requested
+
+
+def test_execute_raw_fetches_all_pages(monkeypatch):
+    pages = [
+        FakeHTTPResponse(200, {'devices': [raw_device(1)], 'meta': {'next': {'href': '/page/2'}}}),
+        FakeHTTPResponse(200, {'devices': [raw_device(2)], 'meta': {'next': None}}),
+    ]
+    api_call, requested = project_devices_call(monkeypatch, pages)
+    raw_result = metal_api.execute(api_call, raw=True)
+    assert [(r['id'], r['page']) for r in requested] == [('project-1', 1), ('project-1', 2)]
+    assert [d['hostname'] for d in raw_result] == ['device-1', 'device-2']
+    assert raw_result == metal_api.execute(api_call)
+
+
+def test_execute_fetches_pages_concurrently(monkeypatch):
+    meta = {'last_page': 3, 'next': {'href': '/next'}}
+    pages = [FakeHTTPResponse(200, {'devices': [raw_device(i)], 'meta': meta}) for i in range(1, 4)]
+    api_call, requested = project_devices_call(monkeypatch, pages)
+    raw_result = metal_api.execute(api_call, raw=True)
+    assert sorted(r['page'] for r in requested) == [1, 2, 3]
+    assert [d['hostname'] for d in raw_result] == ['device-1', 'device-2', 'device-3']
+    assert raw_result == metal_api.execute(api_call)
+
+
+def test_execute_raw_raises_sdk_exceptions(monkeypatch):
+    api_call, _ = project_devices_call(monkeypatch, [FakeHTTPResponse(404, {'errors': ['Not found']})])
+    with pytest.raises(metal_client.NotFoundException):
+        metal_api.execute(api_call, raw=True)
+
+
+def test_lookup_filters_are_bound_to_list_call():
+    rt = metal_api.get_resource_type('metal_project_device')
+    filters = rt.filter_kwargs({'hostname': 'web-1', 'tags': ['web', 'prod'], 'plan': 'c3.small.x86'})
+    assert filters == {'hostname': 'web-1', 'tag': 'web'}
+
+    client = metal_client.get_equinix_metal_client('token')
+    api_call = metal_api.prepare_call('metal_project_device', action.LIST, client, {'project_id': 'project-1'}, filters)
+    assert api_call.sdk_kwargs['hostname'] == 'web-1'
+    assert api_call.sdk_kwargs['tag'] == 'web'
+
+
+def test_lookup_filters_not_taken_by_sdk_are_ignored():
+    client = metal_client.get_equinix_metal_client('token')
+    api_call = metal_api.prepare_call('metal_vrf', action.LIST, client, {'project_id': 'project-1'}, {'name': 'vrf-1'})
+    assert 'name' not in api_call.sdk_kwargs
+
+
+def test_needed_attributes():
+    needed = metal_api.needed_attributes(metal_api.METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP)
+    assert needed['plan'] is True
+    assert needed['ip_addresses'] is True
+    # project_id is populated from the href of the project
+    assert needed['project'] is False
+    assert metal_api.needed_attributes({'x': lambda resource: resource['x']}) is None
+
+
+def test_default_exclude_keeps_what_the_map_reads():
+    import equinix.services.metalv1 as equinix_metal
+    exclude = metal_api.derive_exclude(metal_api.METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP, equinix_metal.Device)
+    assert 'project' in exclude
+    assert 'provisioning_events' in exclude
+    for attr in ['facility', 'ip_addresses', 'metro', 'network_ports', 'operating_system', 'plan']:
+        assert attr not in exclude
+    # href-only objects are not worth excluding
+    assert 'ssh_keys' not in exclude
+
+
+def test_include_and_exclude_params_extend_defaults():
+    client = metal_client.get_equinix_metal_client('token')
+    api_call = metal_api.prepare_call('metal_project_device', action.LIST, client,
+                                      {'project_id': 'project-1', 'include': ['project'], 'exclude': ['plan']})
+    assert api_call.sdk_kwargs['include'] == ['project']
+    assert 'project' not in api_call.sdk_kwargs['exclude']
+    assert 'provisioning_events' in api_call.sdk_kwargs['exclude']
+    assert 'plan' in api_call.sdk_kwargs['exclude']
+
+    api_call = metal_api.prepare_call('metal_gateway', action.LIST, client,
+                                      {'project_id': 'project-1', 'include': ['virtual_network']})
+    assert api_call.sdk_kwargs['include'] == ['ip_reservation', 'virtual_network']
+
+
+def fake_pages(count, last_page=True, rate_limited=()):
+    fetched = []
+
+    def fetch_page(page):
+        fetched.append(page)
+        if page in rate_limited:
+            rate_limited.remove(page)
+            raise metal_client.ApiException(status=429)
+        return {'page': page, 'meta': {'last_page': count if last_page else None, 'next': page < count or None}}
+
+    def page_meta(response):
+        return response['meta']['last_page'], response['meta']['next'] is not None
+
+    return fetch_page, page_meta, fetched
+
+
+def test_fetch_all_pages_in_order():
+    fetch_page, page_meta, fetched = fake_pages(9)
+    responses = metal_api.fetch_all_pages(fetch_page, page_meta, workers=3)
+    assert [r['page'] for r in responses] == list(range(1, 10))
+    assert sorted(fetched) == list(range(1, 10))
+
+
+def test_fetch_all_pages_without_last_page_follows_next():
+    fetch_page, page_meta, fetched = fake_pages(4, last_page=False)
+    responses = metal_api.fetch_all_pages(fetch_page, page_meta, workers=3)
+    assert [r['page'] for r in responses] == [1, 2, 3, 4]
+    assert fetched == [1, 2, 3, 4]
+
+
+def test_fetch_all_pages_falls_back_to_sequential_on_429():
+    fetch_page, page_meta, fetched = fake_pages(6, rate_limited=[3])
+    responses = metal_api.fetch_all_pages(fetch_page, page_meta, workers=2)
+    assert [r['page'] for r in responses] == list(range(1, 7))
+    assert fetched.count(3) == 2
+
+
+def test_fetch_all_pages_raises_other_errors():
+    def fetch_page(page):
+        if page == 2:
+            raise metal_client.ApiException(status=500)
+        return {'page': page, 'meta': {'last_page': 3, 'next': None}}
+
+    with pytest.raises(metal_client.ApiException):
+        metal_api.fetch_all_pages(fetch_page, lambda r: (r['meta']['last_page'], False), workers=2)
+
+
+def test_page_size_defaults_to_resource_size():
+    import equinix.services.metalv1 as equinix_metal
+    exclude = metal_api.derive_exclude(metal_api.METAL_DEVICE_RESPONSE_ATTRIBUTE_MAP, equinix_metal.Device)
+    device_page_size = metal_api.derive_page_size(equinix_metal.Device, exclude)
+    project_page_size = metal_api.derive_page_size(equinix_metal.Project, [])
+    assert metal_api.MIN_PAGE_SIZE <= device_page_size < project_page_size <= metal_api.MAX_PAGE_SIZE
+    # excluded nested objects make resources smaller
+    assert metal_api.derive_page_size(equinix_metal.Device, []) < device_page_size
+
+
+def test_device_fingerprint_list_is_small():
+    client = metal_client.get_equinix_metal_client('token')
+    params = {'project_id': 'project-1'}
+    api_call = metal_api.prepare_call('metal_project_device_fingerprint', action.LIST, client, params)
+    for attr in ['ip_addresses', 'plan', 'operating_system', 'network_ports']:
+        assert attr in api_call.sdk_kwargs['exclude']
+    devices_call = metal_api.prepare_call('metal_project_device', action.LIST, client, params)
+    assert api_call.sdk_kwargs['per_page'] > devices_call.sdk_kwargs['per_page']
+
+
+def test_projected_resource_type():
+    rt = metal_api.projected_resource_type('metal_project_device', ['hostname', 'ip_addresses', 'project_id'])
+    assert list(rt.attribute_map) == ['hostname', 'ip_addresses', 'project_id']
+    client = metal_client.get_equinix_metal_client('token')
+    api_call = metal_api.prepare_call(rt, action.LIST, client, {'project_id': 'project-1'})
+    assert 'ip_addresses' not in api_call.sdk_kwargs['exclude']
+    for attr in ['plan', 'network_ports', 'operating_system']:
+        assert attr in api_call.sdk_kwargs['exclude']
+    mapped = metal_api.raw_response_to_ansible_dict(DEVICE, rt.attribute_map)
+    assert mapped == {'hostname': 'device-1', 'ip_addresses': DEVICE['ip_addresses'],
+                      'project_id': '6ac17ea6-a304-4b01-a1f3-f13a7371cfab'}
+    with pytest.raises(ValueError):
+        metal_api.projected_resource_type('metal_project_device', ['hostname', 'nope'])
+
+
+def test_page_size_param():
+    client = metal_client.get_equinix_metal_client('token')
+    api_call = metal_api.prepare_call('metal_project_device', action.LIST, client, {'project_id': 'project-1'})
+    assert api_call.sdk_kwargs['per_page'] == metal_api._DEFAULT_PAGE_SIZES['metal_project_device']
+    api_call = metal_api.prepare_call('metal_project_device', action.LIST, client, {'project_id': 'project-1', 'page_size': 1000})
+    assert api_call.sdk_kwargs['per_page'] == 1000
+    with pytest.raises(ValueError):
+        metal_api.prepare_call('metal_project_device', action.LIST, client, {'project_id': 'project-1', 'page_size': 1001})
+    # single page LISTs keep the API default
+    api_call = metal_api.prepare_call('metal_ip_reservation', action.LIST, client, {'project_id': 'project-1'})
+    assert 'per_page' not in api_call.sdk_kwargs
+
+
+def test_clients_share_connection_pool(monkeypatch):
+    client = metal_client.get_equinix_metal_client('token', metal_client.API_URL)
+    assert metal_client.get_equinix_metal_client('token', metal_client.API_URL) is client
+    assert metal_client.get_equinix_metal_client('other-token', metal_client.API_URL) is not client
+    assert client.configuration.connection_pool_maxsize == metal_client.POOL_MAXSIZE
+    monkeypatch.setenv('METAL_API_POOL_MAXSIZE', '3')
+    monkeypatch.setenv('METAL_API_READ_TIMEOUT', '5')
+    configured = metal_client.get_equinix_metal_client('token', metal_client.API_URL)
+    assert configured is not client
+    assert configured.configuration.connection_pool_maxsize == 3
+    assert metal_client.request_options(configured) == {'_request_timeout': (metal_client.CONNECT_TIMEOUT, 5.0)}
+    with pytest.raises(ValueError):
+        metal_client.get_equinix_metal_client('token', pool_maxsize=0)
+
+
+def test_api_calls_pass_request_timeout(monkeypatch):
+    pages = [FakeHTTPResponse(200, {'devices': [raw_device(1)], 'meta': {'next': None}})]
+    api_call, requested = project_devices_call(monkeypatch, pages)
+    metal_api.execute(api_call, raw=True)
+    timeout = (metal_client.CONNECT_TIMEOUT, metal_client.READ_TIMEOUT)
+    assert [r['_request_timeout'] for r in requested] == [timeout]
+
+
+def flaky(*outcomes):
+    # returns (or raises) the outcomes one by one
+    outcomes = list(outcomes)
+    calls = []
+
+    def sdk_function(**kwargs):
+        calls.append(kwargs)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return sdk_function, calls
+
+
+def api_exception(status, headers=None):
+    e = metal_client.ApiException(status=status, reason='reason')
+    e.headers = headers or {}
+    return e
+
+
+def test_retry_honors_retry_after():
+    sleeps = []
+    policy = retry.RetryPolicy(sleep=sleeps.append)
+    sdk_function, calls = flaky(api_exception(429, {'Retry-After': '7'}), api_exception(503), 'ok')
+    assert policy.call(sdk_function, {'id': 'x'}) == 'ok'
+    assert calls == [{'id': 'x'}] * 3
+    assert 7 <= sleeps[0] <= 7 + retry.BASE_DELAY
+    # second retry, backed off to between 1 and 2 base delays
+    assert retry.BASE_DELAY <= sleeps[1] <= 2 * retry.BASE_DELAY
+    assert policy.stats.as_dict() == {'calls': 3, 'retries': 2, 'retry_wait_seconds': round(sum(sleeps), 3),
+                                      'throttle_wait_seconds': 0.0}
+
+
+def test_retry_gives_up():
+    policy = retry.RetryPolicy(max_retries=2, sleep=lambda s: None)
+    sdk_function, calls = flaky(*[api_exception(500)] * 3)
+    with pytest.raises(metal_client.ApiException):
+        policy.call(sdk_function, {})
+    assert len(calls) == 3
+    # client errors are not retried
+    sdk_function, calls = flaky(api_exception(422))
+    with pytest.raises(metal_client.ApiException):
+        policy.call(sdk_function, {})
+    assert len(calls) == 1
+
+
+def test_retry_only_idempotent_calls():
+    sdk_function, calls = flaky(api_exception(429), 'created')
+    with pytest.raises(metal_client.ApiException):
+        retry.RetryPolicy(sleep=lambda s: None).call(sdk_function, {}, idempotent=False)
+    assert retry.RetryPolicy(retry_writes=True, sleep=lambda s: None).call(sdk_function, {}, idempotent=False) == 'created'
+    client = metal_client.get_equinix_metal_client('token')
+    assert metal_api.prepare_call('metal_project', action.GET, client, {'id': 'x'}).idempotent
+    assert not metal_api.prepare_call('metal_project', action.CREATE, client, {'name': 'x'}).idempotent
+
+
+def test_execute_raw_retries_pages(monkeypatch):
+    sleeps = []
+    pages = [FakeHTTPResponse(200, {'devices': [raw_device(1)], 'meta': {'next': None}})]
+    api_call, requested = project_devices_call(monkeypatch, pages)
+    sdk_function, calls = flaky(FakeHTTPResponse(503, {}, {'Retry-After': '0'}), pages[0])
+    monkeypatch.setattr(api_call.conf.func.__self__, 'find_project_devices_without_preload_content',
+                        lambda **kwargs: sdk_function(**kwargs))
+    monkeypatch.setattr(api_call, 'retry_policy', retry.RetryPolicy(sleep=sleeps.append))
+    assert [d['hostname'] for d in metal_api.execute(api_call, raw=True)] == ['device-1']
+    assert [c['page'] for c in calls] == [1, 1]
+    assert len(sleeps) == 1
+
+
+def test_retry_after_header():
+    assert retry.retry_after({}) is None
+    assert retry.retry_after({'retry-after': '2.5'}) == 2.5
+    assert retry.retry_after({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}) == 0.0
+    assert retry.retry_after({'Retry-After': 'soon'}) is None
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_file_token_bucket(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / 'bucket')
+    # two processes sharing the file
+    buckets = [rate_limit.FileTokenBucket(path, rate=2, burst=2, sleep=clock.sleep, clock=clock) for _ in range(2)]
+    waits = [buckets[i % 2].acquire() for i in range(5)]
+    assert waits == [0.0, 0.0, 0.5, 0.5, 0.5]
+    clock.now += 10
+    # refilled, but not above burst
+    assert [buckets[0].acquire() for i in range(3)] == [0.0, 0.0, 0.5]
+
+
+def test_bucket_path_is_per_token(tmp_path):
+    path = rate_limit.bucket_path('token', str(tmp_path))
+    assert path.startswith(str(tmp_path))
+    assert 'token' not in path[len(str(tmp_path)):]
+    assert path == rate_limit.bucket_path('token', str(tmp_path)) != rate_limit.bucket_path('other', str(tmp_path))
+
+
+def test_retry_policy_acquires_limiter():
+    acquired = []
+    limiter = type('Limiter', (), {'acquire': lambda self: acquired.append(1) or 0.25})()
+    policy = retry.RetryPolicy(sleep=lambda s: None, limiter=limiter)
+    sdk_function, calls = flaky(api_exception(503), 'ok')
+    assert policy.call(sdk_function, {}) == 'ok'
+    assert len(acquired) == 2
+    assert policy.stats.as_dict()['throttle_wait_seconds'] == 0.5
+
+
+def device_get_call(monkeypatch, responses, cache):
+    import equinix.services.metalv1 as equinix_metal
+    client = metal_client.get_equinix_metal_client('token')
+    api = api_routes.get_routes(client).api.DevicesApi
+    requested = []
+
+    @functools.wraps(equinix_metal.DevicesApi.find_device_by_id_without_preload_content)
+    def find_device_by_id_without_preload_content(self, **kwargs):
+        requested.append(kwargs)
+        return responses.pop(0)
+
+    monkeypatch.setattr(api, 'find_device_by_id_without_preload_content',
+                        types.MethodType(find_device_by_id_without_preload_content, api))
+    api_call = metal_api.prepare_call('metal_device', action.GET, client, {'id': 'device-1'})
+    monkeypatch.setattr(api_call, 'http_cache', cache)
+    return api_call, requested
+
+
+def test_conditional_get(monkeypatch):
+    cache = http_cache.ConditionalCache('namespace')
+    responses = [
+        FakeHTTPResponse(200, raw_device(1), {'ETag': '"v1"'}),
+        FakeHTTPResponse(304, None),
+        FakeHTTPResponse(200, raw_device(1, hostname='changed'), {'ETag': '"v2"'}),
+    ]
+    api_call, requested = device_get_call(monkeypatch, responses, cache)
+    first = metal_api.execute(api_call)
+    assert first == model_path('metal_device', raw_device(1))
+    assert metal_api.execute(api_call) == first
+    assert metal_api.execute(api_call, raw=True)['hostname'] == 'changed'
+    assert [r.get('_headers') for r in requested] == [None, {'If-None-Match': '"v1"'}, {'If-None-Match': '"v1"'}]
+    assert cache.hits == 1
+
+
+def test_conditional_get_cache_on_disk(monkeypatch, tmp_path):
+    responses = [
+        FakeHTTPResponse(200, raw_device(1), {'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}),
+        FakeHTTPResponse(304, None),
+    ]
+    api_call, requested = device_get_call(monkeypatch, responses, http_cache.ConditionalCache('namespace', str(tmp_path)))
+    first = metal_api.execute(api_call)
+    # a later module run
+    monkeypatch.setattr(api_call, 'http_cache', http_cache.ConditionalCache('namespace', str(tmp_path)))
+    assert metal_api.execute(api_call) == first
+    assert requested[1]['_headers'] == {'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+    assert [oct(p.stat().st_mode & 0o777) for p in tmp_path.iterdir()] == ['0o600']
+    # other tokens don't see the entry
+    other = http_cache.ConditionalCache('other', str(tmp_path))
+    assert other.get(other.key(api_call.conf.binder.raw_func_name, api_call.path_kwargs)) is None
+
+
+def test_ttl_cache(tmp_path):
+    clock = FakeClock()
+    cache = ttl_cache.TTLCache('namespace', str(tmp_path), clock=clock)
+    key = cache.key('metal_plan', {'slug': 'c3.small.x86'})
+    assert cache.get(key, 60) is None
+    cache.put(key, [{'slug': 'c3.small.x86'}])
+    # another module run
+    assert ttl_cache.TTLCache('namespace', str(tmp_path), clock=clock).get(key, 60) == [{'slug': 'c3.small.x86'}]
+    clock.now += 60
+    assert cache.get(key, 60) is None
+    assert cache.get(key, 120) == [{'slug': 'c3.small.x86'}]
+    assert key != cache.key('metal_plan', {}) != ttl_cache.TTLCache('other', str(tmp_path)).key('metal_plan', {})
+    # values which aren't JSON are not cached
+    cache.put(key, [object()])
+    assert cache.get(key, 120) == [{'slug': 'c3.small.x86'}]
+    assert [p.name for p in tmp_path.iterdir()] == [key + '.json']
+
+
+def test_related_resource_types():
+    assert set(metal_api.related_resource_types('metal_device')) == {
+        'metal_device', 'metal_project_device', 'metal_organization_device'}
+
+
+def test_lookup_cache_applies_writes(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / 'cache' / lookup_cache.FILE_NAME)
+    cache = lookup_cache.LookupCache('namespace', path, 60, clock=clock)
+    devices = ['metal_device', 'metal_project_device', 'metal_organization_device']
+    in_project = cache.key('metal_project_device', {'id': 'project-1'})
+    in_organization = cache.key('metal_organization_device', {'id': 'organization-1'})
+    cache.put(in_project, 'metal_project_device', {'project_id': 'project-1'}, [{'id': 'd1', 'hostname': 'a'}])
+    cache.put(in_organization, 'metal_organization_device', {'organization_id': 'organization-1'}, [])
+    # another module run
+    cache = lookup_cache.LookupCache('namespace', path, 60, clock=clock)
+    cache.created(devices, {'project_id': 'project-1', 'hostname': 'b'}, {'id': 'd2', 'hostname': 'b'})
+    cache.created(devices, {'project_id': 'project-2', 'hostname': 'c'}, {'id': 'd3', 'hostname': 'c'})
+    assert cache.get(in_project) == [{'id': 'd1', 'hostname': 'a'}, {'id': 'd2', 'hostname': 'b'}]
+    # the create params don't tell the organization
+    assert cache.get(in_organization) is None
+    cache.updated(devices, {'id': 'd1', 'hostname': 'renamed'})
+    cache.deleted(devices, 'd2')
+    assert cache.get(in_project) == [{'id': 'd1', 'hostname': 'renamed'}]
+    assert lookup_cache.LookupCache('other', path, 60, clock=clock).get(in_project) is None
+    clock.now += 60
+    assert cache.get(in_project) is None
+
+
+def test_poll_policy_backs_off():
+    policy = polling.PollPolicy(initial_interval=1, multiplier=2, max_interval=10, jitter=0)
+    assert [policy.interval(a) for a in range(6)] == [1, 2, 4, 8, 10, 10]
+    # half of the estimated time left, within the bounds
+    assert [policy.interval(0, left) for left in (0, 8, 600)] == [1, 4, 10]
+    jittered = polling.PollPolicy(initial_interval=1, jitter=0.5)
+    assert all(0.5 <= jittered.interval(0) <= 1.5 for _ in range(100))
+    with pytest.raises(ValueError):
+        polling.PollPolicy(initial_interval=10, max_interval=1)
+
+
+def test_progress_estimate():
+    clock = FakeClock()
+    progress = polling.ProgressEstimate(clock=clock)
+    assert progress.update(None) is None
+    assert progress.update(10) is None
+    clock.now += 60
+    assert progress.update(10) is None
+    clock.now += 60
+    # 20% in 120s, 70% left
+    assert progress.update(30) == 420
+
+
+def test_device_batch_create_call():
+    client = metal_client.get_equinix_metal_client('token')
+    params = {'project_id': 'project-1', 'hostname': None, 'wait': True}
+    params['batches'] = [api_routes.device_batch_model(dict(
+        params, hostnames=['web-1', 'web-2'], quantity=2, metro='sv', plan='c3.small.x86',
+        operating_system='ubuntu_22_04', ip_addresses=[{'address_family': 4, 'public': False}]))]
+    api_call = metal_api.prepare_call('metal_device_batches', action.CREATE, client, params)
+    assert api_call.sdk_kwargs['id'] == 'project-1'
+    batch = api_call.sdk_kwargs['instances_batch_create_input'].batches[0]
+    assert batch.hostnames == ['web-1', 'web-2']
+    assert batch.quantity == 2
+    body = batch.to_dict()
+    assert 'facility' not in body
+    assert body['metro'] == 'sv'
+    assert body['ip_addresses'] == [{'address_family': 4, 'public': False}]
+
+    response = {'batches': [{
+        'id': 'batch-1',
+        'state': 'completed',
+        'quantity': 2,
+        'devices': [{'href': '/metal/v1/devices/device-1'}, {'href': '/metal/v1/devices/device-2'}],
+    }]}
+    mapped = metal_api.raw_response_to_ansible_dict(response, metal_api.METAL_DEVICE_BATCHES_RESPONSE_ATTRIBUTE_MAP)
+    assert mapped == {'batches': [{
+        'id': 'batch-1', 'state': 'completed', 'quantity': 2,
+        'device_ids': ['device-1', 'device-2'], 'error_messages': None,
+    }]}
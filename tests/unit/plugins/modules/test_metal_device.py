@@ -0,0 +1,333 @@
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+
+import pytest
+
+from ansible_collections.equinix.cloud.plugins.module_utils import action, equinix
+from ansible_collections.equinix.cloud.plugins.module_utils.metal import metal_api, metal_client
+from ansible_collections.equinix.cloud.plugins.modules import metal_device
+
+
+PROJECT_ID = '6ac17ea6-a304-4b01-a1f3-f13a7371cfab'
+DEVICE_ID = '71a90c54-e0eb-414f-9ea2-9c39ecb32319'
+
+
+class FakeTime(object):
+    # stands in for the time module in equinix, sleeping advances the clock
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeProject(object):
+    """
+    Devices of a project and the batches creating them, served in place of
+    metal_api.execute(). reject(hostnames) returns an ApiException for the
+    batch requests the API rejects, batches with a hostname in fail end in
+    the failed state.
+    """
+
+    def __init__(self, devices=(), reject=None, fail=()):
+        self.devices = list(devices)
+        self.batches = {}
+        self.waves = []
+        self.lists = 0
+        self.updates = []
+        self.reject = reject
+        self.fail = fail
+
+    def execute(self, api_call, raw=False):
+        key = (metal_api.get_resource_type(api_call.resource_type).name, api_call.action)
+        return {
+            ('metal_device_batches', action.CREATE): self.create_batch,
+            ('metal_device_batch', action.GET): self.get_batch,
+            ('metal_project_device', action.LIST): self.list_devices,
+            ('metal_device', action.UPDATE): self.update_device,
+        }[key](api_call)
+
+    def create_batch(self, api_call):
+        assert api_call.sdk_kwargs['id'] == PROJECT_ID
+        hostnames = api_call.sdk_kwargs['instances_batch_create_input'].batches[0].hostnames
+        self.waves.append(hostnames)
+        error = self.reject(hostnames) if self.reject else None
+        if error is not None:
+            raise error
+        batch_id = 'batch-{0}'.format(len(self.batches) + 1)
+        if any(h in self.fail for h in hostnames):
+            self.batches[batch_id] = batch(batch_id, 'failed', hostnames, [], ['no capacity in sv'])
+        else:
+            devices = [{'id': 'device-' + h, 'hostname': h, 'metal_state': 'active'} for h in hostnames]
+            self.devices.extend(devices)
+            self.batches[batch_id] = batch(batch_id, 'completed', hostnames, [d['id'] for d in devices])
+        return {'batches': [batch(batch_id, 'pending', hostnames, [])]}
+
+    def get_batch(self, api_call):
+        return self.batches[api_call.sdk_kwargs['id']]
+
+    def list_devices(self, api_call):
+        self.lists += 1
+        return list(self.devices)
+
+    def update_device(self, api_call):
+        self.updates.append(api_call.sdk_kwargs)
+        device = next(d for d in self.devices if d['id'] == api_call.sdk_kwargs['id'])
+        device.update(api_call.sdk_kwargs['device_update_input'].to_dict())
+        return dict(device)
+
+
+def batch(batch_id, state, hostnames, device_ids, error_messages=None):
+    return {'id': batch_id, 'state': state, 'quantity': len(hostnames),
+            'device_ids': device_ids, 'error_messages': error_messages}
+
+
+def api_error(status, message):
+    return metal_client.ApiException(status=status, reason='reason', body=json.dumps({'errors': [message]}))
+
+
+def bulk_args(**kwargs):
+    args = {
+        'metal_api_token': 'token',
+        'project_id': PROJECT_ID,
+        'metro': 'sv',
+        'plan': 'c3.small.x86',
+        'operating_system': 'ubuntu_22_04',
+        'metal_api_poll_jitter': 0.0,
+    }
+    args.update(kwargs)
+    return args
+
+
+def bulk_module(monkeypatch, project):
+    module = equinix.EquinixModule(argument_spec=metal_device.SPECDOC_META.ansible_spec)
+    monkeypatch.setattr(equinix, 'time', FakeTime())
+    monkeypatch.setattr(metal_device, 'time', FakeTime())
+    monkeypatch.setattr(metal_api, 'execute', project.execute)
+    return module
+
+
+def failure(capsys, excinfo):
+    assert excinfo.value.code == 1
+    return json.loads(capsys.readouterr().out)
+
+
+HOSTNAMES = ['web-{0}'.format(i) for i in range(1, 6)]
+
+
+@pytest.mark.parametrize('stdin', [bulk_args()], indirect=['stdin'])
+def test_device_batch_waves_halved_on_quota(stdin, monkeypatch):
+    def reject(hostnames):
+        if len(hostnames) > 2:
+            return api_error(403, 'Project device limit reached, request fewer servers')
+    project = FakeProject(reject=reject)
+    module = bulk_module(monkeypatch, project)
+
+    batches, devices = module.create_device_batches(HOSTNAMES, 4, timeout=600)
+    assert [len(w) for w in project.waves] == [4, 2, 2, 1]
+    assert sum(project.waves[1:], []) == HOSTNAMES
+    assert [b['state'] for b in batches] == ['completed'] * 3
+    assert [d['hostname'] for d in devices] == HOSTNAMES
+    assert project.lists == 1
+
+
+@pytest.mark.parametrize('stdin', [bulk_args()], indirect=['stdin'])
+def test_device_batch_not_retried_on_rate_limit(stdin, monkeypatch):
+    project = FakeProject(reject=lambda hostnames: api_error(403, 'rate limit exceeded'))
+    module = bulk_module(monkeypatch, project)
+
+    with pytest.raises(Exception, match='device batch for .* failed, 0 of 5 devices were requested'):
+        module.create_device_batches(HOSTNAMES, 4, timeout=600)
+    assert len(project.waves) == 1
+
+
+@pytest.mark.parametrize('stdin', [bulk_args()], indirect=['stdin'])
+def test_device_batch_failure_reports_created_devices(stdin, monkeypatch, capsys):
+    def reject(hostnames):
+        if 'web-3' in hostnames:
+            return api_error(422, 'operating_system is not available for plan')
+    project = FakeProject(reject=reject)
+    module = bulk_module(monkeypatch, project)
+
+    with pytest.raises(SystemExit) as excinfo:
+        module.create_device_batches(HOSTNAMES, 2, timeout=600)
+    result = failure(capsys, excinfo)
+    assert 'device batch for [\'web-3\', \'web-4\'] failed, 2 of 5 devices were requested' in result['msg']
+    assert [d['hostname'] for d in result['devices']] == ['web-1', 'web-2']
+    assert [(b['id'], b['state']) for b in result['batches']] == [('batch-1', 'completed')]
+
+
+@pytest.mark.parametrize('stdin', [bulk_args(hostnames=HOSTNAMES[:4], batch_size=2)], indirect=['stdin'])
+def test_bulk_skips_existing_hostnames(stdin, monkeypatch):
+    existing = {'id': 'device-web-2', 'hostname': 'web-2', 'metal_state': 'active'}
+    project = FakeProject(devices=[existing])
+    module = bulk_module(monkeypatch, project)
+
+    result = metal_device.bulk(module)
+    assert project.waves == [['web-1', 'web-3'], ['web-4']]
+    assert result['changed']
+    assert [d['hostname'] for d in result['devices']] == HOSTNAMES[:4]
+    assert result['devices'][1] == existing
+
+
+@pytest.mark.parametrize('stdin', [bulk_args(hostnames=HOSTNAMES[:2])], indirect=['stdin'])
+def test_bulk_with_all_hostnames_existing_creates_nothing(stdin, monkeypatch):
+    project = FakeProject(devices=[{'id': 'device-' + h, 'hostname': h, 'metal_state': 'active'} for h in HOSTNAMES])
+    module = bulk_module(monkeypatch, project)
+
+    result = metal_device.bulk(module)
+    assert project.waves == []
+    assert not result['changed']
+    assert [d['hostname'] for d in result['devices']] == HOSTNAMES[:2]
+
+
+@pytest.mark.parametrize('stdin', [bulk_args(hostnames=HOSTNAMES[:2], tags=['web'], locked=True)], indirect=['stdin'])
+def test_bulk_updates_existing_devices(stdin, monkeypatch):
+    project = FakeProject(devices=[{'id': 'device-web-1', 'hostname': 'web-1', 'metal_state': 'active',
+                                    'tags': ['old'], 'locked': True}])
+    module = bulk_module(monkeypatch, project)
+
+    result = metal_device.bulk(module)
+    assert project.waves == [['web-2']]
+    assert result['changed']
+    assert [u['id'] for u in project.updates] == ['device-web-1']
+    assert project.updates[0]['device_update_input'].to_dict() == {'tags': ['web']}
+    assert result['devices'][0]['tags'] == ['web']
+
+
+@pytest.mark.parametrize('stdin', [bulk_args(hostnames=HOSTNAMES[:2], tags=['web'])], indirect=['stdin'])
+def test_bulk_with_existing_devices_up_to_date_changes_nothing(stdin, monkeypatch):
+    project = FakeProject(devices=[{'id': 'device-' + h, 'hostname': h, 'metal_state': 'active', 'tags': ['web']}
+                                   for h in HOSTNAMES[:2]])
+    module = bulk_module(monkeypatch, project)
+
+    result = metal_device.bulk(module)
+    assert not result['changed']
+    assert project.updates == []
+
+
+@pytest.mark.parametrize('stdin', [bulk_args(hostnames=HOSTNAMES[:2], network_frozen=True)], indirect=['stdin'])
+def test_bulk_freezes_network_of_created_devices(stdin, monkeypatch):
+    project = FakeProject()
+    module = bulk_module(monkeypatch, project)
+
+    result = metal_device.bulk(module)
+    assert [u['id'] for u in project.updates] == ['device-web-1', 'device-web-2']
+    assert all(u['device_update_input'].network_frozen for u in project.updates)
+    assert [d['network_frozen'] for d in result['devices']] == [True, True]
+
+
+@pytest.mark.parametrize('stdin', [bulk_args(hostnames=HOSTNAMES[:2], network_frozen=True, wait=False)], indirect=['stdin'])
+def test_bulk_without_wait_defers_network_frozen(stdin, monkeypatch):
+    project = FakeProject()
+    module = bulk_module(monkeypatch, project)
+
+    result = metal_device.bulk(module)
+    assert project.updates == []
+    assert [d['deferred_updates'] for d in result['devices']] == [{'network_frozen': True}] * 2
+
+
+@pytest.mark.parametrize('stdin', [bulk_args(hostnames=HOSTNAMES[:4], batch_size=2)], indirect=['stdin'])
+def test_bulk_failed_batch(stdin, monkeypatch, capsys):
+    project = FakeProject(fail=['web-4'])
+    module = bulk_module(monkeypatch, project)
+
+    with pytest.raises(SystemExit) as excinfo:
+        metal_device.bulk(module)
+    result = failure(capsys, excinfo)
+    assert result['msg'] == 'devices web-3, web-4 were not created: no capacity in sv'
+    assert [d['hostname'] for d in result['devices']] == ['web-1', 'web-2']
+    assert [(b['id'], b['state']) for b in result['batches']] == [('batch-1', 'completed'), ('batch-2', 'failed')]
+
+
+@pytest.mark.parametrize('stdin', [{'metal_api_token': 'token', 'id': DEVICE_ID, 'hostname': 'web-2',
+                                    'project_id': PROJECT_ID}], indirect=['stdin'])
+def test_rename_device_by_id(stdin, monkeypatch, capsys):
+    updates = []
+
+    def execute(api_call, raw=False):
+        if api_call.action == action.UPDATE:
+            updates.append(api_call.sdk_kwargs)
+            return {'id': DEVICE_ID, 'hostname': 'web-2'}
+        assert api_call.action == action.GET
+        return {'id': DEVICE_ID, 'hostname': 'web-1'}
+    monkeypatch.setattr(metal_api, 'execute', execute)
+
+    with pytest.raises(SystemExit) as excinfo:
+        metal_device.main()
+    assert excinfo.value.code == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result['changed']
+    assert result['hostname'] == 'web-2'
+    assert updates[0]['id'] == DEVICE_ID
+    assert updates[0]['device_update_input'].hostname == 'web-2'
+
+
+FROZEN_DEVICE_ARGS = {'metal_api_token': 'token', 'project_id': PROJECT_ID, 'hostname': 'web-1', 'metro': 'sv',
+                      'plan': 'c3.small.x86', 'operating_system': 'ubuntu_22_04', 'network_frozen': True, 'wait': False}
+
+
+@pytest.mark.parametrize('stdin', [FROZEN_DEVICE_ARGS], indirect=['stdin'])
+def test_create_without_wait_defers_network_frozen(stdin, monkeypatch, capsys):
+    calls = []
+
+    def execute(api_call, raw=False):
+        calls.append(api_call.action)
+        if api_call.action == action.CREATE:
+            return {'id': DEVICE_ID, 'hostname': 'web-1', 'metal_state': 'queued', 'network_frozen': False}
+        assert api_call.action == action.LIST
+        return []
+    monkeypatch.setattr(metal_api, 'execute', execute)
+
+    with pytest.raises(SystemExit) as excinfo:
+        metal_device.main()
+    assert excinfo.value.code == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result['changed']
+    assert result['deferred_updates'] == {'network_frozen': True}
+    assert action.UPDATE not in calls
+
+
+@pytest.mark.parametrize('stdin', [FROZEN_DEVICE_ARGS], indirect=['stdin'])
+def test_later_run_applies_deferred_network_frozen(stdin, monkeypatch, capsys):
+    updates = []
+
+    def execute(api_call, raw=False):
+        if api_call.action == action.UPDATE:
+            updates.append(api_call.sdk_kwargs)
+            return {'id': DEVICE_ID, 'hostname': 'web-1', 'metal_state': 'active', 'network_frozen': True}
+        assert api_call.action == action.LIST
+        return [{'id': DEVICE_ID, 'hostname': 'web-1', 'metal_state': 'active', 'network_frozen': False}]
+    monkeypatch.setattr(metal_api, 'execute', execute)
+
+    with pytest.raises(SystemExit) as excinfo:
+        metal_device.main()
+    assert excinfo.value.code == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result['changed']
+    assert result['network_frozen']
+    assert len(updates) == 1
+    assert updates[0]['device_update_input'].network_frozen is True
+
+
+@pytest.mark.parametrize('stdin', [{'metal_api_token': 'token', 'id': DEVICE_ID, 'count': 2,
+                                    'hostname_template': 'web-{index}', 'project_id': PROJECT_ID}], indirect=['stdin'])
+def test_bulk_options_exclude_id(stdin, capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        metal_device.main()
+    assert 'parameters are mutually exclusive: count|id' in failure(capsys, excinfo)['msg']
+
+
+@pytest.mark.parametrize('stdin', [{'metal_api_token': 'token', 'count': 0, 'hostname_template': 'web-{index}',
+                                    'project_id': PROJECT_ID}], indirect=['stdin'])
+def test_bulk_count_must_be_positive(stdin, capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        metal_device.main()
+    assert failure(capsys, excinfo)['msg'] == 'count must be at least 1, got 0'